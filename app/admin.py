@@ -1,46 +1,16 @@
 # admin.py
 
 from datetime import datetime
-import state
+import time
+import service
+import progress
 from trainer import showTrainerAvailability
 
-def bookRoom(room_id: int, start: datetime, end: datetime, purpose: str):
-	conn = state.conn
-	cur = conn.cursor()
-	
-	cur.execute(
-		"""
-		SELECT start_time, end_time
-		FROM room_bookings
-		WHERE room_id = %s
-		AND NOT (%s <= start_time OR %s >= end_time);
-		""",
-		(room_id, end, start)
-	)
-
-	conflict = cur.fetchone()
-	if conflict is not None:
-		s_time, e_time = conflict
-		raise Exception(f"\nERROR: This new booking overlaps with an existing one (so it can't be added).\nConflicting booking in room {room_id}: {s_time} -> {e_time}\n")
-
-	cur.execute("INSERT into room_bookings (room_id, start_time, end_time, purpose) VALUES (%s, %s, %s, %s) RETURNING booking_id;", (room_id, start, end, purpose))
-	ret = cur.fetchone()[0]
-	if ret != None:
-		conn.commit()
-		print("Successfully booked the room")
-	else:
-		print("Something happened")
-	cur.close()
-	return ret
-
-
-def createClass():
-	if state.currentRole != "Admin":
+def createClass(session):
+	if session.currentRole != "Admin":
 		print("\nERROR: Admin access only. Please log in as an admin first.\n")
 		return
 	
-	conn = state.conn
-	cur = conn.cursor()
 	print("\n|     Admin: Create a Class     |")
 	print("(type 0 at ANY prompt to go back to main menu)\n")
 
@@ -61,20 +31,54 @@ def createClass():
 			if trainer_id == 0:
 				print("Returning to Main Menu...")
 				return
-			cur.execute(f"SELECT fname, lname FROM trainers WHERE trainer_id = {trainer_id};")
-			fname, lname = cur.fetchone()
-			if fname == None:
+			with session.connection() as conn:
+				trainer = service.getTrainer(conn, trainer_id)
+			if trainer == None:
 				print("\nPlease input a valid trainer ID\n")
 				continue
+			fname, lname = trainer["fname"], trainer["lname"]
 			print(f"You have chosen {fname} {lname}")
 			break
 		except ValueError:
 			print("\nPlease input a positive integer\n")
 			continue
 	
-	showTrainerAvailability(trainer_id)
-	
-	while True:
+	showTrainerAvailability(session, trainer_id)
+
+	min_capacity = 1
+	while purpose == "group":
+		size = input("How many people should the room fit? (blank = any): ").strip()
+		if size == "0":
+			print("Returning to Main Menu...")
+			return
+		try:
+			min_capacity = int(size) if size else 1
+			if min_capacity < 1:
+				raise ValueError
+			break
+		except ValueError:
+			print("\nPlease input a positive integer\n")
+
+	# the next few times that work for both the trainer and a big enough room (scheduler.py)
+	with session.connection() as conn:
+		suggestions = service.suggestClassSlots(conn, trainer_id, 60, min_capacity)
+	chosen = None
+	if suggestions:
+		print(f"\nNext free 1 hour slots for {fname} {lname}:")
+		for i in range(len(suggestions)):
+			option = suggestions[i]
+			print(f"{i + 1}: {option['start_time']:%Y-%m-%d %H:%M}-{option['end_time']:%H:%M} in {option['room_name']} (Capacity: {option['max_capacity']})")
+		pick = input("\nPick one to book it, or press enter to choose your own time: ").strip()
+		if pick == "0":
+			print("Returning to Main Menu...")
+			return
+		if pick.isdigit() and 1 <= int(pick) <= len(suggestions):
+			chosen = suggestions[int(pick) - 1]
+			start, end, room_id = chosen["start_time"], chosen["end_time"], chosen["room_id"]
+	else:
+		print(f"\nNo free 1 hour slots for {fname} {lname} in the next 7 days, choose your own time below\n")
+
+	while chosen is None:
 		try:
 			date_str = input("Please input the date of the class (YYYY-MM-DD): ")
 			if date_str == "0":
@@ -96,32 +100,14 @@ def createClass():
 			print("Invalid date format, Please try again")
 			continue
 
-		cur.execute("SELECT end_time FROM trainer_availability WHERE trainer_id = %s AND start_time <= %s AND end_time >= %s;", (trainer_id, end, start))
-		ret = cur.fetchone()
-		if ret == None:
-			print(f"\n{fname} {lname} is not available for those times\n")
-			continue
+		with session.connection() as conn:
+			slot = service.getAvailabilityCovering(conn, trainer_id, start, end)
+			if slot == None:
+				print(f"\n{fname} {lname} is not available for those times\n")
+				continue
+			# Show available rooms
+			ret = service.listFreeRooms(conn, start, end)
 
-		# Split up availability into 2 timeslots
-		cur.execute("UPDATE trainer_availability SET end_time = %s WHERE trainer_id = %s AND start_time <= %s AND end_time >= %s;", (start, trainer_id, start, end))
-		cur.execute("INSERT INTO trainer_availability (trainer_id, start_time, end_time) VALUES (%s, %s, %s);", (trainer_id, end, ret[0]))
-		cur.execute("DELETE FROM trainer_availability WHERE trainer_id = %s AND end_time - start_time < INTERVAL '1 hour';", (trainer_id,)) # Maintain 1 hour availability
-
-		cur.execute( # Show available rooms
-			"""
-			SELECT r.room_id, r.room_name, r.max_capacity
-			FROM rooms r
-			WHERE NOT EXISTS (
-				SELECT 1
-				FROM room_bookings b
-				WHERE b.room_id = r.room_id
-				AND b.start_time <= %s
-				AND b.end_time >= %s
-			);
-			""", (end, start)
-		)
-
-		ret = cur.fetchall()
 		if len(ret) == 0:
 			print("\nThere are no available rooms for your given time, please try again\n")
 			continue
@@ -129,29 +115,83 @@ def createClass():
 		print("Here are the following available rooms")
 		available_rooms = []
 		for i in range(len(ret)):
-			room_id, name, capacity = ret[i]
-			print(f"{i + 1}: ({name}, Capacity: {capacity})")
-			available_rooms.append(room_id)
+			room = ret[i]
+			print(f"{i + 1}: ({room['room_name']}, Capacity: {room['max_capacity']})")
+			available_rooms.append(room["room_id"])
 		
 		while True:
 			try:
-				room_id = int(input(f"\nPlease select a room "))
-				if room_id == 0:
+				index = int(input(f"\nPlease select a room ")) - 1
+				if index < 0:
 					return
+				room_id = available_rooms[index]
 				break
-			except Exception:
+			except (ValueError, IndexError):
 				print("\nPlease input a valid number\n")
 
 		break
 		
-	try:
-		booking_id = bookRoom(room_id, start, end, purpose)
-	except Exception:
-		print("\nCould not book room, please try again\n")
-		conn.rollback()
+	# split availability + book the room + create the class all in one transaction
+	with session.connection() as conn:
+		try:
+			service.createClass(conn, trainer_id, room_id, start, end, purpose)
+		except service.ServiceError as e:
+			# what clashed (room booking, trainer availability...) so the admin can pick another time
+			print(f"\nCould not book room: {str(e).strip()}\n")
+			conn.rollback()
+			return
+		except Exception:
+			print("\nCould not book room, please try again\n")
+			conn.rollback()
+			return
+		print("Successfully booked the room")
+		print("Class successfully booked!")
+		conn.commit()
+
+
+def clubProgressReport(session):
+	"""
+	ADMIN: how the whole club is doing on its goals
+	- per metric: how many goals, how many done, mean/median progress, a 10% histogram
+	- the top 10 goals by progress
+	(all goals are scored in one pass by progress.py, not one member at a time)
+	"""
+	if session.currentRole != "Admin":
+		print("\nERROR: Admin access only. Please log in as an admin first.\n")
 		return
-	
-	cur.execute("INSERT INTO classes (booking_id, trainer_id) VALUES (%s, %s);", (booking_id, trainer_id))
-	print("Class successfully booked!")
-	conn.commit()
-	cur.close()
\ No newline at end of file
+
+	print("\nWhich metric?  0: All   1: Weight   2: Body Fat   3: Heart Rate")
+	choice = input("Choose 0-3: ").strip() or "0"
+	if choice not in ("0", "1", "2", "3"):
+		print("\nInvalid choice.\n")
+		return
+	metric_name = None if choice == "0" else service.METRIC_NAMES[int(choice) - 1]
+
+	started = time.perf_counter()
+	with session.connection() as conn:
+		goals = progress.clubProgress(conn, metric_name)
+		board = progress.leaderboard(conn, goals, metric_name)
+	report = progress.distribution(goals)
+	took = time.perf_counter() - started
+
+	print("\n──────────────── Club Goal Progress ────────────────")
+	if not report:
+		print("No goals set yet.\n")
+		return
+	for row in report:
+		print(f"\n{row['metric_name']}: {row['goals']} goals, {row['measurable']} with readings, {row['completed']} reached")
+		if row["mean"] is not None:
+			print(f"   mean {row['mean'] * 100:.0f}%   median {row['median'] * 100:.0f}%")
+		widest = max(row["histogram"]) or 1
+		for i, count in enumerate(row["histogram"]):
+			low = i * 100 // len(row["histogram"])
+			high = (i + 1) * 100 // len(row["histogram"])
+			print(f"   {low:>3}-{high:<3}% {count:>9}  {'█' * round(count / widest * 30)}")
+
+	print("\n──────────────── Leaderboard ────────────────")
+	print(f"{'#':<4}{'Member':<28}{'Metric':<12}{'Start':>8}{'Now':>8}{'Target':>8}{'Progress':>10}")
+	for rank, row in enumerate(board, start=1):
+		name = f"{row['fname']} {row['lname']} ({row['member_id']})"
+		print(f"{rank:<4}{name[:27]:<28}{row['metric_name']:<12}{row['start']:>8.1f}{row['current']:>8.1f}"
+			  f"{row['target']:>8.1f}{row['progress'] * 100:>9.0f}%")
+	print(f"\n({len(goals['member_id']):,} goals scored in {took:.2f}s)\n")
@@ -0,0 +1,548 @@
+# api.py
+
+""" HTTP/JSON API over service.py (for the mobile app etc.)
+	- stdlib only (http.server), HTTP/1.1 keep-alive, one thread per connection
+	- DB connections come from the shared pool
+	- POST /login gives back a token, send it as  Authorization: Bearer <token>
+	  (tokens last TOKEN_TTL seconds, then log in again)
+	- run:  python app/api.py --port 8080
+"""
+
+import argparse
+import json
+import re
+import secrets
+import sys
+import threading
+import time
+import traceback
+from datetime import date, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+import psycopg2
+
+import cache
+import progress
+import scheduler
+import service
+from state import Session
+from db import connectToDB, closeDB, PoolExhausted
+
+HOST = "127.0.0.1"
+PORT = 8080
+MAX_BODY = 1024 * 1024 # 1 MB is plenty for any request here
+MAX_PAGE = 1000 # most rows one page of /me/metrics or /classes hands back
+TOKEN_TTL = 12 * 3600 # seconds a login token is good for
+PRUNE_EVERY = 60      # seconds between sweeps for expired tokens
+
+# -----------------
+# TOKENS -> SESSIONS ....
+# -----------------
+
+_sessions = {} # token -> (session, expires_at)
+_sessions_lock = threading.Lock()
+_pruned_at = 0.0
+
+def _pruneTokens(now):
+	# caller holds the lock, a full sweep at most every PRUNE_EVERY seconds
+	global _pruned_at
+	if now - _pruned_at < PRUNE_EVERY:
+		return
+	_pruned_at = now
+	for token in [token for token, (_, expires_at) in _sessions.items() if expires_at <= now]:
+		del _sessions[token]
+
+def _newToken(session) -> str:
+	token = secrets.token_urlsafe(24)
+	now = time.monotonic()
+	with _sessions_lock:
+		_pruneTokens(now)
+		_sessions[token] = (session, now + TOKEN_TTL)
+	return token
+
+def _sessionFor(token):
+	now = time.monotonic()
+	with _sessions_lock:
+		_pruneTokens(now)
+		entry = _sessions.get(token)
+		if entry is None:
+			return None
+		if entry[1] <= now:
+			del _sessions[token]
+			return None
+		return entry[0]
+
+def _dropToken(token):
+	with _sessions_lock:
+		_sessions.pop(token, None)
+
+
+class ApiError(Exception):
+	def __init__(self, status: int, message: str):
+		super().__init__(message)
+		self.status = status
+
+
+def _jsonDefault(value):
+	if isinstance(value, (datetime, date)):
+		return value.isoformat()
+	return str(value)
+
+def _parseTime(value, field):
+	try:
+		return datetime.fromisoformat(value)
+	except (TypeError, ValueError):
+		raise ApiError(400, f"'{field}' must be an ISO date/time like 2025-12-01T09:00")
+
+def _number(body, field):
+	try:
+		return float(body[field])
+	except KeyError:
+		raise ApiError(400, f"missing '{field}'")
+	except (TypeError, ValueError):
+		raise ApiError(400, f"'{field}' must be a number")
+
+def _wholeNumber(body, field):
+	try:
+		return int(body[field])
+	except KeyError:
+		raise ApiError(400, f"missing '{field}'")
+	except (TypeError, ValueError):
+		raise ApiError(400, f"'{field}' must be a whole number")
+
+def _field(body, field):
+	if field not in body:
+		raise ApiError(400, f"missing '{field}'")
+	return body[field]
+
+
+# -----------------
+# ROUTE HANDLERS ....
+# -----------------
+# each one: handler(session, conn, body, query, *url_groups) -> (status, payload)
+
+def postLogin(session, conn, body, query):
+	account = service.authenticate(conn, str(_field(body, "email")), str(_field(body, "password")))
+	if account is None:
+		raise ApiError(401, "Your email and password combination does not exist as a member or staff.")
+	new_session = Session()
+	new_session.currentUser = account["member_id"]
+	new_session.currentStaffId = account["staff_id"]
+	new_session.currentRole = account["role"]
+	return 200, {"token": _newToken(new_session), **account}
+
+def postRegister(session, conn, body, query):
+	member_id = service.registerMember(
+		conn, body.get("fname", ""), body.get("lname", ""), body.get("email", ""),
+		body.get("password", ""), body.get("birthday", ""), body.get("gender", "")
+	)
+	conn.commit()
+	return 201, {"member_id": member_id}
+
+def getMe(session, conn, body, query):
+	return 200, {"role": session.currentRole, "member_id": session.currentUser, "staff_id": session.currentStaffId}
+
+def getDashboard(session, conn, body, query):
+	return 200, service.getDashboard(conn, session.currentUser)
+
+def getProfile(session, conn, body, query):
+	profile = service.getProfile(conn, session.currentUser)
+	if profile is None:
+		raise service.NotFound("Member not found.")
+	return 200, profile
+
+def putProfile(session, conn, body, query):
+	profile = service.getProfile(conn, session.currentUser)
+	if profile is None:
+		raise service.NotFound("Member not found.")
+	# anything left out keeps its current value
+	service.updateProfile(
+		conn, session.currentUser,
+		body.get("fname", profile["fname"]), body.get("lname", profile["lname"]),
+		body.get("email", profile["email"]), body.get("birthday", profile["birthday"]),
+		body.get("gender", profile["gender"])
+	)
+	conn.commit()
+	return 200, service.getProfile(conn, session.currentUser)
+
+def _historyRange(query):
+	start = _parseTime(query["from"], "from") if "from" in query else None
+	end = _parseTime(query["to"], "to") if "to" in query else None
+	return start, end
+
+def getMetrics(session, conn, body, query):
+	# ?from=&to= filter, ?limit= (and ?after=<next from the last page>) pages with a keyset
+	start, end = _historyRange(query)
+	if "limit" not in query and "after" not in query:
+		return 200, {"metrics": service.getMetricHistory(conn, session.currentUser, start, end)}
+	limit = _pageLimit(query, service.HISTORY_PAGE_SIZE)
+	page = service.getMetricHistoryPage(conn, session.currentUser, _afterKey(query), limit, start, end)
+	return 200, {"metrics": page["rows"], "next": _nextKey(page)}
+
+def _pageLimit(query, default):
+	try:
+		return min(max(int(query.get("limit", default)), 1), MAX_PAGE)
+	except ValueError:
+		raise ApiError(400, "'limit' must be a whole number")
+
+# keyset pages hand out "next" as "<timestamp>~<id>", ?after= sends it back
+def _afterKey(query):
+	if not query.get("after"):
+		return None
+	date_part, _, id_part = query["after"].rpartition("~")
+	try:
+		return (datetime.fromisoformat(date_part), int(id_part))
+	except ValueError:
+		raise ApiError(400, "'after' should be the 'next' value from the previous page")
+
+def _nextKey(page):
+	return f"{page['next'][0].isoformat()}~{page['next'][1]}" if page["next"] else None
+
+def _trendQuery(query):
+	try:
+		periods = int(query.get("periods", service.TREND_PERIODS))
+	except ValueError:
+		raise ApiError(400, "'periods' must be a whole number")
+	return query.get("metric", "weight"), query.get("grain", "month"), periods
+
+def getMetricTrend(session, conn, body, query):
+	# ?metric=weight|body_fat|heart_rate&grain=day|week|month&periods=12, read from the rollups
+	metric_name, grain, periods = _trendQuery(query)
+	return 200, {"trend": service.getMetricTrend(conn, session.currentUser, metric_name, grain, periods)}
+
+def getCurrentMetrics(session, conn, body, query):
+	return 200, {"metrics": service.getCurrentMetrics(conn, session.currentUser)}
+
+def postMetrics(session, conn, body, query):
+	row = service.addMetrics(
+		conn, session.currentUser,
+		_number(body, "weight"), _number(body, "body_fat"), _number(body, "heart_rate")
+	)
+	conn.commit()
+	return 201, row
+
+def getGoals(session, conn, body, query):
+	return 200, {"goals": service.getGoals(conn, session.currentUser)}
+
+def putGoal(session, conn, body, query, goal_id):
+	service.updateGoalTarget(conn, session.currentUser, int(goal_id), _number(body, "target"))
+	conn.commit()
+	return 200, {"goal_id": int(goal_id), "target": _number(body, "target")}
+
+def getClasses(session, conn, body, query):
+	# upcoming classes with room, soonest first, one page at a time (?limit=, ?after=<next>)
+	# filters: ?from=&to= (start time), ?trainer=<id>, ?type=private|group, ?min_free=<spots>
+	start, end = _historyRange(query)
+	try:
+		trainer_id = int(query["trainer"]) if "trainer" in query else None
+		min_free = int(query.get("min_free", 1))
+	except ValueError:
+		raise ApiError(400, "'trainer' and 'min_free' must be whole numbers")
+	page = service.browseClasses(
+		conn, start, end, trainer_id, query.get("type"), min_free,
+		_afterKey(query), _pageLimit(query, service.CLASS_PAGE_SIZE)
+	)
+	return 200, {"classes": page["rows"], "next": _nextKey(page)}
+
+def postClassRegistration(session, conn, body, query, class_id):
+	service.registerForClass(conn, session.currentUser, int(class_id))
+	conn.commit()
+	return 201, {"class_id": int(class_id), "member_id": session.currentUser}
+
+def postClass(session, conn, body, query):
+	created = service.createClass(
+		conn, _wholeNumber(body, "trainer_id"), _wholeNumber(body, "room_id"),
+		_parseTime(body.get("start"), "start"), _parseTime(body.get("end"), "end"),
+		str(_field(body, "purpose"))
+	)
+	conn.commit()
+	return 201, created
+
+def getClassSuggestions(session, conn, body, query, trainer_id):
+	# ?minutes=60&capacity=10&from=&to=&limit=5, the first times the trainer and a big enough room are both free
+	start, end = _historyRange(query)
+	try:
+		minutes = int(query.get("minutes", 60))
+		min_capacity = int(query.get("capacity", 1))
+		limit = min(max(int(query.get("limit", service.SUGGESTION_LIMIT)), 1), MAX_PAGE)
+	except ValueError:
+		raise ApiError(400, "'minutes', 'capacity' and 'limit' must be whole numbers")
+	return 200, {"suggestions": service.suggestClassSlots(conn, int(trainer_id), minutes, min_capacity, start, end, limit)}
+
+def getFreeRooms(session, conn, body, query):
+	start = _parseTime(query.get("start"), "start")
+	end = _parseTime(query.get("end"), "end")
+	return 200, {"rooms": service.listFreeRooms(conn, start, end)}
+
+def getTrainers(session, conn, body, query):
+	return 200, {"trainers": service.listTrainers(conn)}
+
+def getTrainerAvailability(session, conn, body, query, trainer_id):
+	trainer = service.getTrainer(conn, int(trainer_id))
+	if trainer is None:
+		raise service.NotFound("Trainer not found.")
+	return 200, {"trainer": trainer, "availability": service.getTrainerAvailability(conn, int(trainer_id))}
+
+def postTrainerAvailability(session, conn, body, query, trainer_id):
+	trainer_id = int(trainer_id)
+	if session.currentRole == "Trainer" and trainer_id != session.currentStaffId:
+		raise ApiError(403, "Trainers can only add availability for themselves.")
+	slot_id = service.addAvailability(
+		conn, trainer_id, _parseTime(body.get("start"), "start"), _parseTime(body.get("end"), "end")
+	)
+	conn.commit()
+	return 201, {"slot_id": slot_id}
+
+def postRecurringAvailability(session, conn, body, query, trainer_id):
+	# {"days": ["mon", "wed", "fri"], "start": "09:00", "end": "12:00", "from": "2026-11-02", "weeks": 12}
+	trainer_id = int(trainer_id)
+	if session.currentRole == "Trainer" and trainer_id != session.currentStaffId:
+		raise ApiError(403, "Trainers can only add availability for themselves.")
+	days = _field(body, "days")
+	if isinstance(days, str):
+		days = days.split(",")
+	try:
+		start = datetime.strptime(str(_field(body, "start")), "%H:%M").time()
+		end = datetime.strptime(str(_field(body, "end")), "%H:%M").time()
+		first_day = date.fromisoformat(body["from"]) if body.get("from") else date.today()
+		weeks = int(_field(body, "weeks"))
+	except (TypeError, ValueError):
+		raise ApiError(400, "'start'/'end' are HH:MM, 'from' is YYYY-MM-DD and 'weeks' a whole number")
+	slots = service.expandAvailabilityTemplate(days, start, end, first_day, weeks)
+	added = service.bulkAddAvailability(conn, [(trainer_id, slot_start, slot_end) for slot_start, slot_end in slots])
+	conn.commit()
+	return 201, {"trainer_id": trainer_id, "added": added}
+
+def getMemberSearch(session, conn, body, query):
+	return 200, {"members": service.searchMembers(conn, query.get("q", ""))}
+
+def getMemberSummary(session, conn, body, query, member_id):
+	summary = service.getMemberSummary(conn, int(member_id))
+	if summary is None:
+		raise service.NotFound("Member not found.")
+	return 200, summary
+
+def getRoster(session, conn, body, query):
+	# ?members=1,2,3 or ?trainer=<id> (everyone in their classes), trainers default to their own classes
+	try:
+		if "members" in query:
+			member_ids = [int(part) for part in query["members"].split(",") if part.strip()]
+			return 200, {"roster": service.getRoster(conn, member_ids=member_ids)}
+		if "trainer" in query:
+			trainer_id = int(query["trainer"])
+		elif session.currentRole == "Trainer":
+			trainer_id = session.currentStaffId
+		else:
+			raise ApiError(400, "give ?members=1,2,3 or ?trainer=<id>")
+	except ValueError:
+		raise ApiError(400, "'members' and 'trainer' must be whole numbers")
+	return 200, {"roster": service.getRoster(conn, trainer_id=trainer_id)}
+
+def getMemberTrend(session, conn, body, query, member_id):
+	metric_name, grain, periods = _trendQuery(query)
+	return 200, {"trend": service.getMetricTrend(conn, int(member_id), metric_name, grain, periods)}
+
+def getClubTrend(session, conn, body, query):
+	metric_name, grain, periods = _trendQuery(query)
+	return 200, {"trend": service.getClubTrend(conn, metric_name, grain, periods)}
+
+def getProgressReport(session, conn, body, query):
+	# ?metric= (default all), ?top= leaderboard size
+	metric_name = query.get("metric") or None
+	try:
+		top = min(max(int(query.get("top", progress.LEADERBOARD_SIZE)), 1), MAX_PAGE)
+	except ValueError:
+		raise ApiError(400, "'top' must be a whole number")
+	goals = progress.clubProgress(conn, metric_name)
+	return 200, {
+		"distribution": progress.distribution(goals),
+		"leaderboard": progress.leaderboard(conn, goals, metric_name, top),
+	}
+
+
+ANYONE = None
+LOGGED_IN = ("Member", "Trainer", "Admin")
+MEMBER = ("Member",)
+STAFF = ("Trainer", "Admin")
+ADMIN = ("Admin",)
+
+# (method, path regex, who can call it, handler)
+ROUTES = [
+	("POST", r"/login", ANYONE, postLogin),
+	("POST", r"/members", ANYONE, postRegister),
+	("GET", r"/me", LOGGED_IN, getMe),
+	("GET", r"/me/dashboard", MEMBER, getDashboard),
+	("GET", r"/me/profile", MEMBER, getProfile),
+	("PUT", r"/me/profile", MEMBER, putProfile),
+	("GET", r"/me/metrics", MEMBER, getMetrics),
+	("POST", r"/me/metrics", MEMBER, postMetrics),
+	("GET", r"/me/metrics/current", MEMBER, getCurrentMetrics),
+	("GET", r"/me/metrics/trend", MEMBER, getMetricTrend),
+	("GET", r"/me/goals", MEMBER, getGoals),
+	("PUT", r"/me/goals/(\d+)", MEMBER, putGoal),
+	("GET", r"/classes", LOGGED_IN, getClasses),
+	("POST", r"/classes", ADMIN, postClass),
+	("POST", r"/classes/(\d+)/register", MEMBER, postClassRegistration),
+	("GET", r"/rooms/free", ADMIN, getFreeRooms),
+	("GET", r"/trainers/(\d+)/suggestions", ADMIN, getClassSuggestions),
+	("GET", r"/trainers", LOGGED_IN, getTrainers),
+	("GET", r"/trainers/(\d+)/availability", LOGGED_IN, getTrainerAvailability),
+	("POST", r"/trainers/(\d+)/availability", STAFF, postTrainerAvailability),
+	("POST", r"/trainers/(\d+)/availability/recurring", STAFF, postRecurringAvailability),
+	("GET", r"/members/search", STAFF, getMemberSearch),
+	("GET", r"/members/(\d+)/summary", STAFF, getMemberSummary),
+	("GET", r"/roster", STAFF, getRoster),
+	("GET", r"/members/(\d+)/trend", STAFF, getMemberTrend),
+	("GET", r"/trends", STAFF, getClubTrend),
+	("GET", r"/reports/progress", ADMIN, getProgressReport),
+]
+_COMPILED = [(method, re.compile(f"^{pattern}$"), roles, handler) for method, pattern, roles, handler in ROUTES]
+
+
+# -----------------
+# HTTP ....
+# -----------------
+
+class ApiHandler(BaseHTTPRequestHandler):
+	protocol_version = "HTTP/1.1" # keep-alive
+	server_version = "FitnessClubAPI/1.0"
+
+	def log_message(self, format, *args):
+		if self.server.verbose:
+			super().log_message(format, *args)
+
+	def _send(self, status: int, payload):
+		data = json.dumps(payload, default=_jsonDefault).encode("utf-8")
+		self.send_response(status)
+		self.send_header("Content-Type", "application/json")
+		self.send_header("Content-Length", str(len(data)))
+		if self.close_connection:
+			self.send_header("Connection", "close")
+		self.end_headers()
+		self.wfile.write(data)
+
+	def _readBody(self):
+		# after a bad length or body we can't tell where the next request
+		# starts, so the connection is closed instead of kept alive
+		try:
+			length = int(self.headers.get("Content-Length") or 0)
+		except ValueError:
+			length = -1
+		if length < 0:
+			self.close_connection = True
+			raise ApiError(400, "bad Content-Length")
+		if length > MAX_BODY:
+			self.close_connection = True
+			raise ApiError(413, "request body too large")
+		if length == 0:
+			return {}
+		try:
+			body = json.loads(self.rfile.read(length))
+		except ValueError:
+			self.close_connection = True
+			raise ApiError(400, "request body must be JSON")
+		if not isinstance(body, dict):
+			raise ApiError(400, "request body must be a JSON object")
+		return body
+
+	def _handle(self, method: str):
+		path, _, query_string = self.path.partition("?")
+		path = path.rstrip("/") or "/"
+		query = dict(parse_qsl(query_string))
+		token = self.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+
+		try:
+			body = self._readBody()
+
+			# the two that don't need the DB
+			if path == "/logout" and method == "POST":
+				_dropToken(token)
+				self._send(200, {"ok": True})
+				return
+			if path == "/health" and method == "GET":
+				self._send(200, {"ok": True, "pool": self.server.guest.getPool().stats(), "cache": cache.members.stats(), "scheduler": scheduler.engine.stats()})
+				return
+
+			for route_method, pattern, roles, handler in _COMPILED:
+				match = pattern.match(path)
+				if match is None or route_method != method:
+					continue
+
+				session = None
+				if roles is not ANYONE:
+					session = _sessionFor(token)
+					if session is None:
+						raise ApiError(401, "log in first (POST /login) and send the token")
+					if session.currentRole not in roles:
+						raise ApiError(403, f"only available to: {', '.join(roles)}")
+
+				with (session or self.server.guest).connection() as conn:
+					status, payload = handler(session, conn, body, query, *match.groups())
+				self._send(status, payload)
+				return
+			raise ApiError(404, f"no route for {method} {path}")
+
+		except ApiError as e:
+			self._send(e.status, {"error": str(e)})
+		except service.NotFound as e:
+			self._send(404, {"error": str(e)})
+		except service.Conflict as e:
+			self._send(409, {"error": str(e).strip()})
+		except service.ServiceError as e:
+			self._send(400, {"error": str(e)})
+		except PoolExhausted as e:
+			self._send(503, {"error": str(e)})
+		except ValueError as e:
+			# a number/date that didn't parse and wasn't checked above (Content-Length...)
+			self._send(400, {"error": f"bad value: {e}"})
+		except psycopg2.DataError as e:
+			# e.g. an id in the path too big for an INT column
+			self._send(400, {"error": f"bad value: {str(e).splitlines()[0]}"})
+		except Exception:
+			# the details are for the server log, not the client
+			print(f"[{self.log_date_time_string()}] {method} {path} failed", file=sys.stderr)
+			traceback.print_exc()
+			self._send(500, {"error": "internal error"})
+
+	def do_GET(self):
+		self._handle("GET")
+
+	def do_POST(self):
+		self._handle("POST")
+
+	def do_PUT(self):
+		self._handle("PUT")
+
+
+class ApiServer(ThreadingHTTPServer):
+	daemon_threads = True
+	request_queue_size = 1024
+
+	def __init__(self, address, verbose=False):
+		super().__init__(address, ApiHandler)
+		self.verbose = verbose
+		self.guest = Session() # not logged in, used for /login, /members and /health
+
+
+def main():
+	parser = argparse.ArgumentParser(description="HTTP/JSON API for the Health & Fitness Club")
+	parser.add_argument("--host", default=HOST)
+	parser.add_argument("--port", type=int, default=PORT)
+	parser.add_argument("--pool-size", type=int, default=20, help="max pooled DB connections")
+	parser.add_argument("--verbose", action="store_true", help="log every request")
+	args = parser.parse_args()
+
+	connectToDB(maxconn=args.pool_size)
+	server = ApiServer((args.host, args.port), args.verbose)
+	print(f"Health & Fitness Club API listening on http://{args.host}:{args.port}")
+	try:
+		server.serve_forever()
+	except KeyboardInterrupt:
+		print("\nShutting down...")
+	finally:
+		server.server_close()
+		closeDB()
+
+if __name__ == "__main__":
+	main()
@@ -3,16 +3,33 @@
 """ GO TO
 	state.py   for initialization values
 	db.py      for general DB functions
+	instrument.py for query timing (CLUB_PROFILE=1)
+	cache.py   for the per-member read cache
 	auth.py    for login() and register() functions
 	member.py  for Member Functions
 	trainer.py for Trainer Functions
+	admin.py   for Admin Functions
+	service.py for the SQL behind all of the above (plain dicts, no prompts)
+	server.py  for the network (TCP) version of this menu
+	api.py     for the HTTP/JSON API
+	batch.py   for running a JSON-lines file of operations (no prompts)
+	ingest.py  for bulk importing wearable metric exports
+	datagen.py for generating load test data
+	bench.py   for the benchmark driver
+	triggerbench.py for timing metrics inserts under the goals triggers
+	metricstore.py for the columnar (array + mmap) copy of metrics used by analytics
+	progress.py for club-wide goal progress (leaderboard, distribution)
+	forecast.py for refitting the goal ETA forecasts
+	scheduler.py for the in-memory trainer/room timelines behind class time suggestions
 """
 
-import state
-from db import connectToDB, resetDB
+from state import Session
+from db import connectToDB, closeDB, resetDB
 from auth import login, register
 from member import (
 	getMetricHistory,
+	searchMetricHistory,
+	showMetricTrends,
 	getCurrentMetrics,
 	updateMetrics,
 	showDashboard,
@@ -23,103 +40,141 @@ from member import (
 from trainer import (
 	trainerViewAvail,
 	trainerAddAvail,
+	trainerAddRecurringAvail,
 	trainerMemberLookup,
+	trainerRoster,
+	staffMetricTrends,
 )
-from admin import createClass
+from admin import createClass, clubProgressReport
+
+def printMenu(session, allow_reset: bool = True):
+	print("────────────────────────────────────────────────────────────────────────────")
+	print("- <3 Health & Fitness Club <3 | Main Menu -\n")
+	print(f"You are viewing as: {session.currentRole}")
+	print("────────────────────────────────────────────────────────────────────────────")
+	print("Choose from the options below.")
+	print("        0: Exit")
+	if allow_reset:
+		print("        1: Reset Database")
+	print("        2: Login")
+	print("        3: Register a Member")
+	print("\n        Member Exclusive Functions")
+	print("        4: Get Metric History")
+	print("        5: Get Current Metrics")
+	print("        6: Update Metrics")
+	print("        7: Show My Active Dashboard")
+	print("        8: Profile Management")
+	print("        9: Member Goal Manager")
+	print("        10: View Availability from Trainers")
+	print("        11: Register For A Class")
+	print("        15: Search / Export Metric History")
+	print("        16: My Metric Trends")
+	print("\n        Trainer Exclusive Functions")
+	print("        12: Add Availability")
+	print("        13: Member Lookup")
+	print("        17: Metric Trends (member or whole club)")
+	print("        19: Client Roster")
+	print("        20: Add Recurring Availability")
+	print("\n        Admin Exclusive Functions")
+	print("        14: Create Class")
+	print("        18: Club Goal Progress Report")
+
+def runOption(session, option, allow_reset: bool = True) -> bool:
+	"""
+	run one main menu option for this session
+	returns False when the session picked Exit
+	(shared by main() and the network server in server.py, which passes allow_reset=False:
+	a reset drops the database under every connected client)
+	"""
+	try:
+		option = int(option)
+	except Exception:
+		print("\nPlease input an integer\n")
+		return True
+
+	match option:
+		case 0:
+			return False
+		case 1:
+			if not allow_reset:
+				print("\nResetting the database is only available from the local terminal (python app/app.py).\n")
+				return True
+			resetDB()
+		case 2:
+			email = input("To login, please enter your Email: ")
+			password = input("Now enter your password: ")
+			login(session, email, password)
+		case 3:
+			print("\n-- Member Registration --")
+			print("Please fill in the details below.")
+			email = input("Email: ").strip()
+			password = input("Password: ").strip()
+			fname = input("First Name: ").strip()
+			lname = input("Last Name: ").strip()
+			bday = input("Birthday (YYYY-MM-DD): ").strip()
+			gender = input("Gender (e.g., F/M/NB): ").strip()
+			register(session, fname, lname, email, password, bday, gender)
+		case 4:
+			getMetricHistory(session)
+		case 5:
+			getCurrentMetrics(session)
+		case 6:
+			try:
+				weight = float(input("Weight (kg): "))
+				bf = float(input("Body Fat %: "))
+				hr = float(input("Heartrate (bpm): "))
+			except Exception:
+				print("\nInvalid input, make sure to use real numbers\n")
+				return True
+			updateMetrics(session, weight, bf, hr)
+		case 7:
+			showDashboard(session)
+		case 8:
+			updatePersonalDetails(session)
+		case 9:
+			manageGoals(session)
+		case 10:
+			if session.currentRole == "System":
+				print("\nPlease log in first. This feature is only available for Members and Staff.\n")
+				return True
+			trainerViewAvail(session)
+		case 11:
+			registerForClass(session)
+		case 12:
+			trainerAddAvail(session)
+		case 13:
+			trainerMemberLookup(session)
+		case 14:
+			createClass(session)
+		case 15:
+			searchMetricHistory(session)
+		case 16:
+			showMetricTrends(session)
+		case 17:
+			staffMetricTrends(session)
+		case 18:
+			clubProgressReport(session)
+		case 19:
+			trainerRoster(session)
+		case 20:
+			trainerAddRecurringAvail(session)
+		case _:
+			print("\nInvalid option, try again\n")
+	return True
 
 def main():
-	# open DB connection once at startup
+	# open the DB connection pool once at startup
 	connectToDB()
-	conn = state.conn
+	session = Session()
 
 	try:
 		while True:
-			print("────────────────────────────────────────────────────────────────────────────")
-			print("- <3 Health & Fitness Club <3 | Main Menu -\n")
-			print(f"You are viewing as: {state.currentRole}")
-			print("────────────────────────────────────────────────────────────────────────────")
-			print("Choose from the options below.")
-			print("        0: Exit")
-			print("        1: Reset Database")
-			print("        2: Login")
-			print("        3: Register a Member")
-			print("\n        Member Exclusive Functions")
-			print("        4: Get Metric History")
-			print("        5: Get Current Metrics")
-			print("        6: Update Metrics")
-			print("        7: Show My Active Dashboard")
-			print("        8: Profile Management")
-			print("        9: Member Goal Manager")
-			print("        10: View Availability from Trainers")
-			print("        11: Register For A Class")
-			print("\n        Trainer Exclusive Functions")
-			print("        12: Add Availability")
-			print("        13: Member Lookup")
-			print("\n        Admin Exclusive Functions")
-			print("        14: Create Class")
+			printMenu(session)
 			option = input("Type your option as a number: ")
-			try:
-				option = int(option)
-			except Exception:
-				print("\nPlease input an integer\n")
-				continue
-
-			match option:
-				case 0:
-					break
-				case 1:
-					resetDB()
-				case 2:
-					email = input("To login, please enter your Email: ")
-					password = input("Now enter your password: ")
-					login(email, password)
-				case 3:
-					print("\n-- Member Registration --")
-					print("Please fill in the details below.")
-					email = input("Email: ").strip()
-					password = input("Password: ").strip()
-					fname = input("First Name: ").strip()
-					lname = input("Last Name: ").strip()
-					bday = input("Birthday (YYYY-MM-DD): ").strip()
-					gender = input("Gender (e.g., F/M/NB): ").strip()
-					register(fname, lname, email, password, bday, gender)
-				case 4:
-					getMetricHistory()
-				case 5:
-					getCurrentMetrics()
-				case 6:
-					try:
-						weight = float(input("Weight (kg): "))
-						bf = float(input("Body Fat %: "))
-						hr = float(input("Heartrate (bpm): "))
-					except Exception:
-						print("\nInvalid input, make sure to use real numbers\n")
-						continue
-					updateMetrics(weight, bf, hr)
-				case 7:
-					showDashboard()
-				case 8:
-					updatePersonalDetails()
-				case 9:
-					manageGoals()
-				case 10:
-					if state.currentRole == "System":
-						print("\nPlease log in first. This feature is only available for Members and Staff.\n")
-						continue
-					trainerViewAvail()
-				case 11:
-					registerForClass()
-				case 12:
-					trainerAddAvail()
-				case 13:
-					trainerMemberLookup()
-				case 14:
-					createClass()
-				case _:
-					print("\nInvalid option, try again\n")
+			if not runOption(session, option):
+				break
 	finally:
-		if conn is not None:
-			conn.close()
+		closeDB()
 
 if __name__ == "__main__":
 	main()
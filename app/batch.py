@@ -0,0 +1,328 @@
+# batch.py
+
+""" non-interactive runner: replays a JSON-lines file of operations, no prompts
+	- one operation per line, e.g.
+		{"op": "login", "email": "gloria@gmail.com", "password": "gloria"}
+		{"op": "updateMetrics", "weight": 67.0, "body_fat": 26.8, "heart_rate": 73}
+		{"op": "editGoal", "goal_id": 1, "target": 55}
+		{"op": "registerForClass", "class_id": 1}
+		{"op": "trainerAddAvail", "trainer_id": 2, "start": "2026-12-01T09:00", "end": "2026-12-01T11:00"}
+		{"op": "trainerAddRecurringAvail", "trainer_id": 2, "days": "mon,wed,fri", "start": "09:00", "end": "12:00", "weeks": 12}
+		{"op": "createClass", "trainer_id": 1, "room_id": 2, "start": "...", "end": "...", "purpose": "group"}
+	- ops run as whoever the last "login" was, with the same role rules as the menus
+	- writes are grouped into transactions of --batch-size ops, each op gets a savepoint
+	  so one bad line doesn't throw away the rest of its group
+	- one JSON result per op goes to stdout (or --output), a summary goes to stderr
+	- run:  python app/batch.py ops.jsonl --batch-size 500
+"""
+
+import argparse
+import json
+import sys
+import time
+from datetime import date, datetime
+
+import service
+from state import Session
+from db import connectToDB, closeDB
+
+BATCH_SIZE = 500
+
+
+def _jsonDefault(value):
+	if isinstance(value, (datetime, date)):
+		return value.isoformat()
+	return str(value)
+
+def _time(op, field):
+	try:
+		return datetime.fromisoformat(op[field])
+	except KeyError:
+		raise service.ServiceError(f"missing '{field}'")
+	except (TypeError, ValueError):
+		raise service.ServiceError(f"'{field}' must be an ISO date/time like 2025-12-01T09:00")
+
+def _need(op, field):
+	if field not in op:
+		raise service.ServiceError(f"missing '{field}'")
+	return op[field]
+
+
+# -----------------
+# OPERATIONS ....
+# -----------------
+# each one: handler(session, conn, op) -> json-able result, raise ServiceError to reject the op
+
+def opLogin(session, conn, op):
+	account = service.authenticate(conn, str(_need(op, "email")), str(_need(op, "password")))
+	if account is None:
+		session.logout()
+		raise service.ServiceError("Your email and password combination does not exist as a member or staff.")
+	session.currentUser = account["member_id"]
+	session.currentStaffId = account["staff_id"]
+	session.currentRole = account["role"]
+	return account
+
+def opLogout(session, conn, op):
+	session.logout()
+	return None
+
+def opRegister(session, conn, op):
+	member_id = service.registerMember(
+		conn, op.get("fname", ""), op.get("lname", ""), op.get("email", ""),
+		op.get("password", ""), op.get("birthday", ""), op.get("gender", "")
+	)
+	return {"member_id": member_id}
+
+def opUpdateMetrics(session, conn, op):
+	return service.addMetrics(
+		conn, session.currentUser,
+		float(_need(op, "weight")), float(_need(op, "body_fat")), float(_need(op, "heart_rate"))
+	)
+
+def opEditGoal(session, conn, op):
+	service.updateGoalTarget(conn, session.currentUser, int(_need(op, "goal_id")), float(_need(op, "target")))
+	return None
+
+def opUpdatePersonalDetails(session, conn, op):
+	profile = service.getProfile(conn, session.currentUser)
+	if profile is None:
+		raise service.NotFound("Member not found.")
+	service.updateProfile(
+		conn, session.currentUser,
+		op.get("fname", profile["fname"]), op.get("lname", profile["lname"]),
+		op.get("email", profile["email"]), op.get("birthday", profile["birthday"]),
+		op.get("gender", profile["gender"])
+	)
+	return None
+
+def opRegisterForClass(session, conn, op):
+	service.registerForClass(conn, session.currentUser, int(_need(op, "class_id")))
+	return None
+
+def opTrainerAddAvail(session, conn, op):
+	if session.currentRole == "Trainer":
+		trainer_id = session.currentStaffId
+		if int(op.get("trainer_id", trainer_id)) != trainer_id:
+			raise service.ServiceError("Trainers can only add availability for themselves.")
+	else:
+		trainer_id = int(_need(op, "trainer_id"))
+	start = _time(op, "start")
+	end = _time(op, "end")
+	problem = service.validateAvailabilitySlot(start, end)
+	if problem:
+		raise service.ServiceError(problem.replace("\n", " "))
+	return {"slot_id": service.addAvailability(conn, trainer_id, start, end)}
+
+def opTrainerAddRecurringAvail(session, conn, op):
+	# {"days": ["mon", "wed"], "start": "09:00", "end": "12:00", "from": "2026-11-02", "weeks": 12}
+	if session.currentRole == "Trainer":
+		trainer_id = session.currentStaffId
+		if int(op.get("trainer_id", trainer_id)) != trainer_id:
+			raise service.ServiceError("Trainers can only add availability for themselves.")
+	else:
+		trainer_id = int(_need(op, "trainer_id"))
+	days = _need(op, "days")
+	try:
+		start = datetime.strptime(str(_need(op, "start")), "%H:%M").time()
+		end = datetime.strptime(str(_need(op, "end")), "%H:%M").time()
+		first_day = date.fromisoformat(op["from"]) if op.get("from") else date.today()
+	except ValueError:
+		raise service.ServiceError("'start'/'end' are HH:MM and 'from' is YYYY-MM-DD")
+	slots = service.expandAvailabilityTemplate(
+		days.split(",") if isinstance(days, str) else days, start, end, first_day, int(_need(op, "weeks"))
+	)
+	return {"added": service.bulkAddAvailability(conn, [(trainer_id, s, e) for s, e in slots])}
+
+def opCreateClass(session, conn, op):
+	return service.createClass(
+		conn, int(_need(op, "trainer_id")), int(_need(op, "room_id")),
+		_time(op, "start"), _time(op, "end"), str(_need(op, "purpose"))
+	)
+
+def opShowDashboard(session, conn, op):
+	return service.getDashboard(conn, session.currentUser)
+
+def opGetMetricHistory(session, conn, op):
+	start = _time(op, "from") if "from" in op else None
+	end = _time(op, "to") if "to" in op else None
+	return service.getMetricHistory(conn, session.currentUser, start, end)
+
+def opGetCurrentMetrics(session, conn, op):
+	return service.getCurrentMetrics(conn, session.currentUser)
+
+def opMetricTrend(session, conn, op):
+	return service.getMetricTrend(
+		conn, session.currentUser, str(op.get("metric", "weight")), str(op.get("grain", "month")),
+		int(op.get("periods", service.TREND_PERIODS))
+	)
+
+def opListMemberGoals(session, conn, op):
+	return service.getGoals(conn, session.currentUser)
+
+def opAvailableClasses(session, conn, op):
+	# optional: "from"/"to", "trainer_id", "type", "min_free", "limit" (first page only)
+	return service.browseClasses(
+		conn, _time(op, "from") if "from" in op else None, _time(op, "to") if "to" in op else None,
+		int(op["trainer_id"]) if "trainer_id" in op else None, op.get("type"), int(op.get("min_free", 1)),
+		limit=int(op.get("limit", service.CLASS_PAGE_SIZE))
+	)["rows"]
+
+def opTrainerViewAvail(session, conn, op):
+	return service.getTrainerAvailability(conn, int(_need(op, "trainer_id")))
+
+def opTrainerMemberLookup(session, conn, op):
+	return service.searchMembers(conn, str(_need(op, "query")))
+
+def opRoster(session, conn, op):
+	# "member_ids": [...] or "trainer_id" (a trainer with neither gets their own classes)
+	if "member_ids" in op:
+		return service.getRoster(conn, member_ids=[int(member_id) for member_id in op["member_ids"]])
+	if "trainer_id" not in op and session.currentRole == "Trainer":
+		return service.getRoster(conn, trainer_id=session.currentStaffId)
+	return service.getRoster(conn, trainer_id=int(_need(op, "trainer_id")))
+
+def opClubTrend(session, conn, op):
+	return service.getClubTrend(
+		conn, str(op.get("metric", "weight")), str(op.get("grain", "month")),
+		int(op.get("periods", service.TREND_PERIODS))
+	)
+
+def opMemberSummary(session, conn, op):
+	summary = service.getMemberSummary(conn, int(_need(op, "member_id")))
+	if summary is None:
+		raise service.NotFound("Member not found.")
+	return summary
+
+
+ANYONE = None
+LOGGED_IN = ("Member", "Trainer", "Admin")
+MEMBER = ("Member",)
+STAFF = ("Trainer", "Admin")
+ADMIN = ("Admin",)
+
+# op name -> (who can run it, handler, writes to the DB?)
+OPS = {
+	"login": (ANYONE, opLogin, False),
+	"logout": (ANYONE, opLogout, False),
+	"register": (ANYONE, opRegister, True),
+	"updateMetrics": (MEMBER, opUpdateMetrics, True),
+	"editGoal": (MEMBER, opEditGoal, True),
+	"updatePersonalDetails": (MEMBER, opUpdatePersonalDetails, True),
+	"registerForClass": (MEMBER, opRegisterForClass, True),
+	"trainerAddAvail": (STAFF, opTrainerAddAvail, True),
+	"trainerAddRecurringAvail": (STAFF, opTrainerAddRecurringAvail, True),
+	"createClass": (ADMIN, opCreateClass, True),
+	"showDashboard": (MEMBER, opShowDashboard, False),
+	"getMetricHistory": (MEMBER, opGetMetricHistory, False),
+	"getCurrentMetrics": (MEMBER, opGetCurrentMetrics, False),
+	"metricTrend": (MEMBER, opMetricTrend, False),
+	"listMemberGoals": (MEMBER, opListMemberGoals, False),
+	"availableClasses": (LOGGED_IN, opAvailableClasses, False),
+	"trainerViewAvail": (LOGGED_IN, opTrainerViewAvail, False),
+	"trainerMemberLookup": (STAFF, opTrainerMemberLookup, False),
+	"memberSummary": (STAFF, opMemberSummary, False),
+	"roster": (STAFF, opRoster, False),
+	"clubTrend": (STAFF, opClubTrend, False),
+}
+
+
+# -----------------
+# RUNNER ....
+# -----------------
+
+def runBatch(lines, out, session=None, batch_size=BATCH_SIZE, stop_on_error=False):
+	"""
+	run every op in lines (an iterable of JSON strings) and write one result line per op to out
+	returns a summary dict
+	"""
+	session = session or Session()
+	stats = {"ops": 0, "ok": 0, "failed": 0, "writes": 0, "commits": 0}
+	started = time.perf_counter()
+
+	with session.connection() as conn:
+		cur = conn.cursor()
+		pending_writes = 0
+		try:
+			for line_no, line in enumerate(lines, start=1):
+				line = line.strip()
+				if not line or line.startswith("#"):
+					continue
+				stats["ops"] += 1
+				result = {"line": line_no}
+				try:
+					op = json.loads(line)
+					if not isinstance(op, dict):
+						raise service.ServiceError("each line must be a JSON object")
+					name = op.get("op")
+					result["op"] = name
+					if name not in OPS:
+						raise service.ServiceError(f"unknown op '{name}'")
+					roles, handler, writes = OPS[name]
+					if roles is not ANYONE and session.currentRole not in roles:
+						raise service.ServiceError(f"'{name}' is only available to: {', '.join(roles)}")
+				except (ValueError, service.ServiceError) as e:
+					result.update(ok=False, error=str(e))
+					stats["failed"] += 1
+					out.write(json.dumps(result) + "\n")
+					if stop_on_error:
+						break
+					continue
+
+				# savepoint per op: a failing op only undoes itself, not the whole group
+				cur.execute("SAVEPOINT batch_op;")
+				try:
+					result["result"] = handler(session, conn, op)
+					cur.execute("RELEASE SAVEPOINT batch_op;")
+					result["ok"] = True
+					stats["ok"] += 1
+					if writes:
+						stats["writes"] += 1
+						pending_writes += 1
+				except Exception as e:
+					cur.execute("ROLLBACK TO SAVEPOINT batch_op;")
+					result.update(ok=False, error=str(e).strip())
+					stats["failed"] += 1
+				out.write(json.dumps(result, default=_jsonDefault) + "\n")
+
+				if pending_writes >= batch_size:
+					conn.commit()
+					stats["commits"] += 1
+					pending_writes = 0
+				if stop_on_error and not result["ok"]:
+					break
+
+			conn.commit()
+			if pending_writes:
+				stats["commits"] += 1
+		finally:
+			cur.close()
+
+	stats["seconds"] = round(time.perf_counter() - started, 3)
+	stats["ops_per_sec"] = round(stats["ops"] / stats["seconds"], 1) if stats["seconds"] else None
+	return stats
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Run a JSON-lines file of club operations without prompts")
+	parser.add_argument("ops_file", help="JSON-lines file of operations ('-' for stdin)")
+	parser.add_argument("--output", help="where to write per-op results (default stdout)")
+	parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="writes per transaction")
+	parser.add_argument("--stop-on-error", action="store_true", help="stop at the first failed op")
+	args = parser.parse_args()
+
+	connectToDB(maxconn=1)
+	ops_file = sys.stdin if args.ops_file == "-" else open(args.ops_file, encoding="utf-8")
+	out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+	try:
+		stats = runBatch(ops_file, out, batch_size=max(1, args.batch_size), stop_on_error=args.stop_on_error)
+		print(json.dumps(stats), file=sys.stderr)
+	finally:
+		if ops_file is not sys.stdin:
+			ops_file.close()
+		if out is not sys.stdout:
+			out.close()
+		closeDB()
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,280 @@
+# bench.py
+
+""" benchmark driver: hammers the service layer with N concurrent workers and reports
+	throughput + p50/p95/p99 latency per operation
+	- ops: login, showDashboard, getMetricHistory, browseClasses, registerForClass, trainerMemberLookup,
+	  createClass
+	  (each is the same service.py call the menu/API make, timed from pool checkout to commit)
+	- ids/emails/classes/slots are sampled from the DB up front, so load some data first:
+		python app/datagen.py --reset --members 100000 --metrics 2000000
+	- writes are committed (pass --rollback-writes to leave the data as it was)
+	- "rejected" = the service said no (class full, trainer busy...), "errors" = anything else
+	- run:  python app/bench.py --concurrency 16 --duration 30
+	        python app/bench.py --ops showDashboard=3,login=1 --json results.json
+"""
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from datetime import timedelta
+
+import cache
+import service
+from db import connectToDB, closeDB, connection
+from datagen import FIRST_NAMES, SYLLABLES
+
+# default mix, roughly what a busy evening at the front desk + app looks like
+DEFAULT_MIX = {
+	"login": 2,
+	"showDashboard": 4,
+	"getMetricHistory": 3,
+	"browseClasses": 2,
+	"registerForClass": 1,
+	"trainerMemberLookup": 1,
+	"createClass": 0.2,
+}
+SAMPLE_SIZE = 2000
+
+
+# -----------------
+# SAMPLE DATA ....
+# -----------------
+
+def loadSample(size=SAMPLE_SIZE):
+	"""random members, open classes and trainer slots to aim the operations at"""
+	with connection() as conn:
+		cur = conn.cursor()
+		try:
+			cur.execute("SELECT MIN(member_id), MAX(member_id) FROM members;")
+			lo, hi = cur.fetchone()
+			members = []
+			if lo is not None:
+				ids = [random.randint(lo, hi) for _ in range(size)]
+				cur.execute("SELECT member_id, email, password FROM members WHERE member_id = ANY(%s);", (ids,))
+				members = cur.fetchall()
+
+			cur.execute("SELECT class_id FROM available_classes ORDER BY random() LIMIT %s;", (size,))
+			classes = [row[0] for row in cur.fetchall()]
+
+			cur.execute(
+				"SELECT trainer_id, start_time, end_time FROM trainer_availability "
+				"WHERE end_time - start_time >= INTERVAL '1 hour' AND start_time > NOW() "
+				"ORDER BY random() LIMIT %s;", (size,)
+			)
+			slots = cur.fetchall()
+		finally:
+			cur.close()
+	return {"members": members, "classes": classes, "slots": slots}
+
+
+# -----------------
+# OPERATIONS ....
+# -----------------
+# each one: op(conn, sample, rng, commit) - raise ServiceError when the request gets turned down
+
+def opLogin(conn, sample, rng, commit):
+	member_id, email, password = rng.choice(sample["members"])
+	if service.authenticate(conn, email, password) is None:
+		raise service.NotFound("login failed")
+
+def opShowDashboard(conn, sample, rng, commit):
+	service.getDashboard(conn, rng.choice(sample["members"])[0])
+
+def opGetMetricHistory(conn, sample, rng, commit):
+	service.getMetricHistory(conn, rng.choice(sample["members"])[0])
+
+def opBrowseClasses(conn, sample, rng, commit):
+	# the class list a member pages through: first page, sometimes one trainer's, sometimes a page or two more
+	trainer_id = rng.choice(sample["slots"])[0] if sample["slots"] and rng.random() < 0.3 else None
+	page = service.browseClasses(conn, trainer_id=trainer_id)
+	for _ in range(rng.randrange(3)):
+		if page["next"] is None:
+			break
+		page = service.browseClasses(conn, trainer_id=trainer_id, after=page["next"])
+
+def opRegisterForClass(conn, sample, rng, commit):
+	service.registerForClass(conn, rng.choice(sample["members"])[0], rng.choice(sample["classes"]))
+	commit(conn)
+
+def opTrainerMemberLookup(conn, sample, rng, commit):
+	# half full first names, half a fragment of a last name
+	query = rng.choice(FIRST_NAMES) if rng.random() < 0.5 else rng.choice(SYLLABLES) + rng.choice(SYLLABLES)
+	service.searchMembers(conn, query)
+
+def opCreateClass(conn, sample, rng, commit):
+	trainer_id, slot_start, slot_end = rng.choice(sample["slots"])
+	hours = int((slot_end - slot_start) / timedelta(hours=1))
+	start = slot_start + timedelta(hours=rng.randrange(hours))
+	end = start + timedelta(hours=1)
+	rooms = service.listFreeRooms(conn, start, end)
+	if not rooms:
+		raise service.Conflict("no free room")
+	service.createClass(conn, trainer_id, rng.choice(rooms)["room_id"], start, end, rng.choice(("group", "private")))
+	commit(conn)
+
+OPS = {
+	"login": (opLogin, "members"),
+	"showDashboard": (opShowDashboard, "members"),
+	"getMetricHistory": (opGetMetricHistory, "members"),
+	"browseClasses": (opBrowseClasses, None),
+	"registerForClass": (opRegisterForClass, "classes"),
+	"trainerMemberLookup": (opTrainerMemberLookup, None),
+	"createClass": (opCreateClass, "slots"),
+}
+
+
+# -----------------
+# RUNNER ....
+# -----------------
+
+def percentile(sorted_values, pct):
+	"""nearest-rank percentile of an already sorted list"""
+	if not sorted_values:
+		return None
+	rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+	return sorted_values[min(rank, len(sorted_values)) - 1]
+
+def _worker(worker_id, mix, sample, commit, seed, stop, measuring, results):
+	rng = random.Random(None if seed is None else seed + worker_id)
+	names = list(mix)
+	weights = [mix[name] for name in names]
+	# per-thread buckets, merged once at the end (no lock in the hot path)
+	mine = {name: {"latencies": [], "ok": 0, "rejected": 0, "errors": 0} for name in names}
+	results.append(mine)
+
+	while not stop.is_set():
+		name = rng.choices(names, weights)[0]
+		op = OPS[name][0]
+		started = time.perf_counter()
+		outcome = "ok"
+		try:
+			with connection() as conn:
+				op(conn, sample, rng, commit)
+		except service.ServiceError:
+			outcome = "rejected"
+		except Exception:
+			outcome = "errors"
+		took = time.perf_counter() - started
+		if measuring.is_set():
+			bucket = mine[name]
+			bucket["latencies"].append(took)
+			bucket[outcome] += 1
+
+def runBenchmark(mix, concurrency=8, duration=30.0, warmup=3.0, rollback_writes=False, seed=None, sample=None):
+	"""run the mix for duration seconds (after warmup) and return the per-op report dict"""
+	sample = sample or loadSample()
+	for name in list(mix):
+		needs = OPS[name][1]
+		if needs and not sample[needs]:
+			print(f"skipping {name}: no {needs} in the DB to use")
+			mix.pop(name)
+	if not mix:
+		raise SystemExit("nothing to run, load some data first (python app/datagen.py)")
+
+	commit = (lambda conn: conn.rollback()) if rollback_writes else (lambda conn: conn.commit())
+	stop = threading.Event()
+	measuring = threading.Event()
+	results = []
+	threads = [
+		threading.Thread(target=_worker, args=(i, mix, sample, commit, seed, stop, measuring, results), daemon=True)
+		for i in range(concurrency)
+	]
+	for thread in threads:
+		thread.start()
+	time.sleep(warmup)
+	cache.members.resetStats()
+	measuring.set()
+	started = time.perf_counter()
+	time.sleep(duration)
+	measuring.clear()
+	elapsed = time.perf_counter() - started
+	stop.set()
+	for thread in threads:
+		thread.join()
+
+	report = {"concurrency": concurrency, "seconds": round(elapsed, 2), "ops": {}, "cache": cache.members.stats()}
+	everything = []
+	for name in mix:
+		latencies = sorted(t for bucket in results for t in bucket[name]["latencies"])
+		everything.extend(latencies)
+		report["ops"][name] = _summary(latencies, elapsed, **{
+			outcome: sum(bucket[name][outcome] for bucket in results) for outcome in ("ok", "rejected", "errors")
+		})
+	everything.sort()
+	report["total"] = _summary(everything, elapsed, **{
+		outcome: sum(op[outcome] for op in report["ops"].values()) for outcome in ("ok", "rejected", "errors")
+	})
+	return report
+
+def _summary(latencies, elapsed, ok, rejected, errors):
+	ms = lambda seconds: None if seconds is None else round(seconds * 1000, 2)
+	return {
+		"count": len(latencies), "ok": ok, "rejected": rejected, "errors": errors,
+		"ops_per_sec": round(len(latencies) / elapsed, 1) if elapsed else None,
+		"p50_ms": ms(percentile(latencies, 50)),
+		"p95_ms": ms(percentile(latencies, 95)),
+		"p99_ms": ms(percentile(latencies, 99)),
+		"max_ms": ms(latencies[-1] if latencies else None),
+	}
+
+def printReport(report):
+	print(f"\n{report['concurrency']} workers, {report['seconds']}s measured")
+	stats = report.get("cache")
+	if stats and stats["ttl"] > 0:
+		print(f"member cache: {stats['hits']} hits, {stats['misses']} misses (hit rate {stats['hit_rate']}), "
+			  f"{stats['members']} members cached, {stats['evictions']} evictions")
+	print()
+	header = f"{'operation':<22}{'count':>9}{'ok':>9}{'rejected':>10}{'errors':>8}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+	print(header)
+	print("-" * len(header))
+	rows = list(report["ops"].items()) + [("TOTAL", report["total"])]
+	for name, s in rows:
+		fmt = lambda v: "-" if v is None else f"{v:.2f}"
+		print(f"{name:<22}{s['count']:>9}{s['ok']:>9}{s['rejected']:>10}{s['errors']:>8}{s['ops_per_sec'] or 0:>10.1f}"
+			  f"{fmt(s['p50_ms']):>10}{fmt(s['p95_ms']):>10}{fmt(s['p99_ms']):>10}{fmt(s['max_ms']):>10}")
+	print()
+
+def _parseMix(text):
+	mix = {}
+	for part in text.split(","):
+		name, _, weight = part.strip().partition("=")
+		if name not in OPS:
+			raise argparse.ArgumentTypeError(f"unknown op '{name}' (pick from {', '.join(OPS)})")
+		try:
+			mix[name] = float(weight) if weight else 1.0
+		except ValueError:
+			raise argparse.ArgumentTypeError(f"weight for {name} must be a number")
+	return mix
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Concurrent benchmark of the club's main operations")
+	parser.add_argument("--concurrency", type=int, default=8, help="worker threads (= pooled connections)")
+	parser.add_argument("--duration", type=float, default=30, help="seconds to measure")
+	parser.add_argument("--warmup", type=float, default=3, help="seconds to run before measuring")
+	parser.add_argument("--ops", type=_parseMix, help="op=weight,... (default: " +
+						",".join(f"{k}={v}" for k, v in DEFAULT_MIX.items()) + ")")
+	parser.add_argument("--rollback-writes", action="store_true", help="roll back registerForClass/createClass")
+	parser.add_argument("--seed", type=int, help="random seed for the workers")
+	parser.add_argument("--json", help="also write the report to this file")
+	args = parser.parse_args()
+
+	if args.concurrency < 1 or args.duration <= 0:
+		parser.error("need --concurrency >= 1 and --duration > 0")
+
+	connectToDB(minconn=args.concurrency, maxconn=args.concurrency)
+	try:
+		report = runBenchmark(dict(args.ops or DEFAULT_MIX), args.concurrency, args.duration,
+							  max(0.0, args.warmup), args.rollback_writes, args.seed)
+	finally:
+		closeDB()
+	printReport(report)
+	if args.json:
+		with open(args.json, "w", encoding="utf-8") as f:
+			json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,174 @@
+# cache.py
+import copy
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# read-through cache of per-member data (profile, latest metrics, goals, dashboard, staff summary)
+# - bounded LRU by member: the least recently used member is dropped once there are MAX_MEMBERS
+# - every entry also expires after TTL seconds, that bounds how stale anything can get when
+#   another process (ingest.py, a second server) writes
+# - service.py's writes (addMetrics, bulkAddMetrics, updateGoalTarget, updateProfile...) hold() the
+#   members they touch and release() them once their transaction commits or rolls back
+#   (db.ClubConnection runs the release), nothing is cached for a held member, so uncommitted
+#   data never gets in, and after the release the next read goes to the DB
+# - every invalidate/release bumps the member's generation, a load that was running across one
+#   (it may have read the old rows) is handed back but not cached
+# - CLUB_CACHE_TTL=0 turns it off, CLUB_CACHE_SIZE sets MAX_MEMBERS, stats() has the counters
+
+MAX_MEMBERS = 10000
+TTL = 30.0 # seconds
+
+
+class MemberCache:
+    def __init__(self, max_members: int = MAX_MEMBERS, ttl: float = TTL):
+        self.max_members = max_members
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._members = OrderedDict() # member_id -> {kind: (expires_at, value)}, oldest first
+        self._clock = 0               # bumped by every invalidation
+        self._generations = {}        # member_id -> _clock when it was last invalidated
+        self._forgotten = 0           # _clock when _generations was last emptied
+        self._held = {}               # member_id -> open transactions that wrote it
+        self._held_all = 0            # open transactions that wrote everyone
+        self._counts = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "invalidations": 0, "discarded": 0}
+
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_members > 0
+
+    def get(self, member_id: int, kind: str, loader):
+        """cached value for (member, kind) or loader() (which is then cached), a copy either way"""
+        if not self.enabled():
+            return loader()
+        now = time.monotonic()
+        with self._lock:
+            entries = self._members.get(member_id)
+            entry = entries.get(kind) if entries else None
+            if entry is not None and entry[0] > now:
+                self._members.move_to_end(member_id)
+                self._counts["hits"] += 1
+                return copy.deepcopy(entry[1])
+            if entry is not None:
+                del entries[kind]
+                self._counts["expired"] += 1
+            self._counts["misses"] += 1
+            started = self._clock
+
+        value = loader() # outside the lock, it's a DB round trip
+        with self._lock:
+            if self._held_all or self._held.get(member_id) or self._generation(member_id) > started:
+                # written while we were loading (or still being written), don't keep it
+                self._counts["discarded"] += 1
+                return value
+            entries = self._members.get(member_id)
+            if entries is None:
+                entries = self._members[member_id] = {}
+            else:
+                self._members.move_to_end(member_id)
+            entries[kind] = (time.monotonic() + self.ttl, copy.deepcopy(value))
+            while len(self._members) > self.max_members:
+                self._members.popitem(last=False)
+                self._counts["evictions"] += 1
+        return value
+
+    def _generation(self, member_id: int) -> int:
+        # caller holds the lock
+        return self._generations.get(member_id, self._forgotten)
+
+    def _invalidate(self, member_id: int, kinds=None):
+        # caller holds the lock
+        self._clock += 1
+        self._generations[member_id] = self._clock
+        if len(self._generations) > max(self.max_members, 1):
+            # keep this bounded, loads running right now get discarded instead of compared
+            self._generations.clear()
+            self._forgotten = self._clock
+        entries = self._members.get(member_id)
+        if entries is None:
+            return
+        if kinds is None:
+            del self._members[member_id]
+        else:
+            for kind in kinds:
+                entries.pop(kind, None)
+        self._counts["invalidations"] += 1
+
+    def invalidate(self, member_id: int, kinds=None):
+        """drop everything (or just kinds) cached for a member, loads already running aren't kept"""
+        with self._lock:
+            self._invalidate(member_id, kinds)
+
+    def invalidateMany(self, member_ids):
+        with self._lock:
+            for member_id in member_ids:
+                self._invalidate(member_id)
+
+    def hold(self, member_ids=None):
+        """
+        a transaction is writing member_ids (None: everyone): drop what's cached for them and
+        cache nothing more until the matching release()
+        """
+        with self._lock:
+            if member_ids is None:
+                self._held_all += 1
+                self._clear()
+                return
+            for member_id in member_ids:
+                self._held[member_id] = self._held.get(member_id, 0) + 1
+                self._invalidate(member_id)
+
+    def release(self, member_ids=None):
+        """that transaction committed or rolled back: drop anything cached since, caching resumes"""
+        with self._lock:
+            if member_ids is None:
+                self._held_all -= 1
+                self._clear()
+                return
+            for member_id in member_ids:
+                left = self._held.get(member_id, 0) - 1
+                if left > 0:
+                    self._held[member_id] = left
+                else:
+                    self._held.pop(member_id, None)
+                self._invalidate(member_id)
+
+    def _clear(self):
+        # caller holds the lock
+        self._members.clear()
+        self._generations.clear()
+        self._clock += 1
+        self._forgotten = self._clock
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._counts["hits"] + self._counts["misses"]
+            return dict(
+                self._counts,
+                members=len(self._members),
+                held=len(self._held) + self._held_all,
+                hit_rate=round(self._counts["hits"] / lookups, 3) if lookups else None,
+                ttl=self.ttl,
+                max_members=self.max_members,
+            )
+
+    def resetStats(self):
+        with self._lock:
+            for key in self._counts:
+                self._counts[key] = 0
+
+
+def _fromEnv() -> MemberCache:
+    try:
+        ttl = float(os.environ.get("CLUB_CACHE_TTL", TTL))
+        size = int(os.environ.get("CLUB_CACHE_SIZE", MAX_MEMBERS))
+    except ValueError:
+        ttl, size = TTL, MAX_MEMBERS
+    return MemberCache(size, ttl)
+
+# the process wide cache service.py uses
+members = _fromEnv()
@@ -0,0 +1,346 @@
+# datagen.py
+
+""" synthetic data generator for load testing
+	- adds members, metrics, goals, trainers, availability, rooms, classes and registrations
+	  on top of whatever is already in the DB (run with --reset to start from DDL/DML)
+	- everything goes in with COPY, rows are streamed so 100M metrics don't need 100M rows of memory
+	- the goals trigger is told to step aside (club.bulk_load) while metrics load, goals are
+	  written with their final current_metric instead (same end result, way faster)
+	- as a superuser FK checks are skipped too (session_replication_role = replica)
+	- generated members/trainers log in with password "bench", emails look like member123@bench.test
+	- run:  python app/datagen.py --members 1000000 --metrics 100000000 --classes 10000
+"""
+
+import argparse
+import io
+import itertools
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+import service
+from db import connectToDB, closeDB, connection, resetDB
+
+PASSWORD = "bench"
+EMAIL_DOMAIN = "bench.test"
+
+FIRST_NAMES = [
+	"Olivia", "Liam", "Emma", "Noah", "Amelia", "Oliver", "Sophia", "Elijah", "Ava", "Lucas",
+	"Mia", "Mateo", "Isabella", "Levi", "Evelyn", "Asher", "Harper", "James", "Luna", "Leo",
+	"Chloe", "Ethan", "Aria", "Kai", "Zoe", "Aiden", "Nora", "Wei", "Priya", "Omar",
+	"Fatima", "Hiro", "Yuna", "Diego", "Sofia", "Ahmed", "Layla", "Ravi", "Ananya", "Jin",
+]
+SYLLABLES = ["an", "bel", "cor", "da", "el", "fen", "gar", "ho", "is", "jo", "ka", "lin",
+			 "mor", "nu", "o", "pa", "qui", "ro", "sen", "ta", "u", "vin", "wa", "xi", "ya", "zo"]
+SPECIALIZATIONS = ["Strength & Conditioning", "Cardio", "Mobility Coach", "Weight Loss Coaching",
+				   "Sports Performance Conditioning", "Yoga", "Pilates", "Boxing"]
+GENDERS = ["Female", "Male", "Non-binary"]
+CLASS_HOURS = range(6, 22) # one hour class slots inside club hours
+
+
+# -----------------
+# COPY HELPERS ....
+# -----------------
+
+class _RowStream(io.RawIOBase):
+	"""file-like wrapper so copy_expert can pull rows out of a generator a chunk at a time"""
+
+	def __init__(self, lines):
+		self._lines = lines
+		self._buffer = b""
+		self.count = 0
+
+	def readable(self):
+		return True
+
+	def read(self, size=-1):
+		chunks = [self._buffer]
+		length = len(self._buffer)
+		while size < 0 or length < size:
+			# a few hundred lines per encode() keeps the per-row overhead down
+			batch = list(itertools.islice(self._lines, 512))
+			if not batch:
+				break
+			data = "".join(batch).encode("utf-8")
+			chunks.append(data)
+			length += len(data)
+			self.count += len(batch)
+		data = b"".join(chunks)
+		if size < 0:
+			self._buffer = b""
+			return data
+		self._buffer = data[size:]
+		return data[:size]
+
+def _line(*values):
+	"""one COPY text-format line"""
+	return "\t".join("\\N" if v is None else str(v) for v in values) + "\n"
+
+def _copy(cur, table, columns, lines):
+	"""COPY lines (an iterable of COPY text lines, see _line) into table, returns how many went in"""
+	stream = _RowStream(iter(lines))
+	cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", stream, size=1 << 16)
+	return stream.count
+
+def _maxId(cur, table, column):
+	cur.execute(f"SELECT COALESCE(MAX({column}), 0) FROM {table};")
+	return cur.fetchone()[0]
+
+def _syncSequence(cur, table, column):
+	# ids were copied in explicitly, move the SERIAL along so normal inserts don't collide
+	cur.execute(
+		f"SELECT setval(pg_get_serial_sequence('{table}', '{column}'), GREATEST((SELECT MAX({column}) FROM {table}), 1));"
+	)
+
+def _lastName(rng):
+	return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize()
+
+
+# -----------------
+# GENERATORS ....
+# -----------------
+
+def memberRows(rng, first_id, count):
+	for member_id in range(first_id, first_id + count):
+		birthday = date(1950, 1, 1) + timedelta(days=rng.randint(0, 365 * 55))
+		yield _line(member_id, rng.choice(FIRST_NAMES), _lastName(rng), f"member{member_id}@{EMAIL_DOMAIN}",
+					PASSWORD, birthday, rng.choice(GENDERS), rng.randint(0, 50))
+
+def metricRows(rng, first_member, members, total, goals_out, now):
+	"""
+	a random walk per member, newest reading a few days before now
+	each member's final reading is also where their goals start from, those go to goals_out
+	"""
+	per_member, extra = divmod(total, members)
+	random_ = rng.random
+	for offset in range(members):
+		member_id = first_member + offset
+		count = per_member + (1 if offset < extra else 0)
+		weight = rng.uniform(50, 110)
+		body_fat = rng.uniform(12, 38)
+		heart_rate = rng.uniform(55, 90)
+		when = now - timedelta(days=rng.randint(1, 7), minutes=rng.randint(0, 600))
+		when -= timedelta(days=2 * count)
+		when = when.replace(microsecond=0)
+		for _ in range(count):
+			# hot loop (runs once per metric row), so formatted straight into a COPY line
+			when += timedelta(days=2, minutes=int(random_() * 240) - 120)
+			weight = max(40.0, weight + random_() * 1.1 - 0.6)
+			body_fat = min(50.0, max(5.0, body_fat + random_() * 0.55 - 0.3))
+			heart_rate = min(110.0, max(45.0, heart_rate + random_() * 2.9 - 1.5))
+			yield f"{member_id}\t{when}\t{weight:.1f}\t{body_fat:.1f}\t{heart_rate:.1f}\n"
+
+		# ~60% of members have goals, weight most often
+		if count and rng.random() < 0.6:
+			latest = {"weight": weight, "body_fat": body_fat, "heart_rate": heart_rate}
+			for metric_name in rng.sample(("weight", "body_fat", "heart_rate"), rng.randint(1, 3)):
+				current = round(latest[metric_name], 1)
+				target = round(current * rng.uniform(0.8, 0.95), 1)
+				goals_out.write(f"{member_id}\t{metric_name}\t{current:.1f}\t{target:.1f}\n")
+
+def trainerRows(rng, first_id, count):
+	for trainer_id in range(first_id, first_id + count):
+		yield _line(trainer_id, rng.choice(FIRST_NAMES), _lastName(rng), f"trainer{trainer_id}@{EMAIL_DOMAIN}",
+					PASSWORD, rng.choice(SPECIALIZATIONS))
+
+def availabilityRows(rng, first_trainer, trainers, days, start_day):
+	# one block per trainer per day, 3-8 hours long inside club hours
+	for trainer_id in range(first_trainer, first_trainer + trainers):
+		for day in range(days):
+			if rng.random() < 0.2:
+				continue # day off
+			start_hour = rng.randint(6, 14)
+			end_hour = min(22, start_hour + rng.randint(3, 8))
+			base = datetime.combine(start_day + timedelta(days=day), datetime.min.time())
+			yield _line(trainer_id, base + timedelta(hours=start_hour), base + timedelta(hours=end_hour))
+
+def roomRows(rng, first_id, count):
+	for room_id in range(first_id, first_id + count):
+		yield _line(room_id, f"B{room_id}", rng.randint(5, 40))
+
+def classRows(rng, rooms, trainer_ids, member_range, first_booking, first_class, count, days, start_day, regs_out):
+	"""
+	count classes on distinct (room, day, hour) slots so no room is double booked,
+	group classes get some registrations (always leaving a spot open)
+	bookings come out here, classes and registrations are written to regs_out as
+	"C\tclass_id\ttrainer_id\tbooking_id\tattendance" / "R\tclass_id\tmember_id" lines
+	"""
+	hours = len(CLASS_HOURS)
+	slots = rng.sample(range(len(rooms) * days * hours), count)
+	lo, hi = member_range
+	for n, slot in enumerate(slots):
+		room_index, rest = divmod(slot, days * hours)
+		day, hour = divmod(rest, hours)
+		room_id, capacity = rooms[room_index]
+		start = datetime.combine(start_day + timedelta(days=day), datetime.min.time()) + timedelta(hours=CLASS_HOURS[hour])
+		purpose = "private" if rng.random() < 0.2 else "group"
+		booking_id = first_booking + n
+		class_id = first_class + n
+		yield _line(booking_id, room_id, start, start + timedelta(hours=1), purpose)
+
+		attendance = 0
+		if purpose == "group" and capacity > 1 and hi >= lo:
+			attendance = min(rng.randint(0, capacity - 1), hi - lo + 1)
+			for member_id in rng.sample(range(lo, hi + 1), attendance):
+				regs_out.write(f"R\t{class_id}\t{member_id}\n")
+		regs_out.write(f"C\t{class_id}\t{rng.choice(trainer_ids)}\t{booking_id}\t{attendance}\n")
+
+
+# -----------------
+# LOADER ....
+# -----------------
+
+def _step(label, started, rows):
+	took = time.perf_counter() - started
+	rate = rows / took if took else 0
+	print(f"  {label:<22} {rows:>12,} rows  {took:8.1f}s  {rate:>12,.0f} rows/s", flush=True)
+
+def generate(members=1000, metrics=20000, trainers=50, rooms=20, classes=500, days=30, seed=None):
+	"""append a synthetic data set to the DB, everything in one transaction"""
+	rng = random.Random(seed)
+	now = datetime.now().replace(microsecond=0)
+	start_day = date.today() + timedelta(days=1)
+
+	with connection() as conn:
+		cur = conn.cursor()
+		try:
+			# the generated ids are consistent by construction, so as superuser skip the per-row
+			# FK checks for this transaction (about 4x faster on metrics)
+			cur.execute("SELECT rolsuper FROM pg_roles WHERE rolname = current_user;")
+			if cur.fetchone()[0]:
+				cur.execute("SET LOCAL session_replication_role = replica;")
+
+			first_member = _maxId(cur, "members", "member_id") + 1
+			first_trainer = _maxId(cur, "trainers", "trainer_id") + 1
+			first_room = _maxId(cur, "rooms", "room_id") + 1
+			first_booking = _maxId(cur, "room_bookings", "booking_id") + 1
+			first_class = _maxId(cur, "classes", "class_id") + 1
+
+			started = time.perf_counter()
+			n = _copy(cur, "members",
+					  ("member_id", "fname", "lname", "email", "password", "birthday", "gender", "class_count"),
+					  memberRows(rng, first_member, members))
+			_step("members", started, n)
+
+			if members and metrics:
+				started = time.perf_counter()
+				cur.execute("SET LOCAL club.bulk_load = 'on';") # goals trigger steps aside, goals get written below
+				with tempfile.TemporaryFile("w+", encoding="utf-8") as goals_file:
+					n = _copy(cur, "metrics", ("member_id", "metric_date", "weight", "body_fat", "heart_rate"),
+							  metricRows(rng, first_member, members, metrics, goals_file, now))
+					cur.execute("SET LOCAL club.bulk_load = 'off';")
+					_step("metrics", started, n)
+
+					started = time.perf_counter()
+					goals_file.seek(0)
+					cur.copy_expert("COPY goals (member_id, metric_name, current_metric, goal_metric) FROM STDIN", goals_file)
+					_step("goals", started, cur.rowcount)
+
+				# COPY skipped service.addMetrics (and, as superuser, the rollup trigger), so fill in the
+				# dashboard summary, trend rollups and goal forecasts for the new members
+				started = time.perf_counter()
+				n = service.refreshMetricSummary(conn, range(first_member, first_member + members))
+				_step("member_metric_summary", started, n)
+
+				started = time.perf_counter()
+				n = service.refreshMetricRollups(conn, range(first_member, first_member + members))
+				_step("metric_rollups", started, n)
+
+				started = time.perf_counter()
+				n = service.refreshForecasts(conn, range(first_member, first_member + members))
+				_step("metric_forecasts", started, n)
+
+			started = time.perf_counter()
+			n = _copy(cur, "trainers", ("trainer_id", "fname", "lname", "email", "password", "specialization"),
+					  trainerRows(rng, first_trainer, trainers))
+			_step("trainers", started, n)
+
+			started = time.perf_counter()
+			n = _copy(cur, "trainer_availability", ("trainer_id", "start_time", "end_time"),
+					  availabilityRows(rng, first_trainer, trainers, days, start_day))
+			_step("trainer_availability", started, n)
+
+			started = time.perf_counter()
+			n = _copy(cur, "rooms", ("room_id", "room_name", "max_capacity"), roomRows(rng, first_room, rooms))
+			_step("rooms", started, n)
+
+			cur.execute("SELECT room_id, max_capacity FROM rooms WHERE room_id >= %s ORDER BY room_id;", (first_room,))
+			room_list = cur.fetchall()
+			cur.execute("SELECT trainer_id FROM trainers ORDER BY trainer_id;")
+			trainer_ids = [row[0] for row in cur.fetchall()]
+			classes = min(classes, len(room_list) * days * len(CLASS_HOURS))
+			if classes and trainer_ids:
+				started = time.perf_counter()
+				with tempfile.TemporaryFile("w+", encoding="utf-8") as regs_file:
+					n = _copy(cur, "room_bookings", ("booking_id", "room_id", "start_time", "end_time", "purpose"),
+							  classRows(rng, room_list, trainer_ids, (first_member, first_member + members - 1),
+										first_booking, first_class, classes, days, start_day, regs_file))
+					_step("room_bookings", started, n)
+
+					# classes first (registrations point at them)
+					started = time.perf_counter()
+					regs_file.seek(0)
+					n = _copy(cur, "classes", ("class_id", "trainer_id", "booking_id", "attendance"),
+							  (line[2:] for line in regs_file if line[0] == "C"))
+					_step("classes", started, n)
+
+					started = time.perf_counter()
+					regs_file.seek(0)
+					n = _copy(cur, "class_regs", ("class_id", "member_id"),
+							  (line[2:] for line in regs_file if line[0] == "R"))
+					_step("class_regs", started, n)
+
+			for table, column in (("members", "member_id"), ("metrics", "metric_id"), ("goals", "goal_id"),
+								  ("trainers", "trainer_id"), ("trainer_availability", "slot_id"), ("rooms", "room_id"),
+								  ("room_bookings", "booking_id"), ("classes", "class_id"), ("class_regs", "reg_id")):
+				_syncSequence(cur, table, column)
+			conn.commit()
+		finally:
+			cur.close()
+
+		# fresh stats so the planner knows how big things got
+		started = time.perf_counter()
+		old_autocommit = conn.autocommit
+		conn.autocommit = True
+		cur = conn.cursor()
+		try:
+			cur.execute("ANALYZE;")
+		finally:
+			cur.close()
+			conn.autocommit = old_autocommit
+		print(f"  {'ANALYZE':<22} {'':>12}       {time.perf_counter() - started:8.1f}s", flush=True)
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Fill the DB with synthetic data for load testing")
+	parser.add_argument("--members", type=int, default=1000)
+	parser.add_argument("--metrics", type=int, default=20000, help="total metric rows, spread over the new members")
+	parser.add_argument("--trainers", type=int, default=50)
+	parser.add_argument("--rooms", type=int, default=20)
+	parser.add_argument("--classes", type=int, default=500)
+	parser.add_argument("--days", type=int, default=30, help="how many days ahead availability/classes cover")
+	parser.add_argument("--seed", type=int, help="random seed, for repeatable data sets")
+	parser.add_argument("--reset", action="store_true", help="resetDB() (DDL + sample DML) first")
+	args = parser.parse_args()
+
+	if min(args.members, args.metrics, args.trainers, args.rooms, args.classes, args.days) < 0:
+		parser.error("counts can't be negative")
+
+	connectToDB(maxconn=1)
+	try:
+		if args.reset:
+			resetDB()
+		print("Generating data...")
+		started = time.perf_counter()
+		generate(args.members, args.metrics, args.trainers, args.rooms, args.classes, args.days, args.seed)
+		print(f"Done in {time.perf_counter() - started:.1f}s")
+	except KeyboardInterrupt:
+		print("\nStopped, nothing was committed.")
+		sys.exit(1)
+	finally:
+		closeDB()
+
+if __name__ == "__main__":
+	main()
@@ -1,56 +1,698 @@
 # db.py
+import hashlib
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
 import psycopg2
+import psycopg2.extensions
+import psycopg2.sql
+import cache
+import scheduler
+import service
+import instrument
 import state
 
-# connectToDB() and resetDB()
+# connectToDB(), closeDB(), connection() and resetDB()
+# resetDB() clones FinalProject from a seeded template DB (rebuilt only when the sql files change)
+# migrate() applies new sql/migrations/NNNN_name.sql files (python app/db.py migrate)
+# ConnectionPool is what every module checks connections out of, its connections are ClubConnections
+# CLUB_PROFILE=1 makes the pool hand out instrumented connections (see instrument.py)
+
+# settings for every connection the pool opens
+DB_PARAMS = {
+    "dbname": "FinalProject",
+    "user": "postgres",
+    "password": "password", # GLORIA CHANGE IF TESTING TESTING ******** CHANGE THIS IF UR TESTING
+    "host": "localhost",
+    "port": "5432",
+}
+
+# pool sizing (per process)
+POOL_MIN = 1
+POOL_MAX = 10
+POOL_IDLE_TIMEOUT = 300     # seconds an extra idle connection is kept before being closed
+POOL_PING_AFTER = 30        # seconds idle before we SELECT 1 on checkout
+POOL_CHECKOUT_TIMEOUT = 30  # seconds to wait for a free connection when the pool is maxed out
+
+# resetDB() settings
+SEED_FILES = ["./sql/DDL.sql", "./sql/DML.sql"] # what the template is built from, in order
+TEMPLATE_DB = DB_PARAMS["dbname"] + "_template"
+MAINTENANCE_DB = "postgres" # where CREATE/DROP DATABASE run from (can't drop the DB you're connected to)
+RESET_FROM_TEMPLATE = True  # False = always re-run the sql files (the old way)
+FORCE_DROP_VERSION = 130000 # DROP DATABASE ... WITH (FORCE) needs PostgreSQL 13+, older ones use the sql files
+
+# migrate() settings
+MIGRATIONS_DIR = "./sql/migrations"
+MIGRATION_LOCK_TIMEOUT = "5s" # give up instead of queueing live traffic behind a blocked ALTER
+
+
+class PoolExhausted(Exception):
+    """raised when no connection frees up within the checkout timeout"""
+
+
+# -----------------
+# CONNECTION POOL ....
+# -----------------
+
+class ClubConnection(psycopg2.extensions.connection):
+    """
+    psycopg2 connection that can run code once the current transaction is over
+    service.py's writes use it to drop cached reads (cache.py, scheduler.py) only after they
+    commit, so nobody can re-cache the rows from before the write in between
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._after_transaction = []
+
+    def afterTransaction(self, fn):
+        """fn() after the next commit or rollback (or close), right away in autocommit mode"""
+        if self.autocommit:
+            fn()
+        else:
+            self._after_transaction.append(fn)
+
+    def _runAfterTransaction(self):
+        hooks, self._after_transaction = self._after_transaction, []
+        for fn in hooks:
+            fn()
+
+    def commit(self):
+        try:
+            super().commit()
+        finally:
+            self._runAfterTransaction()
+
+    def rollback(self):
+        try:
+            super().rollback()
+        finally:
+            self._runAfterTransaction()
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self._runAfterTransaction()
+
+
+class _InstrumentedClubConnection(instrument.InstrumentedConnection, ClubConnection):
+    """CLUB_PROFILE=1: timed like instrument.InstrumentedConnection, hooks like ClubConnection"""
+
+
+class ConnectionPool:
+    """
+    thread-safe pool of psycopg2 connections
+    - opens minconn connections up front, never more than maxconn at once
+    - checkout: hands back the most recently returned idle connection,
+      pinging it first if it sat idle for a while (dead ones get replaced)
+    - return: rolls back anything left uncommitted so the next user starts clean
+    - idle connections above minconn are closed after idle_timeout
+    """
+
+    def __init__(self, minconn=POOL_MIN, maxconn=POOL_MAX, idle_timeout=POOL_IDLE_TIMEOUT,
+                 ping_after=POOL_PING_AFTER, checkout_timeout=POOL_CHECKOUT_TIMEOUT, **params):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError("pool needs 0 <= minconn <= maxconn and maxconn >= 1")
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.idle_timeout = idle_timeout
+        self.ping_after = ping_after
+        self.checkout_timeout = checkout_timeout
+        self.params = params
+
+        self._idle = []      # (conn, returned_at) pairs, newest at the end
+        self._in_use = set() # ids of checked out connections
+        self._opened = 0     # idle + in use + being returned/closed right now
+        self._closed = False
+        self._cond = threading.Condition()
+
+        for _ in range(minconn):
+            self._idle.append((self._open(), time.monotonic()))
+            self._opened += 1
+
+    def _open(self):
+        return psycopg2.connect(**self.params)
+
+    @staticmethod
+    def _close(conn):
+        # never called with the lock held, close() is a round trip and runs the after-transaction hooks
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _healthy(self, conn, idle_for):
+        if conn.closed:
+            return False
+        if idle_for < self.ping_after:
+            return True
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1;")
+            cur.close()
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def getconn(self):
+        """check a connection out of the pool (blocks while the pool is maxed out)"""
+        deadline = time.monotonic() + self.checkout_timeout
+        while True:
+            # pick an idle connection or reserve a slot for a new one while holding the lock,
+            # the actual network round trips happen outside of it
+            conn = None
+            idle_for = 0.0
+            stale = []
+            try:
+                with self._cond:
+                    while True:
+                        if self._closed:
+                            raise PoolExhausted("connection pool is closed")
+                        stale += self._reap()
+                        if self._idle:
+                            conn, returned_at = self._idle.pop()
+                            idle_for = time.monotonic() - returned_at
+                            break
+                        if self._opened < self.maxconn:
+                            self._opened += 1
+                            break
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise PoolExhausted(f"no free DB connection after {self.checkout_timeout}s (max {self.maxconn})")
+                        self._cond.wait(remaining)
+            finally:
+                for old in stale:
+                    self._close(old)
+
+            if conn is None:
+                try:
+                    conn = self._open()
+                except Exception:
+                    with self._cond:
+                        self._opened -= 1
+                        self._cond.notify()
+                    raise
+            elif not self._healthy(conn, idle_for):
+                self._close(conn)
+                with self._cond:
+                    self._opened -= 1
+                    self._cond.notify()
+                continue
+
+            with self._cond:
+                self._in_use.add(id(conn))
+            return conn
+
+    def putconn(self, conn):
+        """return a connection; uncommitted work is rolled back, broken connections are dropped"""
+        with self._cond:
+            if id(conn) not in self._in_use:
+                return
+            self._in_use.discard(id(conn))
+            keep = not self._closed
+
+        # the rollback is a round trip (and runs the after-transaction hooks), its slot stays
+        # counted in _opened meanwhile so nobody opens one over maxconn
+        if keep and not conn.closed:
+            try:
+                if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except Exception:
+                keep = False
+        else:
+            keep = False
+        if not keep:
+            self._close(conn)
+
+        closing = None
+        with self._cond:
+            if keep and not self._closed:
+                self._idle.append((conn, time.monotonic()))
+            else:
+                self._opened -= 1
+                if keep:
+                    closing = conn # the pool was closed while we rolled back
+            stale = self._reap()
+            self._cond.notify()
+        for old in stale + ([closing] if closing is not None else []):
+            self._close(old)
+
+    def _reap(self):
+        """
+        take idle connections over minconn that passed idle_timeout out of the pool (caller holds
+        the lock) and return them, the caller closes them once it has let go of the lock
+        """
+        # oldest idle connections sit at the front of the list
+        now = time.monotonic()
+        stale = []
+        while self._idle and self._opened > self.minconn:
+            conn, returned_at = self._idle[0]
+            if now - returned_at < self.idle_timeout:
+                break
+            self._idle.pop(0)
+            self._opened -= 1
+            stale.append(conn)
+        return stale
+
+    def reapIdle(self):
+        """close idle connections over minconn that passed idle_timeout"""
+        with self._cond:
+            stale = self._reap()
+        for conn in stale:
+            self._close(conn)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "open": self._opened,
+                "idle": len(self._idle),
+                "in_use": len(self._in_use),
+                "min": self.minconn,
+                "max": self.maxconn,
+            }
+
+    def closeAll(self):
+        """close idle connections now; ones still checked out are closed when returned"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._opened -= len(idle)
+            self._cond.notify_all()
+        for conn, _ in idle:
+            self._close(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self.getconn()
+        try:
+            yield conn
+        except Exception:
+            if not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            self.putconn(conn)
+
 
 # -----------------
 # GENERAL FUNCTIONS ....
 # -----------------
 
-def connectToDB():
-	state.conn = psycopg2.connect(
-		dbname="FinalProject",
-		user="postgres",
-		password="password", # GLORIA CHANGE IF TESTING TESTING ******** CHANGE THIS IF UR TESTING
-		host="localhost",
-		port="5432"
-	)
-
-def resetDB():
-    conn = state.conn
-    if conn is None:
-        print("No DB Connection; call connectToDB() first")
+def connectToDB(minconn: int = POOL_MIN, maxconn: int = POOL_MAX):
+    if state.pool is not None:
         return
+    instrument.enableFromEnv()
+    params = dict(DB_PARAMS)
+    params["connection_factory"] = _InstrumentedClubConnection if instrument.enabled() else ClubConnection
+    state.pool = ConnectionPool(minconn, maxconn, **params)
+
+def closeDB():
+    if state.pool is not None:
+        state.pool.closeAll()
+        state.pool = None
+
+@contextmanager
+def connection():
+    """
+    with connection() as conn:
+        cur = conn.cursor()
+        ...
+        conn.commit()
+    whatever isn't committed when the block ends is rolled back
+    """
+    if state.pool is None:
+        raise RuntimeError("No DB Connection; call connectToDB() first")
+    with state.pool.connection() as conn:
+        yield conn
+
+# -----------------
+# MIGRATIONS ....
+# -----------------
+# DDL.sql is the base schema, every change after it is a file in sql/migrations:
+#   0001_some_name.sql, 0002_..., applied in order, each one once (tracked in schema_migrations)
+# normal files run in one transaction together with their schema_migrations row
+# a file whose first line is "-- migrate: no-transaction" runs statement by statement in
+# autocommit instead, that's needed for CREATE INDEX CONCURRENTLY (builds without blocking writes)
+#   -> write those so they can be re-run (IF NOT EXISTS), if one dies halfway nothing is recorded
+#      and an INVALID index it left behind is dropped before the next try
+# a "-- migrate: needs-extension NAME" line skips the file (unrecorded, retried next time) when the
+# server doesn't ship that extension, e.g. pg_trgm without postgres' contrib package
 
+_MIGRATION_FILE = re.compile(r"^(\d+)_([\w-]+)\.sql$")
+_NEEDS_EXTENSION = re.compile(r"^--\s*migrate:\s*needs-extension\s+(\w+)", re.IGNORECASE | re.MULTILINE)
+_CONCURRENT_INDEX = re.compile(
+    r"CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)", re.IGNORECASE
+)
+
+def migrationFiles():
+    """[(version, name, path)] in version order"""
+    try:
+        names = os.listdir(MIGRATIONS_DIR)
+    except FileNotFoundError:
+        return []
+    files = []
+    for filename in names:
+        match = _MIGRATION_FILE.match(filename)
+        if match:
+            files.append((int(match.group(1)), match.group(2), os.path.join(MIGRATIONS_DIR, filename)))
+    files.sort()
+    versions = [version for version, _, _ in files]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f"two migration files share a version number in {MIGRATIONS_DIR}")
+    return files
+
+def _fileChecksum(path) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def _splitStatements(sql_text):
+    """split on ; at the end of a line (good enough for no-transaction files, no functions in those)"""
+    lines = [line for line in sql_text.splitlines() if not line.strip().startswith("--")]
+    statements, current = [], []
+    for line in lines:
+        current.append(line)
+        if line.rstrip().endswith(";"):
+            statements.append("\n".join(current).strip())
+            current = []
+    if "\n".join(current).strip():
+        statements.append("\n".join(current).strip())
+    return statements
+
+def _ensureMigrationsTable(conn):
     cur = conn.cursor()
     try:
-        # RUNNING SCHEMA DDL
-        with open("./sql/DDL.sql", encoding="utf-8") as ddl_file: # I need to put ./ instead of ../ but it may just depend on our computers
-            ddl_sql = ddl_file.read()
-        if ddl_sql.strip():
-            cur.execute(ddl_sql)
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version     INT PRIMARY KEY,
+                name        TEXT NOT NULL,
+                checksum    TEXT NOT NULL,
+                applied_at  TIMESTAMP NOT NULL DEFAULT NOW(),
+                duration_ms INT
+            );
+            """
+        )
+        conn.commit()
+    finally:
+        cur.close()
+
+def appliedMigrations(conn):
+    """{version: checksum} of what's already in the DB"""
+    _ensureMigrationsTable(conn)
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT version, checksum FROM schema_migrations;")
+        applied = dict(cur.fetchall())
+        conn.commit()
+        return applied
+    finally:
+        cur.close()
+
+def _dropInvalidIndex(cur, index_name):
+    cur.execute(
+        "SELECT 1 FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid "
+        "WHERE c.relname = %s AND NOT i.indisvalid;", (index_name,)
+    )
+    if cur.fetchone():
+        cur.execute(psycopg2.sql.SQL("DROP INDEX CONCURRENTLY IF EXISTS {};").format(psycopg2.sql.Identifier(index_name)))
+
+def _missingExtensions(conn, path):
+    """the extensions path asks for (needs-extension) that this server doesn't have"""
+    with open(path, encoding="utf-8") as f:
+        wanted = _NEEDS_EXTENSION.findall(f.read())
+    if not wanted:
+        return []
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT name FROM pg_available_extensions WHERE name = ANY(%s);", (wanted,))
+        available = {row[0] for row in cur.fetchall()}
+        conn.commit()
+    finally:
+        cur.close()
+    return [name for name in wanted if name not in available]
+
+def _applyMigration(conn, version, name, path, checksum):
+    with open(path, encoding="utf-8") as f:
+        sql_text = f.read()
+    no_transaction = sql_text.lstrip().lower().startswith("-- migrate: no-transaction")
+    started = time.perf_counter()
+    cur = conn.cursor()
+    try:
+        if no_transaction:
+            conn.autocommit = True
+            try:
+                cur.execute("SET lock_timeout = %s;", (MIGRATION_LOCK_TIMEOUT,))
+                for statement in _splitStatements(sql_text):
+                    index = _CONCURRENT_INDEX.search(statement)
+                    if index:
+                        _dropInvalidIndex(cur, index.group(1))
+                    cur.execute(statement)
+            finally:
+                # SET outside a transaction sticks to the session, and this
+                # connection goes back to the pool even when a statement failed
+                try:
+                    cur.execute("RESET lock_timeout;")
+                    conn.autocommit = False
+                except psycopg2.Error:
+                    conn.close() # can't reset it, don't let the pool hand it out
+            cur.execute(
+                "INSERT INTO schema_migrations (version, name, checksum, duration_ms) VALUES (%s, %s, %s, %s);",
+                (version, name, checksum, int((time.perf_counter() - started) * 1000))
+            )
             conn.commit()
         else:
+            cur.execute("SET LOCAL lock_timeout = %s;", (MIGRATION_LOCK_TIMEOUT,))
+            cur.execute(sql_text)
+            cur.execute(
+                "INSERT INTO schema_migrations (version, name, checksum, duration_ms) VALUES (%s, %s, %s, %s);",
+                (version, name, checksum, int((time.perf_counter() - started) * 1000))
+            )
+            conn.commit()
+    except Exception:
+        if not conn.closed:
+            conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+def migrate(conn=None, verbose=True):
+    """
+    apply every migration file that isn't in schema_migrations yet, oldest first
+    stops at the first one that fails (earlier ones stay applied)
+    returns the versions that were applied
+    """
+    if conn is None:
+        with connection() as pooled:
+            return migrate(pooled, verbose)
+
+    _ensureMigrationsTable(conn)
+    cur = conn.cursor()
+    try:
+        # one migrator at a time (session level lock, survives the commits below)
+        cur.execute("SELECT pg_advisory_lock(hashtext('schema_migrations'));")
+        conn.commit()
+        applied = appliedMigrations(conn) # someone may have finished while we waited
+        done = []
+        for version, name, path in migrationFiles():
+            checksum = _fileChecksum(path)
+            if version in applied:
+                if applied[version] != checksum and verbose:
+                    print(f"warning: migration {version:04d}_{name} changed after it was applied (not re-run)")
+                continue
+            missing = _missingExtensions(conn, path)
+            if missing:
+                if verbose:
+                    print(f"skipping migration {version:04d}_{name}: this server doesn't have {', '.join(missing)}")
+                continue
+            if verbose:
+                print(f"applying migration {version:04d}_{name}...", flush=True)
+            _applyMigration(conn, version, name, path, checksum)
+            done.append(version)
+        if done:
+            service.forgetTrigram() # a migration may have added pg_trgm
+        return done
+    finally:
+        cur.execute("SELECT pg_advisory_unlock(hashtext('schema_migrations'));")
+        conn.commit()
+        cur.close()
+
+def migrationStatus(conn):
+    """[(version, name, applied?)] for every file"""
+    applied = appliedMigrations(conn)
+    return [(version, name, version in applied) for version, name, _ in migrationFiles()]
+
+
+def _runSeedScripts(conn):
+    """run DDL.sql then DML.sql on conn and commit, returns False if DDL.sql is empty"""
+    cur = conn.cursor()
+    try:
+        # RUNNING SCHEMA DDL
+        with open(SEED_FILES[0], encoding="utf-8") as ddl_file: # I need to put ./ instead of ../ but it may just depend on our computers
+            ddl_sql = ddl_file.read()
+        if not ddl_sql.strip():
             print("DDL.sql appears to be empty. Check sql/DDL.sql.")
-            cur.close()
-            return
+            return False
+        cur.execute(ddl_sql)
+        conn.commit()
 
         # DML SAMPLE DATA RUNNING
         try:
-            with open("./sql/DML.sql", encoding="utf-8") as dml_file: # I need to put ./ instead of ../ but it may just depend on our computers
+            with open(SEED_FILES[1], encoding="utf-8") as dml_file: # I need to put ./ instead of ../ but it may just depend on our computers
                 dml_sql = dml_file.read()
             if dml_sql.strip():
                 cur.execute(dml_sql)
                 conn.commit()
-                print("\nDatabase successfully reset with sample data!\n")
             else:
                 print("DDL loaded, but DML.sql is empty (no sample data).")
         except FileNotFoundError:
             print("DDL loaded, but DML.sql not found (no sample data).")
+        return True
+    finally:
+        cur.close()
+
+def seedChecksum() -> str:
+    """sha256 of the seed files + migrations, the template gets rebuilt whenever this changes"""
+    digest = hashlib.sha256()
+    for path in SEED_FILES + [path for _, _, path in migrationFiles()]:
+        digest.update(path.encode("utf-8") + b"\0")
+        try:
+            with open(path, "rb") as f:
+                digest.update(f.read())
+        except FileNotFoundError:
+            digest.update(b"<missing>")
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+def _adminConnection():
+    conn = psycopg2.connect(**{**DB_PARAMS, "dbname": MAINTENANCE_DB})
+    conn.autocommit = True # CREATE/DROP DATABASE can't run inside a transaction
+    return conn
+
+def _templateChecksum(cur):
+    # the checksum lives in the template DB's comment, so there's nothing to keep in sync on disk
+    cur.execute(
+        "SELECT shobj_description(oid, 'pg_database') FROM pg_database WHERE datname = %s;", (TEMPLATE_DB,)
+    )
+    row = cur.fetchone()
+    if row is None or not row[0] or not row[0].startswith("seed:"):
+        return None
+    return row[0][len("seed:"):]
+
+def buildTemplate(cur, checksum: str):
+    """(re)create TEMPLATE_DB, run the seed files and migrations in it"""
+    template = psycopg2.sql.Identifier(TEMPLATE_DB)
+    cur.execute(psycopg2.sql.SQL("DROP DATABASE IF EXISTS {};").format(template))
+    cur.execute(psycopg2.sql.SQL("CREATE DATABASE {};").format(template))
+
+    seed_conn = psycopg2.connect(**{**DB_PARAMS, "dbname": TEMPLATE_DB})
+    try:
+        loaded = _runSeedScripts(seed_conn)
+        if loaded:
+            migrate(seed_conn, verbose=False)
+    finally:
+        seed_conn.close()
+    if not loaded:
+        cur.execute(psycopg2.sql.SQL("DROP DATABASE {};").format(template))
+        raise RuntimeError("seed files are empty, template not built")
+    # only stamped once it's fully loaded, a half built template gets rebuilt next time
+    cur.execute(psycopg2.sql.SQL("COMMENT ON DATABASE {} IS {};").format(template, psycopg2.sql.Literal("seed:" + checksum)))
+
+def resetFromTemplate() -> bool:
+    """
+    drop FinalProject and clone it from the template (CREATE DATABASE ... TEMPLATE),
+    building the template first if it's missing or the seed files changed
+    returns True if the template had to be rebuilt
+    note: anyone else connected to FinalProject gets disconnected (DROP ... WITH (FORCE)),
+    close this process's pool first (resetDB() does)
+    """
+    conn = _adminConnection()
+    if conn.server_version < FORCE_DROP_VERSION:
+        conn.close()
+        raise RuntimeError(f"cloning from the template needs PostgreSQL 13+ (server is {conn.server_version})")
+    cur = conn.cursor()
+    try:
+        # one reset at a time, across processes
+        cur.execute("SELECT pg_advisory_lock(hashtext(%s));", (TEMPLATE_DB,))
+        checksum = seedChecksum()
+        rebuilt = _templateChecksum(cur) != checksum
+        if rebuilt:
+            buildTemplate(cur, checksum)
+
+        target = psycopg2.sql.Identifier(DB_PARAMS["dbname"])
+        cur.execute(psycopg2.sql.SQL("DROP DATABASE IF EXISTS {} WITH (FORCE);").format(target))
+        cur.execute(psycopg2.sql.SQL("CREATE DATABASE {} TEMPLATE {};").format(target, psycopg2.sql.Identifier(TEMPLATE_DB)))
+        return rebuilt
+    finally:
+        try:
+            cur.execute("SELECT pg_advisory_unlock(hashtext(%s));", (TEMPLATE_DB,))
+        except psycopg2.Error:
+            pass
+        cur.close()
+        conn.close()
 
-    except Exception as e:
-        print("Couldn't load DDL/DML:", e)
-        conn.rollback()
+def resetDB(use_template: bool = RESET_FROM_TEMPLATE):
+    """
+    for the single user CLI only (app.py option 1, datagen.py --reset), server.py and api.py
+    don't offer it: the database is dropped under everyone connected to it
+    """
+    if state.pool is None:
+        print("No DB Connection; call connectToDB() first")
+        return
+    in_use = state.pool.stats()["in_use"]
+    if in_use:
+        print(f"\nCan't reset while {in_use} connection(s) in this process are using the database.\n")
+        return
+    cache.members.clear() # everything cached is about to be wrong
+    scheduler.engine.clear()
+    service.forgetTrigram()
+
+    if use_template:
+        # the DROP would kill our pooled connections too, close the pool and open a fresh one after
+        minconn, maxconn = state.pool.minconn, state.pool.maxconn
+        closeDB()
+        try:
+            resetFromTemplate()
+            print("\nDatabase successfully reset with sample data!\n")
+            return
+        except (psycopg2.Error, RuntimeError, OSError) as e:
+            # e.g. no CREATEDB permission, fall back to running the files in place
+            print("Template reset didn't work, running DDL/DML instead:", e)
+        finally:
+            connectToDB(minconn, maxconn)
+
+    with connection() as conn:
+        try:
+            # start from an empty schema so tables added by migrations go too
+            cur = conn.cursor()
+            cur.execute("DROP SCHEMA public CASCADE; CREATE SCHEMA public;")
+            cur.close()
+            conn.commit()
+            if _runSeedScripts(conn):
+                migrate(conn, verbose=False)
+                print("\nDatabase successfully reset with sample data!\n")
+        except Exception as e:
+            print("Couldn't load DDL/DML:", e)
+            conn.rollback()
+
+
+if __name__ == "__main__":
+    # python app/db.py migrate | status
+    import sys
+    command = sys.argv[1] if len(sys.argv) > 1 else "status"
+    connectToDB(maxconn=1)
+    try:
+        with connection() as conn:
+            if command == "migrate":
+                applied = migrate(conn)
+                print(f"{len(applied)} migration(s) applied" if applied else "Already up to date.")
+            elif command == "status":
+                for version, name, done in migrationStatus(conn):
+                    print(f"  [{'x' if done else ' '}] {version:04d}_{name}")
+            else:
+                print("usage: python app/db.py [migrate|status]")
     finally:
-        cur.close()
\ No newline at end of file
+        closeDB()
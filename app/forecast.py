@@ -0,0 +1,37 @@
+# forecast.py
+
+""" refits the goal ETA forecasts (metric_forecasts) for many members in one statement
+	- default: only members with new readings since their last fit (the forecast_stale queue
+	  the metrics_forecast_stale trigger fills)
+	- --all: everyone, the 90 day window slides so run this once a day (cron), --stale in between
+	- dashboards don't wait on this: a member whose forecast is stale or older than a day gets
+	  theirs fitted on the spot (read only), this just keeps that rare
+	- run:  python app/forecast.py          (stale members)
+	        python app/forecast.py --all
+"""
+
+import argparse
+import time
+
+import service
+from db import connectToDB, closeDB, connection
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Refit goal ETA forecasts from the daily metric rollups")
+	parser.add_argument("--all", action="store_true", help="refit every member, not just the stale ones")
+	args = parser.parse_args()
+
+	connectToDB(maxconn=1)
+	try:
+		with connection() as conn:
+			started = time.perf_counter()
+			written = service.refreshForecasts(conn, stale_only=not args.all)
+			conn.commit()
+	finally:
+		closeDB()
+	print(f"{written:,} forecasts written in {time.perf_counter() - started:.2f}s "
+		  f"({'everyone' if args.all else 'stale members only'})")
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,230 @@
+# ingest.py
+
+""" bulk import of wearable metric exports (CSV or JSON lines) into metrics
+	- columns/keys: member_id (or email), metric_date (or timestamp/date), weight, body_fat, heart_rate
+	  dates are ISO (2025-11-20 10:00, 2025-11-20T10:00:00Z) or unix seconds, missing metrics are fine
+	  as long as a row has at least one
+	- rows are checked a chunk at a time (parse, ranges, member exists), good ones go in with
+	  service.bulkAddMetrics (COPY + one summary/goal refresh per chunk), each chunk is its own commit
+	- bad rows go to the rejects file with the line number and why
+	- run:  python app/ingest.py watch_export.csv --rejects rejects.csv
+	        python app/ingest.py readings.jsonl --chunk-size 100000
+"""
+
+import argparse
+import csv
+import json
+import sys
+import time
+from datetime import datetime, timedelta
+
+import service
+from db import connectToDB, closeDB, connection
+
+CHUNK_SIZE = 50000
+
+# anything outside these is a sensor glitch or a typo
+VALID_RANGES = {
+	"weight": (20.0, 400.0),     # kg
+	"body_fat": (2.0, 75.0),     # %
+	"heart_rate": (25.0, 250.0), # bpm
+}
+FUTURE_SLACK = timedelta(days=1) # clock/timezone differences
+
+DATE_KEYS = ("metric_date", "timestamp", "date", "time")
+
+
+class Rejected(Exception):
+	"""reason is what the summary counts by, detail is the offending value"""
+	def __init__(self, reason, detail=""):
+		super().__init__(f"{reason}: {detail}" if detail else reason)
+		self.reason = reason
+
+
+# -----------------
+# READING ....
+# -----------------
+
+def readRows(f, fmt):
+	"""yield (line_no, dict) from a CSV (with header) or JSON-lines file"""
+	if fmt == "csv":
+		reader = csv.DictReader(f)
+		for row in reader:
+			yield reader.line_num, row
+		return
+	for line_no, line in enumerate(f, start=1):
+		line = line.strip()
+		if not line:
+			continue
+		try:
+			row = json.loads(line)
+		except ValueError:
+			row = None
+		yield line_no, row if isinstance(row, dict) else {"__bad__": line}
+
+def _chunks(rows, size):
+	chunk = []
+	for item in rows:
+		chunk.append(item)
+		if len(chunk) >= size:
+			yield chunk
+			chunk = []
+	if chunk:
+		yield chunk
+
+
+# -----------------
+# VALIDATION ....
+# -----------------
+
+def _parseDate(raw, now):
+	if raw is None or str(raw).strip() == "":
+		raise Rejected("missing metric_date")
+	text = str(raw).strip()
+	try:
+		if text.replace(".", "", 1).isdigit():
+			when = datetime.fromtimestamp(float(text))
+		else:
+			when = datetime.fromisoformat(text.replace("Z", "+00:00"))
+			if when.tzinfo is not None:
+				when = when.astimezone().replace(tzinfo=None) # metrics.metric_date is local time
+	except (ValueError, OverflowError, OSError):
+		raise Rejected("bad metric_date", text)
+	if when > now + FUTURE_SLACK:
+		raise Rejected("metric_date in the future", text)
+	return when
+
+def _parseMetric(row, name):
+	raw = row.get(name)
+	if raw is None or str(raw).strip() == "":
+		return None
+	try:
+		value = float(raw)
+	except (TypeError, ValueError):
+		raise Rejected(f"{name} not a number", raw)
+	low, high = VALID_RANGES[name]
+	if not low <= value <= high:
+		raise Rejected(f"{name} outside {low}-{high}", value)
+	return value
+
+def validateRow(row, now):
+	"""(member key, metric_date, weight, body_fat, heart_rate) or raise Rejected"""
+	if "__bad__" in row:
+		raise Rejected("not a JSON object")
+	if row.get("member_id") not in (None, ""):
+		try:
+			member = int(row["member_id"])
+		except (TypeError, ValueError):
+			raise Rejected("bad member_id", row["member_id"])
+	elif row.get("email"):
+		member = str(row["email"]).strip().lower()
+	else:
+		raise Rejected("missing member_id/email")
+
+	raw_date = next((row[key] for key in DATE_KEYS if row.get(key) not in (None, "")), None)
+	when = _parseDate(raw_date, now)
+	values = [_parseMetric(row, name) for name in service.METRIC_NAMES]
+	if all(value is None for value in values):
+		raise Rejected("no weight, body_fat or heart_rate")
+	return (member, when, *values)
+
+def _resolveMembers(cur, keys):
+	"""{member key: member_id} for the ids/emails that exist"""
+	ids = [key for key in keys if isinstance(key, int)]
+	emails = [key for key in keys if isinstance(key, str)]
+	found = {}
+	if ids:
+		cur.execute("SELECT member_id FROM members WHERE member_id = ANY(%s);", (ids,))
+		found.update((row[0], row[0]) for row in cur.fetchall())
+	if emails:
+		cur.execute("SELECT LOWER(email), member_id FROM members WHERE LOWER(email) = ANY(%s);", (emails,))
+		found.update(cur.fetchall())
+	return found
+
+
+# -----------------
+# LOADING ....
+# -----------------
+
+def ingest(f, fmt, rejects_writer=None, chunk_size=CHUNK_SIZE, progress=True):
+	"""load every good row from f, returns a summary dict"""
+	stats = {"read": 0, "loaded": 0, "rejected": 0, "chunks": 0, "reasons": {}}
+	started = time.perf_counter()
+
+	def reject(line_no, error, raw):
+		stats["rejected"] += 1
+		stats["reasons"][error.reason] = stats["reasons"].get(error.reason, 0) + 1
+		if rejects_writer is not None:
+			rejects_writer.writerow([line_no, str(error), json.dumps(raw, default=str)])
+
+	with connection() as conn:
+		cur = conn.cursor()
+		try:
+			for chunk in _chunks(readRows(f, fmt), chunk_size):
+				now = datetime.now()
+				stats["read"] += len(chunk)
+				parsed = []
+				for line_no, raw in chunk:
+					try:
+						parsed.append((line_no, raw, validateRow(raw, now)))
+					except Rejected as e:
+						reject(line_no, e, raw)
+
+				members = _resolveMembers(cur, {row[0] for _, _, row in parsed})
+				good = []
+				for line_no, raw, row in parsed:
+					member_id = members.get(row[0])
+					if member_id is None:
+						reject(line_no, Rejected("unknown member", row[0]), raw)
+					else:
+						good.append((member_id,) + row[1:])
+
+				if good:
+					result = service.bulkAddMetrics(conn, good)
+					stats["loaded"] += result["inserted"]
+				conn.commit()
+				stats["chunks"] += 1
+				if progress:
+					rate = stats["loaded"] / (time.perf_counter() - started)
+					print(f"  chunk {stats['chunks']}: {stats['read']:,} read, {stats['loaded']:,} loaded, "
+						  f"{stats['rejected']:,} rejected ({rate:,.0f} rows/s)", file=sys.stderr, flush=True)
+		finally:
+			cur.close()
+
+	stats["seconds"] = round(time.perf_counter() - started, 2)
+	stats["rows_per_hour"] = int(stats["loaded"] / stats["seconds"] * 3600) if stats["seconds"] else None
+	return stats
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Bulk import wearable metrics (CSV or JSON lines)")
+	parser.add_argument("file", help="export to load ('-' for stdin)")
+	parser.add_argument("--format", choices=("csv", "jsonl"), help="default: from the file extension")
+	parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="rows per validation/COPY/commit")
+	parser.add_argument("--rejects", help="CSV file for rejected rows (line, reason, row)")
+	args = parser.parse_args()
+
+	fmt = args.format or ("jsonl" if args.file.endswith((".jsonl", ".json", ".ndjson")) else "csv")
+	connectToDB(maxconn=1)
+	f = sys.stdin if args.file == "-" else open(args.file, newline="", encoding="utf-8")
+	rejects_file = open(args.rejects, "w", newline="", encoding="utf-8") if args.rejects else None
+	try:
+		writer = None
+		if rejects_file:
+			writer = csv.writer(rejects_file)
+			writer.writerow(["line", "reason", "row"])
+		stats = ingest(f, fmt, writer, max(1, args.chunk_size))
+	finally:
+		if f is not sys.stdin:
+			f.close()
+		if rejects_file:
+			rejects_file.close()
+		closeDB()
+
+	print(f"\nRead {stats['read']:,}, loaded {stats['loaded']:,}, rejected {stats['rejected']:,} "
+		  f"in {stats['seconds']}s (~{stats['rows_per_hour'] or 0:,} rows/hour)")
+	for reason, count in sorted(stats["reasons"].items(), key=lambda item: -item[1]):
+		print(f"  {count:>8,}  {reason}")
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,319 @@
+# instrument.py
+import atexit
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+import psycopg2
+import psycopg2.extensions
+
+# per-statement timing for every query that goes through the pool
+# - turn it on with CLUB_PROFILE=1 (or enable()), db.connectToDB() then opens
+#   InstrumentedConnections whose cursors time every execute()
+# - stats are kept per statement and per calling function, see summary()
+# - statements slower than CLUB_SLOW_MS go to the slow query log (CLUB_SLOW_LOG),
+#   with the EXPLAIN plan too if CLUB_EXPLAIN=1
+# - a summary is printed to stderr when the process exits
+# params are never logged (authenticate() passes passwords)
+
+SLOW_QUERY_MS = 100
+SLOW_LOG = "slow_queries.log"
+SUMMARY_TOP = 15
+
+# the modules whose functions count as "operations" when we walk up the stack,
+# the outermost one of these is the entry (member.showDashboard, admin.createClass...)
+OPERATION_MODULES = {"auth", "member", "trainer", "admin", "service"}
+_SKIP_MODULES = {__name__, "psycopg2", "psycopg2.extras", "contextlib"}
+_EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")
+
+_config = {"enabled": False, "slow_ms": SLOW_QUERY_MS, "slow_log": SLOW_LOG, "explain": False}
+_lock = threading.Lock()
+_by_statement = {}   # statement -> Stat
+_by_caller = {}      # "module.function" -> Stat
+_by_entry = {}       # outermost operation -> Stat
+_explained = set()   # statements we already captured a plan for
+_atexit_registered = False
+
+
+class Stat:
+    __slots__ = ("count", "total", "max", "rows", "errors")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.errors = 0
+
+    def add(self, seconds, rows, failed):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        if rows > 0:
+            self.rows += rows
+        if failed:
+            self.errors += 1
+
+    def asDict(self):
+        return {
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 2),
+            "mean_ms": round(self.total * 1000 / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max * 1000, 2),
+            "rows": self.rows,
+            "errors": self.errors,
+        }
+
+
+# -----------------
+# SETUP ....
+# -----------------
+
+def enable(slow_ms=None, slow_log=None, explain=None, summary_at_exit=True):
+    """turn instrumentation on (call before connectToDB)"""
+    global _atexit_registered
+    _config["enabled"] = True
+    if slow_ms is not None:
+        _config["slow_ms"] = slow_ms
+    if slow_log is not None:
+        _config["slow_log"] = slow_log
+    if explain is not None:
+        _config["explain"] = explain
+    if summary_at_exit and not _atexit_registered:
+        atexit.register(printSummary)
+        _atexit_registered = True
+
+def enableFromEnv():
+    """CLUB_PROFILE=1 [CLUB_SLOW_MS=100] [CLUB_SLOW_LOG=slow_queries.log] [CLUB_EXPLAIN=1]"""
+    if os.environ.get("CLUB_PROFILE", "") in ("", "0"):
+        return
+    try:
+        slow_ms = float(os.environ.get("CLUB_SLOW_MS", SLOW_QUERY_MS))
+    except ValueError:
+        slow_ms = SLOW_QUERY_MS
+    enable(slow_ms, os.environ.get("CLUB_SLOW_LOG", SLOW_LOG), os.environ.get("CLUB_EXPLAIN", "") not in ("", "0"))
+
+def enabled() -> bool:
+    return _config["enabled"]
+
+def reset():
+    with _lock:
+        _by_statement.clear()
+        _by_caller.clear()
+        _by_entry.clear()
+        _explained.clear()
+
+
+# -----------------
+# RECORDING ....
+# -----------------
+
+def _normalize(query) -> str:
+    if isinstance(query, bytes):
+        query = query.decode("utf-8", "replace")
+    elif not isinstance(query, str):
+        query = str(query) # psycopg2.sql.Composed etc.
+    return " ".join(query.split())
+
+def _callers():
+    """(innermost caller, outermost operation) as "module.function" names"""
+    caller = entry = None
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module not in _SKIP_MODULES:
+            name = f"{module}.{frame.f_code.co_name}"
+            if caller is None:
+                caller = name
+            if module in OPERATION_MODULES:
+                entry = name
+        frame = frame.f_back
+    return caller or "?", entry or caller or "?"
+
+def _record(cursor, query, seconds, rows, failed):
+    statement = _normalize(query)
+    caller, entry = _callers()
+    with _lock:
+        for table, key in ((_by_statement, statement), (_by_caller, caller), (_by_entry, entry)):
+            stat = table.get(key)
+            if stat is None:
+                stat = table[key] = Stat()
+            stat.add(seconds, rows, failed)
+
+    if seconds * 1000 >= _config["slow_ms"]:
+        _slowQuery(cursor, query, statement, seconds, rows, caller, entry, failed)
+
+def _slowQuery(cursor, query, statement, seconds, rows, caller, entry, failed):
+    plan = None
+    if _config["explain"] and not failed and statement.upper().startswith(_EXPLAINABLE):
+        with _lock:
+            first_time = statement not in _explained
+            _explained.add(statement)
+        if first_time:
+            plan = _explain(cursor, query)
+
+    line = (f"{datetime.now().isoformat(timespec='seconds')} {seconds * 1000:.1f}ms rows={rows} "
+            f"caller={caller} entry={entry}{' FAILED' if failed else ''}\n  {statement}\n")
+    if plan:
+        line += "".join(f"    {row}\n" for row in plan)
+    try:
+        with _lock, open(_config["slow_log"], "a", encoding="utf-8") as log:
+            log.write(line)
+    except OSError:
+        pass
+
+def _genericPlanSql(query):
+    """turn psycopg2's %s placeholders into $1, $2... so EXPLAIN (GENERIC_PLAN) can plan it without values"""
+    parts = query.split("%%")
+    n = 0
+    out = []
+    for part in parts:
+        if "%(" in part:
+            return None # named placeholders, not worth it
+        pieces = part.split("%s")
+        for i, piece in enumerate(pieces):
+            if i:
+                n += 1
+                out.append(f"${n}")
+            out.append(piece)
+        out.append("%")
+    return "".join(out[:-1])
+
+def _explain(cursor, query):
+    """
+    plan for a slow statement, run on the same connection inside a savepoint so it can't hurt the caller
+    uses GENERIC_PLAN (PostgreSQL 16+) so parameter values never end up in the log
+    """
+    conn = cursor.connection
+    if conn.server_version < 160000:
+        return None
+    if isinstance(query, bytes):
+        query = query.decode("utf-8", "replace")
+    sql = _genericPlanSql(str(query))
+    if sql is None:
+        return None
+    raw = conn.cursor(cursor_factory=psycopg2.extensions.cursor)
+    in_transaction = not conn.autocommit
+    try:
+        if in_transaction:
+            raw.execute("SAVEPOINT instrument_explain;")
+        try:
+            # no params, so psycopg2 leaves the $n alone
+            raw.execute("EXPLAIN (GENERIC_PLAN) " + sql)
+            plan = [row[0] for row in raw.fetchall()]
+        except psycopg2.Error:
+            plan = None
+        if in_transaction:
+            if plan is None:
+                raw.execute("ROLLBACK TO SAVEPOINT instrument_explain;")
+            raw.execute("RELEASE SAVEPOINT instrument_explain;")
+        return plan
+    except psycopg2.Error:
+        return None
+    finally:
+        raw.close()
+
+
+# -----------------
+# CURSOR / CONNECTION ....
+# -----------------
+
+class InstrumentedCursor(psycopg2.extensions.cursor):
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = super().execute(query, vars)
+            failed = False
+            return result
+        finally:
+            _record(self, query, time.perf_counter() - started, self.rowcount, failed)
+
+    def executemany(self, query, vars_list):
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = super().executemany(query, vars_list)
+            failed = False
+            return result
+        finally:
+            _record(self, query, time.perf_counter() - started, self.rowcount, failed)
+
+    def copy_expert(self, sql, file, size=8192):
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = super().copy_expert(sql, file, size)
+            failed = False
+            return result
+        finally:
+            _record(self, sql, time.perf_counter() - started, self.rowcount, failed)
+
+
+class InstrumentedConnection(psycopg2.extensions.connection):
+    """connection whose cursors are InstrumentedCursors, commits/rollbacks are timed too"""
+
+    def cursor(self, *args, **kwargs):
+        kwargs.setdefault("cursor_factory", InstrumentedCursor)
+        return super().cursor(*args, **kwargs)
+
+    def commit(self):
+        started = time.perf_counter()
+        failed = True
+        try:
+            super().commit()
+            failed = False
+        finally:
+            _record(self, "COMMIT", time.perf_counter() - started, 0, failed)
+
+    def rollback(self):
+        started = time.perf_counter()
+        failed = True
+        try:
+            super().rollback()
+            failed = False
+        finally:
+            _record(self, "ROLLBACK", time.perf_counter() - started, 0, failed)
+
+
+# -----------------
+# REPORTING ....
+# -----------------
+
+def summary(top=None):
+    """{"statements", "callers", "entries"}: lists sorted by total time, slowest first"""
+    def ranked(table, label):
+        rows = sorted(table.items(), key=lambda item: item[1].total, reverse=True)
+        if top:
+            rows = rows[:top]
+        return [{label: key, **stat.asDict()} for key, stat in rows]
+
+    with _lock:
+        return {
+            "statements": ranked(_by_statement, "statement"),
+            "callers": ranked(_by_caller, "caller"),
+            "entries": ranked(_by_entry, "entry"),
+        }
+
+def printSummary(top=SUMMARY_TOP, out=None):
+    out = out or sys.stderr
+    data = summary(top)
+    if not data["statements"]:
+        return
+    header = f"{'count':>8}{'total ms':>12}{'mean ms':>10}{'max ms':>10}{'rows':>10}  "
+    sections = (
+        ("BY OPERATION", "entries", "entry", 40),
+        ("BY CALLER", "callers", "caller", 40),
+        ("BY STATEMENT", "statements", "statement", 90),
+    )
+    for title, section, label, width in sections:
+        print(f"\n-- query stats {title} (top {top} by total time) --", file=out)
+        print(header + label, file=out)
+        for row in data[section]:
+            key = row[label]
+            if len(key) > width:
+                key = key[:width - 3] + "..."
+            print(f"{row['count']:>8}{row['total_ms']:>12.1f}{row['mean_ms']:>10.2f}{row['max_ms']:>10.1f}{row['rows']:>10}  {key}", file=out)
+    print(file=out)
@@ -1,214 +1,273 @@
 # member.py
-from datetime import datetime
+import csv
+from datetime import datetime, timedelta
 import state
+import service
 
 # -----------------
 # MEMBER FUNCTIONS ....
 # -----------------
 
-# getMetricHistory(), getCurrentMetrics(), updateMetrics(),
+# getMetricHistory(), exportMetricHistory(), searchMetricHistory(),
+# askTrendOptions(), printTrend(), showMetricTrends(),
+# getCurrentMetrics(), updateMetrics(),
 # listMemberGoals(), editGoal(), manageGoals(),
-# buildProgressBar(), colorRatio(), showDashboard(), updatePersonalDetails()
+# buildProgressBar(), colorRatio(), etaText(), metricText(), showDashboard(), updatePersonalDetails()
+# (the SQL lives in service.py, these just prompt + print)
 
 
-def getMetricHistory():
+def metricText(value) -> str:
+    """a reading for display, "-" for the ones a row doesn't have (imports can leave some empty)"""
+    return "-" if value is None else str(value)
+
+
+def _printHistoryRows(rows):
+    for row in rows:
+        date_str = row["metric_date"].strftime("%Y-%m-%d %H:%M")
+        weight, body_fat, heart_rate = (metricText(row[name]) for name in service.METRIC_NAMES)
+        print(f"{row['metric_id']:<4} {date_str:<20} {weight:<12} {body_fat:<12} {heart_rate:<8}")
+
+
+def getMetricHistory(session, start=None, end=None):
     """
     Health History: Log multiple metric entries
     DO NOT OVERWRITE!
+    shows HISTORY_PAGE_SIZE rows at a time (keyset pages, so long histories don't all load at once)
+    start/end (datetimes) limit it to [start, end)
     """
-    if state.currentUser == -1:
+    if session.currentUser == -1:
         print("\nYou must login first to view metric history.\n")
         return
 
-    conn = state.conn
-    cur = conn.cursor()
+    # get the metric entries for the logged in member page by page + order by DATE
+    key = None
+    shown = 0
+    while True:
+        with session.connection() as conn:
+            page = service.getMetricHistoryPage(conn, session.currentUser, after=key, start=start, end=end)
+
+        if shown == 0:
+            if not page["rows"]:
+                print("\nNo metrics in that date range.\n" if start or end else "\nNo metrics recorded yet.\n")
+                return
+            print("\n────────────── Metric History ──────────────")
+            print(f"{'ID':<4} {'Date':<20} {'Weight(kg)':<12} {'BodyFat(%)':<12} {'HR(bpm)':<8}")
+            print("─" * 60)
+
+        _printHistoryRows(page["rows"])
+        shown += len(page["rows"])
+        key = page["next"]
+        if key is None:
+            break
+        if input(f"-- {shown} shown, Enter for more or q to stop: ").strip().lower() == "q":
+            break
+
+    print("─" * 60 + "\n")
+
+
+def exportMetricHistory(session, path: str, start=None, end=None):
+    """write the member's history to a CSV file, streamed through a named cursor (flat memory)"""
+    if session.currentUser == -1:
+        print("\nYou must login first to export metric history.\n")
+        return
 
+    count = 0
     try:
-        # try to get every metric entry for the logged in member + order by DATE
-        cur.execute("""
-            SELECT metric_id, metric_date, weight, body_fat, heart_rate
-            FROM metrics
-            WHERE member_id = %s
-            ORDER BY metric_date ASC;
-        """, (state.currentUser,))
-        rows = cur.fetchall()
-
-        if not rows:
-            print("\nNo metrics recorded yet.\n")
-            return
+        with open(path, "w", newline="", encoding="utf-8") as f, session.connection() as conn:
+            writer = csv.writer(f)
+            writer.writerow(["metric_id", "metric_date", "weight", "body_fat", "heart_rate"])
+            for row in service.iterMetricHistory(conn, session.currentUser, start, end):
+                writer.writerow([row["metric_id"], row["metric_date"].isoformat(sep=" "),
+                                 row["weight"], row["body_fat"], row["heart_rate"]])
+                count += 1
+    except OSError as e:
+        print(f"\nCould not write {path}: {e}\n")
+        return
+    print(f"\nExported {count} metric entries to {path}\n")
 
-        print("\n────────────── Metric History ──────────────")
-        print(f"{'ID':<4} {'Date':<20} {'Weight(kg)':<12} {'BodyFat(%)':<12} {'HR(bpm)':<8}")
-        print("─" * 60)
 
-        for metric_id, metric_date, weight, body_fat, heart_rate in rows:
-            date_str = metric_date.strftime("%Y-%m-%d %H:%M")
-            print(f"{metric_id:<4} {date_str:<20} {weight:<12} {body_fat:<12} {heart_rate:<8}")
+def searchMetricHistory(session):
+    """ask for a date range, then page through it on screen or export it to CSV"""
+    if session.currentUser == -1:
+        print("\nYou must login first to view metric history.\n")
+        return
 
-        print("─" * 60 + "\n")
-    finally:
-        cur.close()
+    try:
+        start = input("From date (YYYY-MM-DD, blank = from the start): ").strip()
+        start = datetime.strptime(start, "%Y-%m-%d") if start else None
+        end = input("To date, inclusive (YYYY-MM-DD, blank = up to now): ").strip()
+        end = datetime.strptime(end, "%Y-%m-%d") + timedelta(days=1) if end else None
+    except ValueError:
+        print("\nDates must be in format YYYY-MM-DD (e.g., 2025-11-20)\n")
+        return
+    if start and end and end <= start:
+        print("\nThe 'to' date can't be before the 'from' date.\n")
+        return
 
+    path = input("Export to CSV file (blank = show on screen): ").strip()
+    if path:
+        exportMetricHistory(session, path, start, end)
+    else:
+        getMetricHistory(session, start, end)
+
+
+TREND_BAR_WIDTH = 20
+_BUCKET_FORMATS = {"day": "%Y-%m-%d", "week": "wk %Y-%m-%d", "month": "%Y-%m"}
+
+def askTrendOptions():
+    """prompt for metric / grain / periods, returns (metric_name, grain, periods) or None"""
+    print("\nWhich metric?  1: Weight   2: Body Fat   3: Heart Rate")
+    choice = input("Choose 1-3: ").strip()
+    if choice not in ("1", "2", "3"):
+        print("\nInvalid choice.\n")
+        return None
+    metric_name = service.METRIC_NAMES[int(choice) - 1]
+
+    grain = {"d": "day", "w": "week", "m": "month", "": "month"}.get(
+        input("Group by (d)ay, (w)eek or (m)onth [m]: ").strip().lower()[:1])
+    if grain is None:
+        print("\nPlease type d, w or m.\n")
+        return None
+    periods = input(f"How many {grain}s back [{service.TREND_PERIODS}]: ").strip()
+    try:
+        periods = int(periods) if periods else service.TREND_PERIODS
+    except ValueError:
+        print("\nPlease input a whole number.\n")
+        return None
+    return metric_name, grain, periods
+
+
+def printTrend(rows, grain: str, value_key: str = "avg_value"):
+    """one line per bucket with a bar for value_key, scaled between the lowest and highest bucket"""
+    values = [row[value_key] for row in rows]
+    low, high = min(values), max(values)
+    print(f"{'Period':<14} {'Avg':>8} {'Min':>8} {'Max':>8} {'Readings':>9}")
+    print("─" * (50 + TREND_BAR_WIDTH))
+    for row in rows:
+        filled = 1 if high == low else 1 + round((row[value_key] - low) / (high - low) * (TREND_BAR_WIDTH - 1))
+        print(f"{row['bucket'].strftime(_BUCKET_FORMATS[grain]):<14} {row['avg_value']:>8.1f} "
+              f"{row['min_value']:>8.1f} {row['max_value']:>8.1f} {row['samples']:>9}  {'█' * filled}")
+    print("─" * (50 + TREND_BAR_WIDTH) + "\n")
+
+
+def showMetricTrends(session):
+    """
+    weight / body fat / HR trend per day, week or month
+    reads metric_rollups so a year of months is 12 rows no matter how many readings there are
+    """
+    if session.currentUser == -1:
+        print("\nYou must login first to view your trends.\n")
+        return
+
+    options = askTrendOptions()
+    if options is None:
+        return
+    metric_name, grain, periods = options
 
-def getCurrentMetrics():
+    try:
+        with session.connection() as conn:
+            rows = service.getMetricTrend(conn, session.currentUser, metric_name, grain, periods)
+    except service.ServiceError as e:
+        print(f"\n{e}\n")
+        return
+
+    if not rows:
+        print(f"\nNo {metric_name.replace('_', ' ')} readings in the last {periods} {grain}s.\n")
+        return
+    print(f"\n──────── {metric_name.replace('_', ' ').title()} trend, last {periods} {grain}s ────────")
+    printTrend(rows, grain)
+
+
+def getCurrentMetrics(session):
     """
     get ONLY the latest metric entry for this user
     DESC + LIMIT 1 -> gives whatever most recently recorded
     """
-    if state.currentUser == -1:
+    if session.currentUser == -1:
         print("\nYou must login first to view metrics.\n")
         return
 
-    conn = state.conn
-    cur = conn.cursor()
-
-    try:
-        cur.execute("""
-            SELECT metric_date, weight, body_fat, heart_rate
-            FROM metrics
-            WHERE member_id = %s
-            ORDER BY metric_date DESC
-            LIMIT 1;
-        """, (state.currentUser,))
-
-        row = cur.fetchone()
-
-        if not row:
-            print("\nNo metrics recorded yet.\n")
-            return
+    with session.connection() as conn:
+        row = service.getCurrentMetrics(conn, session.currentUser)
 
-        metric_date, weight, body_fat, heart_rate = row
-        date_str = metric_date.strftime("%Y-%m-%d %H:%M")
+    if not row:
+        print("\nNo metrics recorded yet.\n")
+        return
 
-        print("\n────────────── Current Metrics ──────────────")
-        print(f"{'Last Updated:':<20} {date_str}")
-        print(f"{'Weight (kg):':<20} {weight}")
-        print(f"{'Body Fat (%):':<20} {body_fat}")
-        print(f"{'Heart Rate (bpm):':<20} {heart_rate}")
-        print("─────────────────────────────────────────────\n")
+    date_str = row["metric_date"].strftime("%Y-%m-%d %H:%M")
 
-    finally:
-        cur.close()
+    print("\n────────────── Current Metrics ──────────────")
+    print(f"{'Last Updated:':<20} {date_str}")
+    print(f"{'Weight (kg):':<20} {metricText(row['weight'])}")
+    print(f"{'Body Fat (%):':<20} {metricText(row['body_fat'])}")
+    print(f"{'Heart Rate (bpm):':<20} {metricText(row['heart_rate'])}")
+    print("─────────────────────────────────────────────\n")
 
 
-def updateMetrics(weight: float, bf: float, hr: float):
+def updateMetrics(session, weight: float, bf: float, hr: float):
     """
     Profile Management: input new health metrics (e.g., weight, heart rate).
     """
-    if state.currentUser == -1:
+    if session.currentUser == -1:
         print("\nYou must login first to update metrics.\n")
         return
 
-    conn = state.conn
-    cur = conn.cursor()
-    try:
-        cur.execute(
-            """
-            INSERT INTO metrics (member_id, metric_date, weight, body_fat, heart_rate)
-            VALUES (%s, NOW(), %s, %s, %s)
-            """,
-            (state.currentUser, weight, bf, hr)
-        )
-        conn.commit()
-    except Exception as e:
-        print("Could not update metrics:", e)
-        conn.rollback()
-    finally:
-        cur.close()
-
-
-def listMemberGoals():
+    with session.connection() as conn:
+        try:
+            service.addMetrics(conn, session.currentUser, weight, bf, hr)
+            conn.commit()
+        except Exception as e:
+            print("Could not update metrics:", e)
+            conn.rollback()
+
+
+def listMemberGoals(session):
     """
     print all goals for the currently logged-in member
     """
-    if state.currentUser == -1:
+    if session.currentUser == -1:
         print("\nYou must log in first to view goals.\n")
         return []
 
-    conn = state.conn
-    cur = conn.cursor()
-    try:
-        # 1) get the goals
-        cur.execute(
-            """
-            SELECT goal_id, metric_name, goal_metric
-            FROM goals
-            WHERE member_id = %s
-            ORDER BY goal_id;
-            """,
-            (state.currentUser,)
-        )
-        goal_rows = cur.fetchall()
-
-        if not goal_rows:
-            print("\nYou have no goals set yet.\n")
-            return []
-
-        # get metric history for start + current
-        cur.execute(
-            """
-            SELECT metric_date, weight, body_fat, heart_rate
-            FROM metrics
-            WHERE member_id = %s
-            ORDER BY metric_date ASC;
-            """,
-            (state.currentUser,)
-        )
-        metric_rows = cur.fetchall()
-        if not metric_rows:
-            print("\nYou have goals, but no metrics recorded yet.\n")
-            # still show basic goal info, but no start/current
-            print("\n────────────── Your Goals ──────────────")
-            print(f"{'ID':<4} {'Metric':<10} {'Target':<10}")
-            print("─" * 30)
-            for goal_id, metric_name, goal_metric in goal_rows:
-                print(f"{goal_id:<4} {metric_name:<10} {goal_metric:<10}")
-            print("─" * 30 + "\n")
-            return goal_rows
-
-        # earliest and latest metrics
-        _, start_weight, start_bf, start_hr = metric_rows[0]
-        _, current_weight, current_bf, current_hr = metric_rows[-1]
+    with session.connection() as conn:
+        goals = service.getGoals(conn, session.currentUser)
 
-        print("\n────────────── Your Goals ──────────────")
-        print(f"{'ID':<4} {'Metric':<10} {'Start':<10} {'Current':<10} {'Target':<10}")
-        print("─" * 54)
-        out_rows = []
-
-        for goal_id, metric_name, goal_target in goal_rows:
-            if metric_name == "weight":
-                start_val = start_weight
-                current_val = current_weight
-            elif metric_name == "body_fat":
-                start_val = start_bf
-                current_val = current_bf
-            elif metric_name == "heart_rate":
-                start_val = start_hr
-                current_val = current_hr
-            else:
-                # if unknown metric
-                start_val = None
-                current_val = None
+    if not goals:
+        print("\nYou have no goals set yet.\n")
+        return []
 
-            print(f"{goal_id:<4} {metric_name:<10} {str(start_val):<10} {str(current_val):<10} {goal_target:<10}")
-            out_rows.append((goal_id, metric_name, start_val, current_val, goal_target))
+    out_rows = [(g["goal_id"], g["metric_name"], g["start"], g["current"], g["target"]) for g in goals]
 
-        print("─" * 54 + "\n")
+    if all(g["current"] is None for g in goals):
+        print("\nYou have goals, but no metrics recorded yet.\n")
+        # still show basic goal info, but no start/current
+        print("\n────────────── Your Goals ──────────────")
+        print(f"{'ID':<4} {'Metric':<10} {'Target':<10}")
+        print("─" * 30)
+        for goal_id, metric_name, _, _, goal_metric in out_rows:
+            print(f"{goal_id:<4} {metric_name:<10} {goal_metric:<10}")
+        print("─" * 30 + "\n")
         return out_rows
-    finally:
-        cur.close()
 
+    print("\n────────────── Your Goals ──────────────")
+    print(f"{'ID':<4} {'Metric':<10} {'Start':<10} {'Current':<10} {'Target':<10}")
+    print("─" * 54)
+    for goal_id, metric_name, start_val, current_val, goal_target in out_rows:
+        print(f"{goal_id:<4} {metric_name:<10} {str(start_val):<10} {str(current_val):<10} {goal_target:<10}")
+    print("─" * 54 + "\n")
+    return out_rows
 
-def editGoal():
+
+def editGoal(session):
     """
     Profile Management: Update fitness goals (e.g., weight target)
     """
-    if state.currentUser == -1:
+    if session.currentUser == -1:
         print("\nYou must log in first to edit goals.\n")
         return
 
     # show current goals
-    rows = listMemberGoals()
+    rows = listMemberGoals(session)
     if not rows:
         return
 
@@ -237,37 +296,25 @@ def editGoal():
         return
 
     # update DB
-    conn = state.conn
-    cur = conn.cursor()
-    try:
-        cur.execute(
-            """
-            UPDATE goals
-            SET goal_metric = %s
-            WHERE goal_id = %s
-              AND member_id = %s;
-            """,
-            (new_target, goal_id, state.currentUser)
-        )
-        if cur.rowcount == 0:
-            print("\nCould not find a matching goal to update.\n")
-        else:
+    with session.connection() as conn:
+        try:
+            service.updateGoalTarget(conn, session.currentUser, goal_id, new_target)
             conn.commit()
             print("\nGoal updated successfully!\n")
-    except Exception as e:
-        print("\nCould not update goal:", e, "\n")
-        conn.rollback()
-    finally:
-        cur.close()
+        except service.NotFound as e:
+            print(f"\n{e}\n")
+        except Exception as e:
+            print("\nCould not update goal:", e, "\n")
+            conn.rollback()
 
 
-def manageGoals():
+def manageGoals(session):
     """
     FOR UI -> goal management menu for members:
     - View goals
     - Edit goal target
     """
-    if state.currentUser == -1:
+    if session.currentUser == -1:
         print("\nYou must log in first.\n")
         return
 
@@ -281,9 +328,9 @@ def manageGoals():
             print()
             return
         elif choice == "1":
-            listMemberGoals()
+            listMemberGoals(session)
         elif choice == "2":
-            editGoal()
+            editGoal(session)
         else:
             print("Invalid choice, try again.\n")
 
@@ -294,25 +341,12 @@ def buildProgressBar(current: float, goal: float, start: float):
     calculates a member's progress:
     - weight loss, fat loss, HR improvement
     - weight gain
+    (the ratio math is service.progressRatio, this draws it)
     """
     # ERROR CASE make sure u cant divide by 0
-    if start is None or current is None or goal is None:
+    ratio = service.progressRatio(current, goal, start)
+    if ratio is None:
         return "N/A", "N/A", 0.0
-    if start == goal:
-        return "N/A", "N/A", 0.0
-
-    # WEIGHT LOSS (target is lower than init weight)
-    if goal < start:
-        ratio = (start - current) / (start - goal)
-    # GAIN GOALS (target is higher)
-    else:
-        ratio = (current - start) / (goal - start)
-
-    # clamp 0–1
-    if ratio < 0:
-        ratio = 0
-    elif ratio > 1:
-        ratio = 1
 
     filled = round(ratio * 10)
     bar = "◉" * filled + "○" * (10 - filled)
@@ -336,142 +370,105 @@ def colorRatio(ratio: float) -> str:
         return state.GREEN
 
 
+def etaText(goal) -> str:
+    """the ETA line for a goal (eta/trend_per_day come from service.getDashboard/getGoals)"""
+    if goal.get("progress") == 1:
+        return "reached!"
+    if goal.get("eta") is not None:
+        return f"around {goal['eta'].strftime('%Y-%m-%d')} (trend {goal['trend_per_day']:+.2f}/day)"
+    if goal.get("trend_per_day") is None:
+        return "not enough recent readings yet"
+    return "not on track at the current trend"
+
+
 # GLORIA LI SHOW DASHBOARD
-def showDashboard():
+def showDashboard(session):
     """
     Member dashboard showing metrics + active goals.
     """
     #1 check if user is logged in
-    if state.currentUser == -1:
+    if session.currentUser == -1:
         print("You must log in first to view the dashboard.")
         return
 
-    conn = state.conn
-    cur = conn.cursor()
-
-    # 2 get member info
-    cur.execute(
-        "SELECT fname, lname, class_count "
-        "FROM members WHERE member_id = %s",
-        (state.currentUser,)
-    )
-    member_row = cur.fetchone()
-    if member_row is None:
-        print("Member not found.")
-        cur.close()
-        return
+    # 2-4 member info, first + latest metrics, goals
+    with session.connection() as conn:
+        try:
+            dashboard = service.getDashboard(conn, session.currentUser)
+        except service.NotFound:
+            print("Member not found.")
+            return
 
-    fname, lname, class_count = member_row
-
-    # 3) get metrics
-    cur.execute(
-        "SELECT metric_date, weight, body_fat, heart_rate "
-        "FROM metrics WHERE member_id = %s "
-        "ORDER BY metric_date ASC",
-        (state.currentUser,)
-    )
-    metric_rows = cur.fetchall()
-    if not metric_rows:
-        metric_date = None
-        current_weight = None
-        current_body_fat = None
-        current_heart_rate = None
-        start_weight = None
-        start_body_fat = None
-        start_heart_rate = None
-    else:
-        # earliest and latest metrics
-        first_date, start_weight, start_body_fat, start_heart_rate = metric_rows[0]
-        metric_date, current_weight, current_body_fat, current_heart_rate = metric_rows[-1]
-
-    # 4 get member goals
-    cur.execute(
-        "SELECT metric_name, current_metric, goal_metric "
-        "FROM goals WHERE member_id = %s",
-        (state.currentUser,)
-    )
-    goal_rows = cur.fetchall()
-    cur.close()
+    member = dashboard["member"]
+    latest = dashboard["metrics"]
 
     # 5 printing dashboard
     print("\n" + "╔" + "═" * 58 + "╗")
     print("║" + "MEMBER DASHBOARD".center(58) + "║")
     print("╚" + "═" * 58 + "╝")
-    print(f"Welcome to your dashboard, {fname} {lname}!")
-    print(f"Classes Attended: {class_count}\n")
+    print(f"Welcome to your dashboard, {member['fname']} {member['lname']}!")
+    print(f"Classes Attended: {member['class_count']}\n")
 
     # print metrics label (58!!!)
     print("────────────────────────── Metrics ──────────────────────────")
-    if metric_date is None:
+    if latest is None:
         print("No metrics recorded yet. To add your first metrics now, press Enter to go back to the menu for updates.")
     else:
         # format the date and time to look clean
-        datentime = metric_date.strftime("%Y-%m-%d %H:%M:%S")
+        datentime = latest["metric_date"].strftime("%Y-%m-%d %H:%M:%S")
         print(f"Last Updated On: {datentime}")
         # print metric data info
-        print(f"   • Current Weight:       {current_weight} kg")
-        print(f"   • Body Fat Percentage:  {current_body_fat}%")
-        print(f"   • Average Heart Rate:   {current_heart_rate} bpm")
+        print(f"   • Current Weight:       {metricText(latest['weight'])} kg")
+        print(f"   • Body Fat Percentage:  {metricText(latest['body_fat'])}%")
+        print(f"   • Average Heart Rate:   {metricText(latest['heart_rate'])} bpm")
 
     # print goals label (58!)
     print("\n────────────────────── Active Goals ────────────────────────")
-    if not goal_rows:
+    if not dashboard["goals"]:
         print("No goals set yet. Make your goal today!")
     else:
-        for metric_name, current_metric, goal_metric in goal_rows:
-            # pick the correct start + current value based on metric name
-            if metric_name == "weight":
-                start_val = start_weight
-                current_val = current_weight
-            elif metric_name == "body_fat":
-                start_val = start_body_fat
-                current_val = current_body_fat
-            elif metric_name == "heart_rate":
-                start_val = start_heart_rate
-                current_val = current_heart_rate
-            else:
+        for goal in dashboard["goals"]:
+            metric_name = goal["metric_name"]
+            if metric_name not in service.METRIC_NAMES:
                 print(f"\n{metric_name} Goal:")
                 print("   Progress: (unknown metric type)")
                 continue
 
             print(f"\n{metric_name} Goal:")
             # show the REAL start/current based on metrics history
-            print(f"   Start:   {start_val}")
-            print(f"   Current: {current_val}")
-            print(f"   Target:  {goal_metric}")
-            bar, percent_str, ratio = buildProgressBar(current_val, goal_metric, start_val)
+            print(f"   Start:   {goal['start']}")
+            print(f"   Current: {goal['current']}")
+            print(f"   Target:  {goal['target']}")
+            bar, percent_str, ratio = buildProgressBar(goal["current"], goal["target"], goal["start"])
             if bar == "N/A":
                 print("   Progress: N/A")
             else:
                 color = colorRatio(ratio)
                 print(f"   Progress: {color}{bar} ({percent_str}){state.RESET}")
+            print(f"   ETA:     {etaText(goal)}")
 
     print("\n" + "─" * 62)
     input("Press the any button + ENTER to return to the Main Menu...\n")
 
 
-def updatePersonalDetails():
-    if state.currentUser == -1:
+def updatePersonalDetails(session):
+    if session.currentUser == -1:
         print("You must log in first.")
         return
 
-    conn = state.conn
-    cur = conn.cursor()
-
     # 1. Get current values
-    cur.execute(
-        "SELECT fname, lname, email, birthday, gender "
-        "FROM members WHERE member_id = %s",
-        (state.currentUser,)
-    )
+    with session.connection() as conn:
+        profile = service.getProfile(conn, session.currentUser)
     # check if member exists
-    row = cur.fetchone()
-    if row is None:
+    if profile is None:
         print("Member not found.")
-        cur.close()
         return
 
-    current_fname, current_lname, current_email, current_bday, current_gender = row
+    current_fname = profile["fname"]
+    current_lname = profile["lname"]
+    current_email = profile["email"]
+    current_bday = profile["birthday"]
+    current_gender = profile["gender"]
 
     print("\n| Edit Personal Details |")
     print("*** Press ENTER to keep the current value. ***\n")
@@ -489,66 +486,76 @@ def updatePersonalDetails():
     if new_bday   == "": new_bday   = current_bday
     if new_gender == "": new_gender = current_gender
 
-    try:
-        cur.execute(
-            "UPDATE members SET fname = %s, lname = %s, email = %s, "
-            "birthday = %s, gender = %s WHERE member_id = %s",
-            (new_fname, new_lname, new_email, new_bday, new_gender, state.currentUser)
-        )
-        conn.commit()
-        print("\nProfile updated successfully!\n")
-    except Exception as e:
-        print("Could not update personal details:", e, "\n")
-        conn.rollback()
-    finally:
-        cur.close()
-
-
-def registerForClass():
-    if state.currentUser == -1:
+    with session.connection() as conn:
+        try:
+            service.updateProfile(conn, session.currentUser, new_fname, new_lname, new_email, new_bday, new_gender)
+            conn.commit()
+            print("\nProfile updated successfully!\n")
+        except Exception as e:
+            print("Could not update personal details:", e, "\n")
+            conn.rollback()
+
+
+def registerForClass(session):
+    if session.currentUser == -1:
         print("You must log in first to register for classes.")
         return
-    
+
     print("\n|     Member: Register For a Class     |")
     print("(type 0 at ANY prompt to go back to main menu)\n")
 
-    conn = state.conn
-    cur = conn.cursor()
-
-    cur.execute("SELECT * FROM available_classes;")
-    ret = cur.fetchall()
-    if len(ret) == 0:
-        print("There are currently no classes available for registration")
-        return
-    
+    key = None
     while True:
+        # upcoming classes with room, a page at a time (soonest first)
+        with session.connection() as conn:
+            page = service.browseClasses(conn, after=key)
+        ret = page["rows"]
+        if len(ret) == 0:
+            print("There are currently no classes available for registration" if key is None else "No more classes after these")
+            return
+
         classes = []
-        print("Here are all the available classes for registration")
+        print("Here are the upcoming classes open for registration")
         print("   | Trainer Name    | Type    | Starting Time       | Ending Time         | Room  | Attendance | Capacity |")
         for i in range(len(ret)):
-            class_id, name, purpose, start, end, room, attendance, capacity = ret[i]
-            print(f"{i + 1}: | {name:<15} | {purpose:<7} | {start} | {end} | {room:<5} | {attendance:<10} | {capacity:<8} |")
-            classes.append(class_id)
-        
+            c = ret[i]
+            print(f"{i + 1}: | {c['trainer_name']:<15} | {c['purpose']:<7} | {c['start_time']} | {c['end_time']} | {c['room_name']:<5} | {c['attendance']:<10} | {c['capacity']:<8} |")
+            classes.append(c["class_id"])
+
+        more = page["next"] is not None
         while True:
+            choice = input("\nSelect which class you wish to register in" + (" (m for more classes): " if more else ": ")).strip().lower()
+            if more and choice == "m":
+                break
             try:
-                index = int(input("\nSelect which class you wish to register in: ")) - 1
+                index = int(choice) - 1
                 if index < 0:
                     print("Returning to Main Menu...")
                     return
             except ValueError:
                 print("Please use one of the numbers to specify which class you wish to register in")
                 continue
+            if index >= len(classes):
+                print("Please use one of the numbers to specify which class you wish to register in")
+                continue
             break
-        
-        class_id = classes[i]
-        cur.execute("SELECT * FROM class_regs WHERE class_id = %s AND member_id = %s", (class_id, state.currentUser))
-        if cur.fetchone():
-            print("You are already registered for this class")
+        if more and choice == "m":
+            key = page["next"]
             continue
+
+        class_id = classes[index]
+        with session.connection() as conn:
+            try:
+                service.registerForClass(conn, session.currentUser, class_id)
+                # pooled connections roll back on return, so this has to be committed here
+                conn.commit()
+            except service.Conflict as e:
+                print(e)
+                continue
+            except service.NotFound as e:
+                print(e)
+                return
         break
-    cur.execute("INSERT INTO class_regs (class_id, member_id) VALUES (%s, %s);", (class_id, state.currentUser))
-    cur.execute("UPDATE classes SET attendance = attendance + 1 WHERE class_id = %s", (class_id,))
 
     print("You have successfully registered for this class, enjoy!")
-    input("Press enter to continue")
\ No newline at end of file
+    input("Press enter to continue")
@@ -0,0 +1,290 @@
+# metricstore.py
+import argparse
+import bisect
+import itertools
+import json
+import math
+import mmap
+import os
+import sys
+import time
+from array import array
+from datetime import datetime, timedelta
+
+import psycopg2.extensions
+
+# the metrics table as columns, for analytics that need every reading at once
+# - MetricStore.fromDB() streams metrics (ordered by member, date) into typed arrays:
+#     members    int32   sorted member ids
+#     offsets    int64   member i's readings are rows offsets[i]:offsets[i + 1]
+#     timestamp  int64   seconds since 1970-01-01 (metric_date is a plain TIMESTAMP, no zone)
+#     weight, body_fat, heart_rate   float32, NaN where the reading was NULL
+#   ~20 bytes a reading, so 100M readings is ~2GB
+# - save() writes a snapshot file, load() maps it back in with mmap (nothing is copied,
+#   pages come in as they're touched) so a job over the whole club starts in a second or two
+# - columns are memoryviews, numpy.frombuffer() can wrap them without a copy
+#   python app/metricstore.py build metrics.snap [--since 2025-01-01]
+#   python app/metricstore.py info metrics.snap
+
+MAGIC = b"CLUBMET1"
+LOAD_CHUNK = 50000   # rows per round trip when streaming from the DB
+EPOCH = datetime(1970, 1, 1)
+
+VALUE_COLUMNS = ("weight", "body_fat", "heart_rate")
+TYPECODES = {
+    "members": "i",
+    "offsets": "q",
+    "timestamp": "q",
+    "weight": "f",
+    "body_fat": "f",
+    "heart_rate": "f",
+}
+
+_load_ids = itertools.count(1)
+
+
+def toDatetime(seconds) -> datetime:
+    return EPOCH + timedelta(seconds=int(seconds))
+
+def toSeconds(when: datetime) -> int:
+    return int((when - EPOCH).total_seconds())
+
+
+class MetricStore:
+    """column arrays + per-member offsets, built from the DB or mapped from a snapshot"""
+
+    def __init__(self, columns, info=None, _mmap=None):
+        # columns: name -> anything with the buffer protocol (array.array or a memoryview over the snapshot)
+        self.columns = {
+            name: columns[name] if isinstance(columns[name], memoryview) else memoryview(columns[name])
+            for name in TYPECODES
+        }
+        self.info = info or {}
+        self._mmap = _mmap
+
+    # -----------------
+    # BUILDING ....
+    # -----------------
+
+    @classmethod
+    def fromDB(cls, conn, since=None, chunk_size=LOAD_CHUNK, progress=None):
+        """
+        stream metrics into a new store, since (datetime) keeps only readings from then on
+        runs as one REPEATABLE READ transaction when conn is idle, so the per-member counts
+        and the rows come from the same snapshot; progress(rows_so_far) is called per chunk
+        """
+        started = time.perf_counter()
+        if conn.info.transaction_status == psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            cur = conn.cursor()
+            cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY;")
+            cur.close()
+
+        where = "member_id IS NOT NULL" + (" AND metric_date >= %(since)s" if since else "")
+        params = {"since": since}
+
+        members = array("i")
+        offsets = array("q", [0])
+        cur = conn.cursor()
+        try:
+            cur.execute(f"SELECT member_id, COUNT(*) FROM metrics WHERE {where} GROUP BY member_id ORDER BY member_id;", params)
+            total = 0
+            for member_id, count in cur.fetchall():
+                members.append(member_id)
+                total += count
+                offsets.append(total)
+        finally:
+            cur.close()
+
+        columns = {name: array(TYPECODES[name]) for name in ("timestamp",) + VALUE_COLUMNS}
+        cur = conn.cursor(name=f"metric_store_{next(_load_ids)}")
+        cur.itersize = chunk_size
+        try:
+            # NULL -> NaN and the epoch math happen in SQL, so each chunk goes straight into the arrays
+            cur.execute(
+                f"""
+                SELECT FLOOR(EXTRACT(EPOCH FROM metric_date))::bigint,
+                       COALESCE(weight, 'NaN'), COALESCE(body_fat, 'NaN'), COALESCE(heart_rate, 'NaN')
+                FROM metrics
+                WHERE {where}
+                ORDER BY member_id, metric_date, metric_id;
+                """,
+                params
+            )
+            while True:
+                rows = cur.fetchmany(chunk_size)
+                if not rows:
+                    break
+                for name, values in zip(("timestamp",) + VALUE_COLUMNS, zip(*rows)):
+                    columns[name].extend(values)
+                if progress:
+                    progress(len(columns["timestamp"]))
+        finally:
+            cur.close()
+
+        if len(columns["timestamp"]) != offsets[-1]:
+            raise RuntimeError("metrics changed while loading (run fromDB on an idle connection)")
+        columns["members"] = members
+        columns["offsets"] = offsets
+        info = {
+            "built_at": datetime.now().isoformat(timespec="seconds"),
+            "since": since.isoformat() if since else None,
+            "load_seconds": round(time.perf_counter() - started, 2),
+        }
+        return cls(columns, info)
+
+    # -----------------
+    # SNAPSHOTS ....
+    # -----------------
+
+    def save(self, path):
+        """write the snapshot (via a temp file + rename, so readers never see half a file)"""
+        header = dict(self.info, byteorder=sys.byteorder, rows=len(self), member_count=self.memberCount, columns={})
+        position = 0
+        for name, typecode in TYPECODES.items():
+            nbytes = self.columns[name].nbytes
+            header["columns"][name] = [typecode, position, len(self.columns[name])]
+            position += nbytes + (-nbytes % 8) # keep every column 8-byte aligned
+        header_bytes = json.dumps(header).encode("utf-8")
+        preamble = len(MAGIC) + 4 + len(header_bytes)
+        preamble += -preamble % 8
+
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(MAGIC)
+            f.write(len(header_bytes).to_bytes(4, "little"))
+            f.write(header_bytes)
+            f.write(b"\0" * (preamble - f.tell()))
+            for name in TYPECODES:
+                data = self.columns[name].cast("B")
+                f.write(data)
+                f.write(b"\0" * (-data.nbytes % 8))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        """map a snapshot read-only, call close() (or use with) when done"""
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if mapped[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"{path} is not a metric store snapshot")
+            header_len = int.from_bytes(mapped[len(MAGIC):len(MAGIC) + 4], "little")
+            start = len(MAGIC) + 4
+            header = json.loads(mapped[start:start + header_len].decode("utf-8"))
+            if header["byteorder"] != sys.byteorder:
+                raise ValueError(f"{path} was written on a {header['byteorder']}-endian machine")
+            base = start + header_len
+            base += -base % 8
+
+            raw = memoryview(mapped)
+            columns = {}
+            for name, (typecode, position, count) in header.pop("columns").items():
+                size = array(typecode).itemsize * count
+                columns[name] = raw[base + position:base + position + size].cast(typecode)
+            raw.release()
+        except Exception:
+            mapped.close()
+            raise
+        return cls(columns, header, mapped)
+
+    def close(self):
+        for view in self.columns.values():
+            view.release()
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # -----------------
+    # ACCESS ....
+    # -----------------
+
+    def __len__(self):
+        return len(self.columns["timestamp"])
+
+    @property
+    def memberCount(self) -> int:
+        return len(self.columns["members"])
+
+    @property
+    def nbytes(self) -> int:
+        return sum(view.nbytes for view in self.columns.values())
+
+    def __getattr__(self, name):
+        # store.weight, store.members... for the columns
+        columns = self.__dict__.get("columns")
+        if columns is not None and name in columns:
+            return columns[name]
+        raise AttributeError(name)
+
+    def memberRows(self, member_id: int):
+        """(start, end) row range for a member, (0, 0) if they have no readings"""
+        members = self.columns["members"]
+        i = bisect.bisect_left(members, member_id)
+        if i == len(members) or members[i] != member_id:
+            return 0, 0
+        offsets = self.columns["offsets"]
+        return offsets[i], offsets[i + 1]
+
+    def readings(self, member_id: int):
+        """a member's readings oldest first as dicts (like service.getMetricHistory, minus metric_id)"""
+        start, end = self.memberRows(member_id)
+        nan = lambda value: None if math.isnan(value) else value
+        return [
+            {
+                "metric_date": toDatetime(self.columns["timestamp"][row]),
+                **{name: nan(self.columns[name][row]) for name in VALUE_COLUMNS},
+            }
+            for row in range(start, end)
+        ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or inspect a columnar snapshot of the metrics table")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="load metrics from the DB and write a snapshot")
+    build.add_argument("path")
+    build.add_argument("--since", help="only readings from this date on (YYYY-MM-DD)")
+    build.add_argument("--chunk-size", type=int, default=LOAD_CHUNK)
+    info = sub.add_parser("info", help="print what's in a snapshot")
+    info.add_argument("path")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        from db import connectToDB, closeDB, connection
+        since = datetime.strptime(args.since, "%Y-%m-%d") if args.since else None
+        connectToDB(maxconn=1)
+        try:
+            with connection() as conn:
+                store = MetricStore.fromDB(
+                    conn, since, max(1, args.chunk_size),
+                    progress=lambda n: print(f"\r  {n:,} rows", end="", file=sys.stderr, flush=True)
+                )
+                conn.rollback()
+        finally:
+            closeDB()
+        print(file=sys.stderr)
+        started = time.perf_counter()
+        store.save(args.path)
+        print(f"{len(store):,} readings for {store.memberCount:,} members, {store.nbytes / 2**20:,.1f} MiB, "
+              f"loaded in {store.info['load_seconds']}s, saved in {time.perf_counter() - started:.1f}s -> {args.path}")
+    else:
+        started = time.perf_counter()
+        with MetricStore.load(args.path) as store:
+            took = time.perf_counter() - started
+            print(f"{args.path}: {len(store):,} readings, {store.memberCount:,} members, "
+                  f"{store.nbytes / 2**20:,.1f} MiB (mapped in {took * 1000:.1f} ms)")
+            print(f"  built {store.info.get('built_at')}, since {store.info.get('since') or 'the start'}")
+            if len(store):
+                # each member's rows are in date order, so only their first/last rows need looking at
+                first = min(store.timestamp[store.offsets[i]] for i in range(store.memberCount))
+                last = max(store.timestamp[store.offsets[i + 1] - 1] for i in range(store.memberCount))
+                print(f"  readings from {toDatetime(first)} to {toDatetime(last)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+# progress.py
+import itertools
+import math
+from array import array
+
+import service
+
+try:
+    import numpy as np
+except ImportError: # numpy is optional, everything below has a plain python path too
+    np = None
+
+# club-wide goal progress in one pass instead of one service.progressRatio() per goal
+# - loadGoals() streams every goal with its start (first reading) and current (latest reading)
+#   from goals + member_metric_summary into column arrays
+# - progressRatios() is service.progressRatio() over whole columns: same loss/gain rules,
+#   same 0-1 clamp, NaN where progressRatio would say None
+# - leaderboard() / distribution() are the admin reports on top of it
+# with numpy the math is vectorized, without it the same arrays go through progressRatio
+
+LOAD_CHUNK = 50000
+HISTOGRAM_BUCKETS = 10 # 0-10%, 10-20%, ... 90-100%
+LEADERBOARD_SIZE = 10
+
+NAN = float("nan")
+
+_load_ids = itertools.count(1)
+
+
+def loadGoals(conn, metric_name: str = None, chunk_size: int = LOAD_CHUNK):
+    """
+    every goal (optionally just one metric) as columns:
+    member_id, metric (index into service.METRIC_NAMES), start, current, target (NaN when missing)
+    """
+    if metric_name is not None and metric_name not in service.METRIC_NAMES:
+        raise service.ServiceError(f"Metric must be one of {', '.join(service.METRIC_NAMES)}.")
+    names = list(service.METRIC_NAMES)
+    columns = {"member_id": array("i"), "metric": array("b"),
+               "start": array("d"), "current": array("d"), "target": array("d")}
+    first = " ".join(f"WHEN '{name}' THEN s.first_{name}" for name in names)
+    latest = " ".join(f"WHEN '{name}' THEN s.latest_{name}" for name in names)
+
+    cur = conn.cursor(name=f"goal_progress_{next(_load_ids)}")
+    cur.itersize = chunk_size
+    try:
+        cur.execute(
+            f"""
+            SELECT g.member_id, array_position(%(names)s, g.metric_name) - 1,
+                   COALESCE(CASE g.metric_name {first} END, 'NaN'),
+                   COALESCE(CASE g.metric_name {latest} END, 'NaN'),
+                   g.goal_metric
+            FROM goals g
+            LEFT JOIN member_metric_summary s ON s.member_id = g.member_id
+            WHERE g.metric_name = ANY(%(wanted)s);
+            """,
+            {"names": names, "wanted": [metric_name] if metric_name else names}
+        )
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                break
+            for name, values in zip(columns, zip(*rows)):
+                columns[name].extend(values)
+    finally:
+        cur.close()
+    return columns
+
+
+def progressRatios(start, current, target):
+    """progressRatio() for whole columns, returns a numpy array (or an array('d')) with NaN for None"""
+    if np is not None:
+        start = np.frombuffer(start, dtype=np.float64) if not isinstance(start, np.ndarray) else start
+        current = np.frombuffer(current, dtype=np.float64) if not isinstance(current, np.ndarray) else current
+        target = np.frombuffer(target, dtype=np.float64) if not isinstance(target, np.ndarray) else target
+        loss = target < start # loss goals: target below start
+        with np.errstate(invalid="ignore", divide="ignore"):
+            ratio = np.where(loss, start - current, current - start) / np.where(loss, start - target, target - start)
+        ratio = np.clip(ratio, 0.0, 1.0)
+        ratio[np.isnan(start) | np.isnan(current) | np.isnan(target) | (start == target)] = np.nan
+        return ratio
+
+    none = lambda value: None if math.isnan(value) else value
+    out = array("d")
+    for s, c, t in zip(start, current, target):
+        ratio = service.progressRatio(none(c), none(t), none(s))
+        out.append(NAN if ratio is None else ratio)
+    return out
+
+
+def clubProgress(conn, metric_name: str = None):
+    """loadGoals() + a "progress" column"""
+    goals = loadGoals(conn, metric_name)
+    goals["progress"] = progressRatios(goals["start"], goals["current"], goals["target"])
+    return goals
+
+
+def leaderboard(conn, goals, metric_name: str = None, top: int = LEADERBOARD_SIZE):
+    """
+    the top goals by progress (ties: whoever has moved furthest from their start)
+    [{member_id, fname, lname, metric_name, start, current, target, progress}]
+    """
+    metric = None if metric_name is None else service.METRIC_NAMES.index(metric_name)
+    ratio = goals["progress"]
+    if np is not None:
+        ratio = np.asarray(ratio)
+        moved = np.abs(np.asarray(goals["current"]) - np.asarray(goals["start"]))
+        keep = ~np.isnan(ratio)
+        if metric is not None:
+            keep &= np.asarray(goals["metric"]) == metric
+        candidates = np.flatnonzero(keep)
+        order = np.lexsort((-moved[candidates], -ratio[candidates]))[:top]
+        picked = candidates[order].tolist()
+    else:
+        picked = [
+            i for i in range(len(ratio))
+            if not math.isnan(ratio[i]) and (metric is None or goals["metric"][i] == metric)
+        ]
+        picked.sort(key=lambda i: (-ratio[i], -abs(goals["current"][i] - goals["start"][i])))
+        picked = picked[:top]
+
+    member_ids = [goals["member_id"][i] for i in picked]
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT member_id, fname, lname FROM members WHERE member_id = ANY(%s);", (member_ids,))
+        names = {row[0]: row[1:] for row in cur.fetchall()}
+    finally:
+        cur.close()
+
+    board = []
+    for i in picked:
+        member_id = goals["member_id"][i]
+        fname, lname = names.get(member_id, ("?", "?"))
+        board.append({
+            "member_id": member_id,
+            "fname": fname,
+            "lname": lname,
+            "metric_name": service.METRIC_NAMES[goals["metric"][i]],
+            "start": float(goals["start"][i]),
+            "current": float(goals["current"][i]),
+            "target": float(goals["target"][i]),
+            "progress": float(ratio[i]),
+        })
+    return board
+
+
+def distribution(goals, buckets: int = HISTOGRAM_BUCKETS):
+    """
+    per metric: {metric_name, goals, measurable, completed, mean, median, histogram}
+    histogram[i] = goals with progress in [i/buckets, (i+1)/buckets), 100% lands in the last one
+    "measurable" leaves out goals progressRatio can't score (no readings yet, start == target)
+    """
+    report = []
+    for metric, metric_name in enumerate(service.METRIC_NAMES):
+        if np is not None:
+            ratio = np.asarray(goals["progress"])
+            mine = ratio[np.asarray(goals["metric"]) == metric]
+            total = int(mine.size)
+            scored = np.sort(mine[~np.isnan(mine)])
+            # same binning as the plain python path below (not np.histogram's edges)
+            histogram = np.bincount(np.minimum((scored * buckets).astype(np.int64), buckets - 1),
+                                    minlength=buckets).tolist()
+            completed = int(np.count_nonzero(scored >= 1.0))
+            mean = float(scored.mean()) if scored.size else None
+            median = float(np.median(scored)) if scored.size else None
+        else:
+            mine = [goals["progress"][i] for i in range(len(goals["metric"])) if goals["metric"][i] == metric]
+            total = len(mine)
+            scored = sorted(value for value in mine if not math.isnan(value))
+            histogram = [0] * buckets
+            for value in scored:
+                histogram[min(int(value * buckets), buckets - 1)] += 1
+            completed = sum(1 for value in scored if value >= 1.0)
+            mean = sum(scored) / len(scored) if scored else None
+            if not scored:
+                median = None
+            elif len(scored) % 2:
+                median = scored[len(scored) // 2]
+            else:
+                median = (scored[len(scored) // 2 - 1] + scored[len(scored) // 2]) / 2
+        if total == 0:
+            continue
+        report.append({
+            "metric_name": metric_name,
+            "goals": total,
+            "measurable": len(scored),
+            "completed": completed,
+            "mean": mean,
+            "median": median,
+            "histogram": histogram,
+        })
+    return report
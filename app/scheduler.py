@@ -0,0 +1,192 @@
+# scheduler.py
+import threading
+import time
+from bisect import bisect_right
+from datetime import datetime, timedelta
+
+# in-memory copy of who/what is free when, for createClass suggestions
+# - one Timeline per trainer (availability slots) and per room (bookings), only the future bits
+# - migration 0012 guarantees neither has overlaps, so a timeline is just its intervals sorted by
+#   start (the ends come out sorted too) and every "does this clash" is a bisect
+# - service.py's writes mark the trainers/rooms they touch dirty once their transaction is over
+#   (db.ClubConnection, like cache.py's release), only those get re-read on the next question;
+#   everything is reloaded after TTL seconds anyway for writes from other processes
+# - the lock only guards the dicts: a refresh reads the DB without it and swaps the new
+#   timelines in after, a question asked while another thread refreshes uses what's there
+# - answers are suggestions, createClass still checks everything in SQL when it books
+
+TTL = 60.0 # seconds
+
+
+class Timeline:
+    """non-overlapping [start, end) intervals sorted by start"""
+    __slots__ = ("starts", "ends")
+
+    def __init__(self, intervals=()):
+        intervals = sorted(intervals)
+        self.starts = [start for start, _ in intervals]
+        self.ends = [end for _, end in intervals]
+
+    def __len__(self):
+        return len(self.starts)
+
+    def overlaps(self, start: datetime, end: datetime) -> bool:
+        """does any interval share time with [start, end) (touching ends don't count)"""
+        i = bisect_right(self.ends, start) # first interval ending after start
+        return i < len(self.starts) and self.starts[i] < end
+
+    def within(self, start: datetime, end: datetime):
+        """the intervals sharing time with [start, end), oldest first"""
+        i = bisect_right(self.ends, start)
+        while i < len(self.starts) and self.starts[i] < end:
+            yield self.starts[i], self.ends[i]
+            i += 1
+
+
+_EMPTY = Timeline()
+
+
+def _roundUp(moment: datetime, step: timedelta) -> datetime:
+    """moment rounded up to the next multiple of step since midnight (09:10 -> 09:30 for 30 minutes)"""
+    midnight = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    steps = -(-(moment - midnight) // step) # ceiling division
+    return midnight + steps * step
+
+
+class Scheduler:
+    def __init__(self, ttl: float = TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._trainers = {} # trainer_id -> Timeline of availability
+        self._rooms = {}    # room_id -> Timeline of bookings
+        self._room_info = {} # room_id -> (room_name, max_capacity)
+        self._loaded_at = None
+        self._dirty_trainers = set()
+        self._dirty_rooms = set()
+        self._refreshing = False
+        self._epoch = 0 # bumped by clear(), a refresh that started before one is thrown away
+        self._counts = {"full_loads": 0, "trainer_reloads": 0, "room_reloads": 0}
+
+    # writes (service.py) -------------------------------------------------
+
+    def trainerChanged(self, *trainer_ids):
+        with self._lock:
+            self._dirty_trainers.update(trainer_ids)
+
+    def roomChanged(self, *room_ids):
+        with self._lock:
+            self._dirty_rooms.update(room_ids)
+
+    def clear(self):
+        with self._lock:
+            self._loaded_at = None
+            self._epoch += 1
+
+    # loading ---------------------------------------------------------------
+
+    def _sync(self, conn):
+        """(re)load whatever is missing, expired or dirty, timelines are replaced, never edited"""
+        with self._lock:
+            full = self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl
+            if not full and not self._dirty_trainers and not self._dirty_rooms:
+                return
+            if self._refreshing and self._loaded_at is not None:
+                return # another thread is on it, answer from what we have
+            self._refreshing = True
+            epoch = self._epoch
+            # taken now, so anything marked while we read gets re-read next time
+            trainer_ids, self._dirty_trainers = None if full else list(self._dirty_trainers), set()
+            room_ids, self._dirty_rooms = None if full else list(self._dirty_rooms), set()
+
+        cur = conn.cursor()
+        try:
+            trainers = rooms = {}
+            if full or trainer_ids:
+                trainers = self._timelines(cur, "trainer_id", "trainer_availability", trainer_ids)
+            if full or room_ids:
+                rooms = self._timelines(cur, "room_id", "room_bookings", room_ids)
+            if full:
+                cur.execute("SELECT room_id, room_name, max_capacity FROM rooms;")
+                room_info = {room_id: (name, capacity) for room_id, name, capacity in cur.fetchall()}
+        except Exception:
+            with self._lock:
+                self._refreshing = False
+                if not full:
+                    self._dirty_trainers.update(trainer_ids)
+                    self._dirty_rooms.update(room_ids)
+            raise
+        finally:
+            cur.close()
+
+        with self._lock:
+            self._refreshing = False
+            if epoch != self._epoch:
+                return # cleared (DB reset) while we were reading
+            if full:
+                self._trainers, self._rooms, self._room_info = trainers, rooms, room_info
+                self._loaded_at = time.monotonic()
+                self._counts["full_loads"] += 1
+                return
+            for trainer_id in trainer_ids:
+                self._trainers[trainer_id] = trainers.get(trainer_id, _EMPTY)
+            for room_id in room_ids:
+                self._rooms[room_id] = rooms.get(room_id, _EMPTY)
+            self._counts["trainer_reloads"] += len(trainer_ids)
+            self._counts["room_reloads"] += len(room_ids)
+
+    @staticmethod
+    def _timelines(cur, key: str, table: str, ids=None):
+        """{id: Timeline} of the intervals in table that haven't ended yet (all ids, or just ids)"""
+        where = "end_time > NOW()" + (f" AND {key} = ANY(%s)" if ids is not None else "")
+        cur.execute(f"SELECT {key}, start_time, end_time FROM {table} WHERE {where};",
+                    (ids,) if ids is not None else None)
+        grouped = {}
+        for owner, start, end in cur.fetchall():
+            grouped.setdefault(owner, []).append((start, end))
+        return {owner: Timeline(intervals) for owner, intervals in grouped.items()}
+
+    # questions ---------------------------------------------------------------
+
+    def suggest(self, conn, trainer_id: int, length: timedelta, start: datetime, end: datetime,
+                min_capacity: int = 1, limit: int = 5, step: timedelta = timedelta(minutes=30)):
+        """
+        the first limit times in [start, end) the trainer is available for length and some room
+        holding min_capacity people is free, on step boundaries, each with the smallest such room
+        [{start_time, end_time, room_id, room_name, max_capacity}]
+        """
+        self._sync(conn)
+        with self._lock:
+            trainer = self._trainers.get(trainer_id, _EMPTY)
+            rooms, room_info = self._rooms, self._room_info
+        candidates = sorted(
+            (capacity, room_id, name) for room_id, (name, capacity) in room_info.items()
+            if capacity is not None and capacity >= min_capacity
+        )
+        found = []
+        for slot_start, slot_end in trainer.within(start, end):
+            latest = min(slot_end, end) - length
+            moment = _roundUp(max(slot_start, start), step)
+            while moment <= latest and len(found) < limit:
+                for capacity, room_id, name in candidates:
+                    if not rooms.get(room_id, _EMPTY).overlaps(moment, moment + length):
+                        found.append({"start_time": moment, "end_time": moment + length, "room_id": room_id,
+                                      "room_name": name, "max_capacity": capacity})
+                        break
+                moment += step
+            if len(found) >= limit:
+                break
+        return found
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(
+                self._counts,
+                trainers=len(self._trainers),
+                rooms=len(self._rooms),
+                intervals=sum(map(len, self._trainers.values())) + sum(map(len, self._rooms.values())),
+                age=None if self._loaded_at is None else round(time.monotonic() - self._loaded_at, 1),
+            )
+
+
+# the process wide scheduler service.py uses
+engine = Scheduler()
@@ -0,0 +1,205 @@
+# server.py
+
+""" network version of the main menu (app.py)
+	- plain TCP, one line in = one answer to whatever prompt is showing
+	- every connection gets its own Session, DB connections come from the shared pool
+	- try it locally:  python app/server.py   then   nc localhost 5433
+"""
+
+import argparse
+import asyncio
+import builtins
+import queue
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from state import Session
+from db import connectToDB, closeDB
+from app import printMenu, runOption
+
+HOST = "127.0.0.1"
+PORT = 5433
+MAX_CLIENTS = 200
+IDLE_TIMEOUT = 600 # seconds a client can sit on a prompt before we hang up
+
+# -----------------
+# CONSOLE ROUTING ....
+# -----------------
+
+# the menu functions just call print() / input(), so while a client's menu runs on a
+# worker thread those two are pointed at that client's socket instead of the terminal
+
+_local = threading.local()
+_real_input = builtins.input
+
+
+class ClientConsole:
+	"""one connected client: lines typed by the client go in, menu output goes out"""
+
+	def __init__(self, loop, writer, idle_timeout=IDLE_TIMEOUT):
+		self.loop = loop
+		self.writer = writer
+		self.idle_timeout = idle_timeout
+		self.lines = queue.Queue()
+
+	def write(self, text: str):
+		if text:
+			self.loop.call_soon_threadsafe(self._send, text.encode("utf-8"))
+
+	def _send(self, data: bytes):
+		if not self.writer.is_closing():
+			self.writer.write(data)
+
+	def readline(self, prompt: str = "") -> str:
+		self.write(prompt)
+		try:
+			line = self.lines.get(timeout=self.idle_timeout)
+		except queue.Empty:
+			self.write("\nDisconnected for being idle too long.\n")
+			line = None
+		if line is None:
+			raise EOFError("client disconnected")
+		return line
+
+	def close(self):
+		self.loop.call_soon_threadsafe(self.writer.close)
+
+
+class _RoutedStdout:
+	"""sys.stdout stand-in, sends writes from client threads to that client"""
+
+	def __init__(self, real):
+		self.real = real
+
+	def write(self, text):
+		console = getattr(_local, "console", None)
+		if console is None:
+			return self.real.write(text)
+		console.write(text)
+		return len(text)
+
+	def flush(self):
+		if getattr(_local, "console", None) is None:
+			self.real.flush()
+
+	def __getattr__(self, name):
+		return getattr(self.real, name)
+
+
+def _routed_input(prompt=""):
+	console = getattr(_local, "console", None)
+	if console is None:
+		return _real_input(prompt)
+	return console.readline(prompt)
+
+
+def installConsoleRouting():
+	if not isinstance(sys.stdout, _RoutedStdout):
+		sys.stdout = _RoutedStdout(sys.stdout)
+	builtins.input = _routed_input
+
+
+# -----------------
+# SERVER ....
+# -----------------
+
+def runClientSession(console: ClientConsole):
+	"""
+	same loop as app.main(), but for one network client (runs on a worker thread)
+	no Reset Database here, any client could otherwise wipe the DB for everyone
+	"""
+	_local.console = console
+	session = Session()
+	try:
+		while True:
+			printMenu(session, allow_reset=False)
+			option = input("Type your option as a number: ")
+			if not runOption(session, option, allow_reset=False):
+				print("Goodbye!")
+				break
+	except EOFError:
+		pass
+	except Exception as e:
+		# one broken session shouldn't take the whole server down
+		print("\nSomething went wrong, closing your session:", e)
+	finally:
+		_local.console = None
+		console.close()
+
+
+class MenuServer:
+	def __init__(self, host=HOST, port=PORT, max_clients=MAX_CLIENTS, idle_timeout=IDLE_TIMEOUT):
+		self.host = host
+		self.port = port
+		self.max_clients = max_clients
+		self.idle_timeout = idle_timeout
+		self.executor = ThreadPoolExecutor(max_workers=max_clients, thread_name_prefix="menu-session")
+		self.active = 0
+
+	async def handleClient(self, reader, writer):
+		peer = writer.get_extra_info("peername")
+		if self.active >= self.max_clients:
+			writer.write(b"Server is full right now, please try again later.\n")
+			await writer.drain()
+			writer.close()
+			return
+
+		self.active += 1
+		loop = asyncio.get_running_loop()
+		console = ClientConsole(loop, writer, self.idle_timeout)
+		session_done = loop.run_in_executor(self.executor, runClientSession, console)
+		print(f"client connected: {peer} ({self.active} active)")
+
+		try:
+			while not session_done.done():
+				read = asyncio.ensure_future(reader.readline())
+				await asyncio.wait({read, session_done}, return_when=asyncio.FIRST_COMPLETED)
+				if not read.done():
+					read.cancel()
+					break
+				data = read.result()
+				if not data:
+					break
+				console.lines.put(data.decode("utf-8", errors="replace").rstrip("\r\n"))
+		except (ConnectionError, asyncio.IncompleteReadError):
+			pass
+		finally:
+			# wake up the worker if it is still waiting on a prompt
+			console.lines.put(None)
+			await session_done
+			try:
+				await writer.drain()
+			except ConnectionError:
+				pass
+			writer.close()
+			self.active -= 1
+			print(f"client disconnected: {peer} ({self.active} active)")
+
+	async def serve(self):
+		server = await asyncio.start_server(self.handleClient, self.host, self.port)
+		print(f"Health & Fitness Club menu server listening on {self.host}:{self.port}")
+		async with server:
+			await server.serve_forever()
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Serve the club menu to many TCP clients at once")
+	parser.add_argument("--host", default=HOST)
+	parser.add_argument("--port", type=int, default=PORT)
+	parser.add_argument("--max-clients", type=int, default=MAX_CLIENTS)
+	parser.add_argument("--pool-size", type=int, default=20, help="max pooled DB connections")
+	parser.add_argument("--idle-timeout", type=float, default=IDLE_TIMEOUT)
+	args = parser.parse_args()
+
+	installConsoleRouting()
+	connectToDB(maxconn=args.pool_size)
+	try:
+		asyncio.run(MenuServer(args.host, args.port, args.max_clients, args.idle_timeout).serve())
+	except KeyboardInterrupt:
+		print("\nShutting down...")
+	finally:
+		closeDB()
+
+if __name__ == "__main__":
+	main()
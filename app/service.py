@@ -0,0 +1,1468 @@
+# service.py
+
+# headless versions of the member/trainer/admin operations
+# - no input()/print() in here, everything returns plain dicts/lists
+# - every function takes an open connection (session.connection() / db.connection())
+#   and never commits; the caller decides where the transaction ends
+# used by the CLI modules (member.py, trainer.py, admin.py), api.py and batch.py
+
+from datetime import datetime, timedelta
+import functools
+import io
+import itertools
+import math
+import time
+import psycopg2
+
+import cache
+import scheduler
+
+METRIC_NAMES = ("weight", "body_fat", "heart_rate")
+OPEN_HOUR = 6    # club hours 06:00-22:00
+CLOSE_HOUR = 22
+MIN_SLOT = timedelta(hours=1)
+
+
+class ServiceError(Exception):
+    """bad input for an operation (the message is safe to show the user)"""
+
+class NotFound(ServiceError):
+    """the member/goal/class/trainer asked for doesn't exist (or isn't yours)"""
+
+class Conflict(ServiceError):
+    """the operation clashes with existing data (duplicate email, overlapping booking...)"""
+
+
+def _rowDict(cur, row):
+    if row is None:
+        return None
+    return {col.name: value for col, value in zip(cur.description, row)}
+
+def _rowDicts(cur, rows):
+    names = [col.name for col in cur.description]
+    return [dict(zip(names, row)) for row in rows]
+
+def _memberCached(kind: str):
+    """
+    read through cache.members for fn(conn, member_id) (calls with extra args skip the cache)
+    the writes below go through _membersChanged(), see cache.py
+    """
+    def wrap(fn):
+        @functools.wraps(fn)
+        def cached(conn, member_id, *args, **kwargs):
+            if args or kwargs:
+                return fn(conn, member_id, *args, **kwargs)
+            return cache.members.get(member_id, kind, lambda: fn(conn, member_id))
+        return cached
+    return wrap
+
+def _afterTransaction(conn, fn):
+    """
+    fn() once conn's transaction commits or rolls back (db.ClubConnection), right away on plain connections
+    for dropping cached copies (cache.members, scheduler.engine) only once the write is visible
+    """
+    hook = getattr(conn, "afterTransaction", None)
+    if hook is None:
+        fn()
+    else:
+        hook(fn)
+
+def _membersChanged(conn, member_ids=None):
+    """
+    this transaction wrote member_ids (None: everyone): cache.members keeps nothing for them
+    until it's over, then drops whatever was cached meanwhile
+    """
+    member_ids = None if member_ids is None else list(member_ids)
+    cache.members.hold(member_ids)
+    _afterTransaction(conn, lambda: cache.members.release(member_ids))
+
+
+# -----------------
+# AUTH ....
+# -----------------
+
+def authenticate(conn, email: str, password: str):
+    """
+    check members, then trainers, then admins
+    returns {"role", "member_id", "staff_id", "name"} or None
+    """
+    email = email.strip()
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            "SELECT member_id, fname, lname FROM members WHERE email = %s AND password = %s;",
+            (email, password)
+        )
+        row = cur.fetchone()
+        if row is not None:
+            member_id, fname, lname = row
+            return {"role": "Member", "member_id": int(member_id), "staff_id": -1, "name": f"{fname} {lname}"}
+
+        cur.execute(
+            "SELECT trainer_id, fname, lname FROM trainers WHERE email = %s AND password = %s;",
+            (email, password)
+        )
+        row = cur.fetchone()
+        if row is not None:
+            trainer_id, fname, lname = row
+            return {"role": "Trainer", "member_id": -1, "staff_id": int(trainer_id), "name": f"{fname} {lname}"}
+
+        cur.execute(
+            "SELECT admin_id FROM admins WHERE email = %s AND password = %s;",
+            (email, password)
+        )
+        row = cur.fetchone()
+        if row is not None:
+            return {"role": "Admin", "member_id": -1, "staff_id": -1, "admin_id": int(row[0]), "name": "Admin"}
+        return None
+    finally:
+        cur.close()
+
+
+def validateRegistration(email: str, password: str, bday: str, gender: str):
+    """returns an error message, or None if the registration details look fine"""
+    if not email or "@" not in email:
+        return "Invalid email. Please try again."
+    if not password:
+        return "Password cannot be empty."
+    try:
+        datetime.strptime(bday, "%Y-%m-%d")
+    except (TypeError, ValueError):
+        return "Birthday must be in format YYYY-MM-DD (e.g., 2004-03-03)."
+    if not gender or gender.strip() == "":
+        return "Gender cannot be empty."
+    return None
+
+
+def registerMember(conn, fname: str, lname: str, email: str, password: str, bday: str, gender: str) -> int:
+    error = validateRegistration(email, password, bday, gender)
+    if error:
+        raise ServiceError(error)
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            """
+            INSERT INTO members (fname, lname, email, password, birthday, gender)
+            VALUES (%s, %s, %s, %s, %s, %s)
+            RETURNING member_id;
+            """,
+            (fname, lname, email, password, bday, gender)
+        )
+        return cur.fetchone()[0]
+    except psycopg2.errors.UniqueViolation:
+        raise Conflict("That email is already taken! Try logging in instead.")
+    finally:
+        cur.close()
+
+
+# -----------------
+# MEMBER ....
+# -----------------
+
+@_memberCached("profile")
+def getProfile(conn, member_id: int):
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            "SELECT member_id, fname, lname, email, birthday, gender, class_count "
+            "FROM members WHERE member_id = %s",
+            (member_id,)
+        )
+        return _rowDict(cur, cur.fetchone())
+    finally:
+        cur.close()
+
+
+def updateProfile(conn, member_id: int, fname: str, lname: str, email: str, birthday, gender: str):
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            "UPDATE members SET fname = %s, lname = %s, email = %s, "
+            "birthday = %s, gender = %s WHERE member_id = %s",
+            (fname, lname, email, birthday, gender, member_id)
+        )
+        if cur.rowcount == 0:
+            raise NotFound("Member not found.")
+        _membersChanged(conn, [member_id])
+    except psycopg2.errors.UniqueViolation:
+        raise Conflict("That email is already taken.")
+    finally:
+        cur.close()
+
+
+HISTORY_PAGE_SIZE = 20      # rows per screen / API page
+HISTORY_STREAM_BATCH = 2000 # rows per round trip when streaming with a named cursor
+
+def _historyFilter(member_id, start=None, end=None, after=None):
+    """WHERE clause + params for a member's metrics in [start, end), after the (metric_date, metric_id) key"""
+    where = ["member_id = %s"]
+    params = [member_id]
+    if start is not None:
+        where.append("metric_date >= %s")
+        params.append(start)
+    if end is not None:
+        where.append("metric_date < %s")
+        params.append(end)
+    if after is not None:
+        # keyset: carry on right after the last row we handed out (metric_id breaks date ties)
+        where.append("(metric_date, metric_id) > (%s, %s)")
+        params.extend(after)
+    return " AND ".join(where), params
+
+
+def getMetricHistory(conn, member_id: int, start=None, end=None):
+    """every metric entry for a member (optionally in [start, end)), oldest first"""
+    where, params = _historyFilter(member_id, start, end)
+    cur = conn.cursor()
+    try:
+        cur.execute(f"""
+            SELECT metric_id, metric_date, weight, body_fat, heart_rate
+            FROM metrics
+            WHERE {where}
+            ORDER BY metric_date ASC, metric_id ASC;
+        """, params)
+        return _rowDicts(cur, cur.fetchall())
+    finally:
+        cur.close()
+
+
+def getMetricHistoryPage(conn, member_id: int, after=None, limit: int = HISTORY_PAGE_SIZE, start=None, end=None):
+    """
+    one page of history, oldest first, using keyset pagination (no OFFSET, so page 1000 costs the same as page 1)
+    after = the "next" key from the previous page, (metric_date, metric_id)
+    returns {"rows": [...], "next": key for the following page or None when this was the last one}
+    """
+    where, params = _historyFilter(member_id, start, end, after)
+    cur = conn.cursor()
+    try:
+        # one extra row tells us whether there's another page
+        cur.execute(f"""
+            SELECT metric_id, metric_date, weight, body_fat, heart_rate
+            FROM metrics
+            WHERE {where}
+            ORDER BY metric_date ASC, metric_id ASC
+            LIMIT %s;
+        """, params + [limit + 1])
+        rows = _rowDicts(cur, cur.fetchall())
+    finally:
+        cur.close()
+    next_key = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_key = (rows[-1]["metric_date"], rows[-1]["metric_id"])
+    return {"rows": rows, "next": next_key}
+
+
+_stream_ids = itertools.count(1)
+
+def iterMetricHistory(conn, member_id: int, start=None, end=None, batch_size: int = HISTORY_STREAM_BATCH):
+    """
+    yield a member's metrics (oldest first) as dicts through a server-side named cursor,
+    batch_size rows at a time, so memory stays flat however long the history is
+    the cursor lives inside conn's transaction, so use it up before committing
+    """
+    where, params = _historyFilter(member_id, start, end)
+    cur = conn.cursor(name=f"metric_history_{next(_stream_ids)}")
+    cur.itersize = batch_size
+    try:
+        cur.execute(f"""
+            SELECT metric_id, metric_date, weight, body_fat, heart_rate
+            FROM metrics
+            WHERE {where}
+            ORDER BY metric_date ASC, metric_id ASC;
+        """, params)
+        columns = None
+        for row in cur:
+            if columns is None:
+                columns = [col[0] for col in cur.description]
+            yield dict(zip(columns, row))
+    finally:
+        cur.close()
+
+
+@_memberCached("metrics")
+def getCurrentMetrics(conn, member_id: int):
+    """latest metric entry (from member_metric_summary) or None"""
+    cur = conn.cursor()
+    try:
+        return _firstAndLatestMetrics(cur, member_id)[1]
+    finally:
+        cur.close()
+
+
+# columns of member_metric_summary, first_<col> / latest_<col>
+_SUMMARY_COLUMNS = ("metric_id", "metric_date", "weight", "body_fat", "heart_rate")
+
+def _summaryUpdate(side: str, newer: str) -> str:
+    """SET list that keeps the existing first_*/latest_* unless EXCLUDED is further out"""
+    date_col = f"{side}_date"
+    id_col = f"{side}_metric_id"
+    keep_new = f"(EXCLUDED.{date_col}, EXCLUDED.{id_col}) {newer} (s.{date_col}, s.{id_col})"
+    cols = [id_col, date_col] + [f"{side}_{name}" for name in METRIC_NAMES]
+    return ",\n".join(f"{col} = CASE WHEN {keep_new} THEN EXCLUDED.{col} ELSE s.{col} END" for col in cols)
+
+_ADD_METRICS_SQL = f"""
+    WITH new AS (
+        INSERT INTO metrics (member_id, metric_date, weight, body_fat, heart_rate)
+        VALUES (%s, NOW(), %s, %s, %s)
+        RETURNING metric_id, member_id, metric_date, weight, body_fat, heart_rate
+    ), summary AS (
+        INSERT INTO member_metric_summary AS s (
+            member_id, metric_count,
+            first_metric_id, first_date, first_weight, first_body_fat, first_heart_rate,
+            latest_metric_id, latest_date, latest_weight, latest_body_fat, latest_heart_rate
+        )
+        SELECT member_id, 1,
+               metric_id, metric_date, weight, body_fat, heart_rate,
+               metric_id, metric_date, weight, body_fat, heart_rate
+        FROM new
+        ON CONFLICT (member_id) DO UPDATE SET
+            metric_count = s.metric_count + 1,
+            {_summaryUpdate("first", "<")},
+            {_summaryUpdate("latest", ">")}
+    )
+    SELECT metric_id, metric_date FROM new;
+"""
+
+def addMetrics(conn, member_id: int, weight: float, bf: float, hr: float):
+    """insert a metric row and bump member_metric_summary in the same statement"""
+    cur = conn.cursor()
+    try:
+        cur.execute(_ADD_METRICS_SQL, (member_id, weight, bf, hr))
+        _membersChanged(conn, [member_id])
+        return _rowDict(cur, cur.fetchone())
+    finally:
+        cur.close()
+
+
+def refreshMetricSummary(conn, member_ids=None):
+    """
+    recompute member_metric_summary from metrics, for loaders that insert metrics
+    without going through addMetrics (COPY etc.)
+    member_ids=None redoes everyone, otherwise just those members
+    """
+    where = "member_id IS NOT NULL" if member_ids is None else "member_id = ANY(%(ids)s)"
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            f"""
+            INSERT INTO member_metric_summary AS s (
+                member_id, metric_count,
+                first_metric_id, first_date, first_weight, first_body_fat, first_heart_rate,
+                latest_metric_id, latest_date, latest_weight, latest_body_fat, latest_heart_rate
+            )
+            SELECT
+                c.member_id, c.metric_count,
+                f.metric_id, f.metric_date, f.weight, f.body_fat, f.heart_rate,
+                l.metric_id, l.metric_date, l.weight, l.body_fat, l.heart_rate
+            FROM (
+                SELECT member_id, COUNT(*) AS metric_count FROM metrics WHERE {where} GROUP BY member_id
+            ) c
+            JOIN (
+                SELECT DISTINCT ON (member_id) * FROM metrics WHERE {where}
+                ORDER BY member_id, metric_date ASC, metric_id ASC
+            ) f ON f.member_id = c.member_id
+            JOIN (
+                SELECT DISTINCT ON (member_id) * FROM metrics WHERE {where}
+                ORDER BY member_id, metric_date DESC, metric_id DESC
+            ) l ON l.member_id = c.member_id
+            ON CONFLICT (member_id) DO UPDATE SET
+                metric_count = EXCLUDED.metric_count,
+                first_metric_id = EXCLUDED.first_metric_id, first_date = EXCLUDED.first_date,
+                first_weight = EXCLUDED.first_weight, first_body_fat = EXCLUDED.first_body_fat,
+                first_heart_rate = EXCLUDED.first_heart_rate,
+                latest_metric_id = EXCLUDED.latest_metric_id, latest_date = EXCLUDED.latest_date,
+                latest_weight = EXCLUDED.latest_weight, latest_body_fat = EXCLUDED.latest_body_fat,
+                latest_heart_rate = EXCLUDED.latest_heart_rate;
+            """,
+            {"ids": list(member_ids) if member_ids is not None else None}
+        )
+        _membersChanged(conn, member_ids)
+        return cur.rowcount
+    finally:
+        cur.close()
+
+
+def refreshGoals(conn, member_ids):
+    """set goals.current_metric to each member's latest reading (from member_metric_summary), one statement"""
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            """
+            UPDATE goals g
+            SET current_metric = COALESCE(
+                CASE g.metric_name
+                    WHEN 'weight' THEN s.latest_weight
+                    WHEN 'body_fat' THEN s.latest_body_fat
+                    WHEN 'heart_rate' THEN s.latest_heart_rate
+                END, g.current_metric)
+            FROM member_metric_summary s
+            WHERE s.member_id = g.member_id
+              AND g.member_id = ANY(%s);
+            """,
+            (list(member_ids),)
+        )
+        _membersChanged(conn, member_ids)
+        return cur.rowcount
+    finally:
+        cur.close()
+
+
+def _copyText(value) -> str:
+    if value is None:
+        return "\\N"
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    return str(value)
+
+def bulkAddMetrics(conn, rows):
+    """
+    load many (member_id, metric_date, weight, body_fat, heart_rate) rows at once:
+    COPY into a temp staging table, one INSERT ... SELECT into metrics that also merges
+    member_metric_summary, then one goals refresh for everyone touched
+    (the per-row goals trigger is told to sit this one out, see migration 0004)
+    rows should already be validated, returns {"inserted", "members"}
+    """
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join(_copyText(v) for v in row) + "\n")
+    buffer.seek(0)
+
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS metrics_staging ("
+            "member_id INT, metric_date TIMESTAMP, weight FLOAT, body_fat FLOAT, heart_rate FLOAT"
+            ") ON COMMIT DELETE ROWS;"
+        )
+        cur.execute("TRUNCATE metrics_staging;")
+        cur.copy_expert("COPY metrics_staging (member_id, metric_date, weight, body_fat, heart_rate) FROM STDIN", buffer)
+        cur.execute("SET LOCAL club.bulk_load = 'on';")
+        cur.execute(f"""
+            WITH new AS (
+                INSERT INTO metrics (member_id, metric_date, weight, body_fat, heart_rate)
+                SELECT member_id, metric_date, weight, body_fat, heart_rate FROM metrics_staging
+                RETURNING metric_id, member_id, metric_date, weight, body_fat, heart_rate
+            ), counts AS (
+                SELECT member_id, COUNT(*) AS n FROM new GROUP BY member_id
+            ), firsts AS (
+                SELECT DISTINCT ON (member_id) * FROM new ORDER BY member_id, metric_date ASC, metric_id ASC
+            ), latests AS (
+                SELECT DISTINCT ON (member_id) * FROM new ORDER BY member_id, metric_date DESC, metric_id DESC
+            )
+            INSERT INTO member_metric_summary AS s (
+                member_id, metric_count,
+                first_metric_id, first_date, first_weight, first_body_fat, first_heart_rate,
+                latest_metric_id, latest_date, latest_weight, latest_body_fat, latest_heart_rate
+            )
+            SELECT c.member_id, c.n,
+                   f.metric_id, f.metric_date, f.weight, f.body_fat, f.heart_rate,
+                   l.metric_id, l.metric_date, l.weight, l.body_fat, l.heart_rate
+            FROM counts c
+            JOIN firsts f ON f.member_id = c.member_id
+            JOIN latests l ON l.member_id = c.member_id
+            ON CONFLICT (member_id) DO UPDATE SET
+                metric_count = s.metric_count + EXCLUDED.metric_count,
+                {_summaryUpdate("first", "<")},
+                {_summaryUpdate("latest", ">")}
+            RETURNING member_id;
+        """)
+        member_ids = [row[0] for row in cur.fetchall()]
+        cur.execute("SET LOCAL club.bulk_load = 'off';")
+        cur.execute("SELECT COUNT(*) FROM metrics_staging;")
+        inserted = cur.fetchone()[0]
+        cur.execute("TRUNCATE metrics_staging;")
+    finally:
+        cur.close()
+    refreshGoals(conn, member_ids) # also drops the cached dashboards
+    return {"inserted": inserted, "members": len(member_ids)}
+
+
+TREND_GRAINS = ("day", "week", "month")
+TREND_PERIODS = 12 # default: the last 12 days / weeks / months
+
+def _trendArgs(metric_name: str, grain: str, periods: int):
+    if metric_name not in METRIC_NAMES:
+        raise ServiceError(f"Metric must be one of {', '.join(METRIC_NAMES)}.")
+    if grain not in TREND_GRAINS:
+        raise ServiceError(f"Grain must be one of {', '.join(TREND_GRAINS)}.")
+    if not 1 <= periods <= 366:
+        raise ServiceError("Periods must be between 1 and 366.")
+    return {"metric": metric_name, "grain": grain, "periods": periods}
+
+# first bucket to show: this day/week/month and the periods - 1 before it
+_TREND_SINCE = "(date_trunc(%(grain)s, NOW()) - (%(periods)s - 1) * ('1 ' || %(grain)s)::interval)::date"
+
+def getMetricTrend(conn, member_id: int, metric_name: str, grain: str = "month", periods: int = TREND_PERIODS):
+    """
+    one member's trend from metric_rollups, oldest bucket first
+    [{bucket, samples, avg_value, min_value, max_value, last_value}] (buckets with no readings are skipped)
+    """
+    args = _trendArgs(metric_name, grain, periods)
+    args["member_id"] = member_id
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            f"""
+            SELECT bucket, samples, avg_value, min_value, max_value, last_value
+            FROM member_metric_trends
+            WHERE member_id = %(member_id)s
+              AND metric_name = %(metric)s
+              AND grain = %(grain)s
+              AND bucket >= {_TREND_SINCE}
+            ORDER BY bucket;
+            """,
+            args
+        )
+        return _rowDicts(cur, cur.fetchall())
+    finally:
+        cur.close()
+
+
+def getClubTrend(conn, metric_name: str, grain: str = "month", periods: int = TREND_PERIODS):
+    """
+    the whole club's trend (staff), oldest bucket first
+    [{bucket, members, samples, avg_value, min_value, max_value}]
+    """
+    args = _trendArgs(metric_name, grain, periods)
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            f"""
+            SELECT bucket, members, samples, avg_value, min_value, max_value
+            FROM club_metric_trends
+            WHERE metric_name = %(metric)s
+              AND grain = %(grain)s
+              AND bucket >= {_TREND_SINCE}
+            ORDER BY bucket;
+            """,
+            args
+        )
+        return _rowDicts(cur, cur.fetchall())
+    finally:
+        cur.close()
+
+
+def refreshMetricRollups(conn, member_ids=None):
+    """
+    rebuild metric_rollups from metrics, for loaders that bypass the metrics_rollup trigger
+    (COPY with session_replication_role=replica etc.)
+    member_ids=None redoes everyone, otherwise just those members
+    """
+    where = "m.member_id IS NOT NULL" if member_ids is None else "m.member_id = ANY(%(ids)s)"
+    cur = conn.cursor()
+    try:
+        if member_ids is None:
+            cur.execute("TRUNCATE metric_rollups;")
+        else:
+            cur.execute("DELETE FROM metric_rollups m WHERE m.member_id = ANY(%(ids)s);", {"ids": list(member_ids)})
+        cur.execute(
+            f"""
+            INSERT INTO metric_rollups (member_id, metric_name, grain, bucket, samples, total,
+                                        min_value, max_value, last_value, last_date)
+            SELECT m.member_id, v.metric_name, g.grain, date_trunc(g.grain, m.metric_date)::date,
+                   COUNT(*), SUM(v.value), MIN(v.value), MAX(v.value),
+                   (array_agg(v.value ORDER BY m.metric_date DESC, m.metric_id DESC))[1], MAX(m.metric_date)
+            FROM metrics m
+            CROSS JOIN LATERAL (VALUES ('weight', m.weight), ('body_fat', m.body_fat),
+                                       ('heart_rate', m.heart_rate)) v(metric_name, value)
+            CROSS JOIN (VALUES ('day'), ('week'), ('month')) g(grain)
+            WHERE {where} AND v.value IS NOT NULL
+            GROUP BY 1, 2, 3, 4;
+            """,
+            {"ids": list(member_ids) if member_ids is not None else None}
+        )
+        return cur.rowcount
+    finally:
+        cur.close()
+
+
+FORECAST_WINDOW_DAYS = 90    # fit the line to the last 90 days of daily averages
+FORECAST_MIN_DAYS = 3        # ...as long as there are at least 3 of them
+FORECAST_MAX_AGE = timedelta(days=1) # the window slides, so anything older gets refitted
+FORECAST_HORIZON_DAYS = 730  # ETAs further out than this aren't worth showing
+
+def _forecastFitSql(where: str) -> str:
+    """least-squares line per member + metric over the daily rollups (x = day number, y = day average)"""
+    return f"""
+        SELECT member_id, metric_name,
+               regr_slope(avg_value, day) AS slope_per_day,
+               regr_intercept(avg_value, day) + regr_slope(avg_value, day) * MAX(day) AS fit_value,
+               MAX(bucket) AS fit_date, COUNT(*)::int AS days, regr_r2(avg_value, day) AS r2
+        FROM (
+            SELECT member_id, metric_name, bucket, avg_value, (bucket - DATE '2000-01-01')::float AS day
+            FROM member_metric_trends
+            WHERE grain = 'day'
+              AND bucket > CURRENT_DATE - %(window)s
+              AND {where}
+        ) d
+        GROUP BY member_id, metric_name
+        HAVING COUNT(*) >= %(min_days)s AND regr_slope(avg_value, day) IS NOT NULL
+    """
+
+def refreshForecasts(conn, member_ids=None, stale_only: bool = False) -> int:
+    """
+    refit metric_forecasts in one statement:
+    - stale_only: just the members with new readings since their last fit (drains forecast_stale)
+    - member_ids: just those members
+    - neither: everyone (the window slides, so run this daily)
+    returns how many forecasts were written
+    """
+    cur = conn.cursor()
+    try:
+        if stale_only:
+            cur.execute("DELETE FROM forecast_stale RETURNING member_id;")
+            member_ids = [row[0] for row in cur.fetchall()]
+            if not member_ids:
+                return 0
+        if member_ids is None:
+            cur.execute("DELETE FROM forecast_stale;")
+            cur.execute("DELETE FROM metric_forecasts;")
+            where = "member_id IS NOT NULL"
+        else:
+            member_ids = list(member_ids)
+            cur.execute("DELETE FROM forecast_stale WHERE member_id = ANY(%s);", (member_ids,))
+            cur.execute("DELETE FROM metric_forecasts WHERE member_id = ANY(%s);", (member_ids,))
+            where = "member_id = ANY(%(ids)s)"
+        cur.execute(
+            f"""
+            INSERT INTO metric_forecasts (member_id, metric_name, slope_per_day, fit_value, fit_date, days, r2)
+            {_forecastFitSql(where)};
+            """,
+            {"ids": member_ids, "window": FORECAST_WINDOW_DAYS, "min_days": FORECAST_MIN_DAYS}
+        )
+        return cur.rowcount
+    finally:
+        cur.close()
+
+
+def getMetricForecasts(conn, member_id: int):
+    """
+    {metric_name: {slope_per_day, fit_value, fit_date, days, r2}} for a member
+    from metric_forecasts when it's fresh, otherwise fitted on the spot (read only, one member's rollups)
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            """
+            SELECT f.metric_name, f.slope_per_day, f.fit_value, f.fit_date, f.days, f.r2,
+                   f.computed_at > NOW() - %s AS fresh
+            FROM metric_forecasts f
+            WHERE f.member_id = %s
+              AND NOT EXISTS (SELECT 1 FROM forecast_stale s WHERE s.member_id = f.member_id);
+            """,
+            (FORECAST_MAX_AGE, member_id)
+        )
+        rows = _rowDicts(cur, cur.fetchall())
+        if rows and all(row.pop("fresh") for row in rows):
+            return {row.pop("metric_name"): row for row in rows}
+
+        cur.execute(
+            _forecastFitSql("member_id = %(member_id)s") + ";",
+            {"member_id": member_id, "window": FORECAST_WINDOW_DAYS, "min_days": FORECAST_MIN_DAYS}
+        )
+        fits = {}
+        for row in _rowDicts(cur, cur.fetchall()):
+            row.pop("member_id")
+            fits[row.pop("metric_name")] = row
+        return fits
+    finally:
+        cur.close()
+
+
+def goalEta(fit, start: float, target: float):
+    """
+    when the fitted line reaches target, or None if it isn't heading there (or not within the horizon)
+    the direction has to match the goal: loss goals (target below start) need a falling line
+    """
+    if not fit or start is None or target is None or start == target:
+        return None
+    slope = fit["slope_per_day"]
+    if slope * (target - start) <= 0:
+        return None
+    days = max(0.0, (target - fit["fit_value"]) / slope)
+    if days > FORECAST_HORIZON_DAYS:
+        return None
+    return max(fit["fit_date"] + timedelta(days=math.ceil(days)), datetime.now().date())
+
+def _addForecasts(conn, member_id: int, goals, start_key="start", target_key="target"):
+    """goal["eta"] + goal["trend_per_day"] for each goal dict"""
+    fits = getMetricForecasts(conn, member_id) if goals else {}
+    for goal in goals:
+        fit = fits.get(goal["metric_name"])
+        goal["trend_per_day"] = fit["slope_per_day"] if fit else None
+        goal["eta"] = goalEta(fit, goal.get(start_key), goal.get(target_key))
+    return goals
+
+
+def _firstAndLatestMetrics(cur, member_id: int):
+    """(first, latest) metric dicts for a member from member_metric_summary, (None, None) if nothing recorded"""
+    cur.execute(
+        """
+        SELECT first_date, first_weight, first_body_fat, first_heart_rate,
+               latest_date, latest_weight, latest_body_fat, latest_heart_rate
+        FROM member_metric_summary
+        WHERE member_id = %s;
+        """,
+        (member_id,)
+    )
+    row = cur.fetchone()
+    if row is None:
+        return None, None
+    keys = ("metric_date",) + METRIC_NAMES
+    return dict(zip(keys, row[:4])), dict(zip(keys, row[4:]))
+
+
+def progressRatio(current: float, goal: float, start: float):
+    """
+    how far from start to goal current is, clamped to 0-1
+    - loss goals (weight loss, fat loss, HR improvement): goal below start
+    - gain goals: goal above start
+    None when it can't be worked out (missing values or start == goal)
+    """
+    if start is None or current is None or goal is None:
+        return None
+    if start == goal:
+        return None
+
+    if goal < start:
+        ratio = (start - current) / (start - goal)
+    else:
+        ratio = (current - start) / (goal - start)
+
+    if ratio < 0:
+        ratio = 0
+    elif ratio > 1:
+        ratio = 1
+    return ratio
+
+
+@_memberCached("goals")
+def getGoals(conn, member_id: int):
+    """
+    every goal for a member with start (first metric), current (latest metric) and target
+    start/current are None if no metrics were recorded yet
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            """
+            SELECT goal_id, metric_name, goal_metric
+            FROM goals
+            WHERE member_id = %s
+            ORDER BY goal_id;
+            """,
+            (member_id,)
+        )
+        goal_rows = cur.fetchall()
+        if not goal_rows:
+            return []
+
+        first, latest = _firstAndLatestMetrics(cur, member_id)
+        goals = []
+        for goal_id, metric_name, target in goal_rows:
+            start_val = current_val = None
+            if first is not None and metric_name in METRIC_NAMES:
+                start_val = first[metric_name]
+                current_val = latest[metric_name]
+            goals.append({
+                "goal_id": goal_id,
+                "metric_name": metric_name,
+                "start": start_val,
+                "current": current_val,
+                "target": target,
+                "progress": progressRatio(current_val, target, start_val),
+            })
+        return _addForecasts(conn, member_id, goals)
+    finally:
+        cur.close()
+
+
+def updateGoalTarget(conn, member_id: int, goal_id: int, new_target: float):
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            """
+            UPDATE goals
+            SET goal_metric = %s
+            WHERE goal_id = %s
+              AND member_id = %s;
+            """,
+            (new_target, goal_id, member_id)
+        )
+        if cur.rowcount == 0:
+            raise NotFound("Could not find a matching goal to update.")
+        _membersChanged(conn, [member_id])
+    finally:
+        cur.close()
+
+
+@_memberCached("dashboard")
+def getDashboard(conn, member_id: int):
+    """
+    everything showDashboard() shows:
+    member info, first + latest metrics, and each goal's start/current/target/progress
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            "SELECT member_id, fname, lname, class_count "
+            "FROM members WHERE member_id = %s",
+            (member_id,)
+        )
+        member = _rowDict(cur, cur.fetchone())
+        if member is None:
+            raise NotFound("Member not found.")
+
+        first, latest = _firstAndLatestMetrics(cur, member_id)
+
+        cur.execute(
+            "SELECT metric_name, current_metric, goal_metric "
+            "FROM goals WHERE member_id = %s",
+            (member_id,)
+        )
+        goals = []
+        for metric_name, current_metric, goal_metric in cur.fetchall():
+            start_val = current_val = None
+            if metric_name in METRIC_NAMES:
+                start_val = first[metric_name] if first else None
+                current_val = latest[metric_name] if latest else None
+            goals.append({
+                "metric_name": metric_name,
+                "start": start_val,
+                "current": current_val,
+                "target": goal_metric,
+                "progress": progressRatio(current_val, goal_metric, start_val),
+            })
+        _addForecasts(conn, member_id, goals)
+        return {"member": member, "start_metrics": first, "metrics": latest, "goals": goals}
+    finally:
+        cur.close()
+
+
+CLASS_PAGE_SIZE = 20
+CLASS_TYPES = ("private", "group")
+
+def browseClasses(conn, start=None, end=None, trainer_id: int = None, purpose: str = None,
+                  min_free: int = 1, after=None, limit: int = CLASS_PAGE_SIZE):
+    """
+    one page of classes starting in [start, end) (start defaults to now, so past classes never show),
+    soonest first, optionally for one trainer / one type, with at least min_free spots left
+    keyset paged like getMetricHistoryPage: after = the "next" key, (start_time, booking_id),
+    it walks idx_room_bookings_start (migration 0009) so a page costs the same however many
+    classes the club has ever run
+    returns {"rows": [...], "next": key for the following page or None}
+    """
+    if purpose is not None:
+        purpose = purpose.lower()
+        if purpose not in CLASS_TYPES:
+            raise ServiceError("Class type must be private or group.")
+    if min_free < 0:
+        raise ServiceError("Free spots can't be negative.")
+    where = ["rb.start_time >= %s", "cap.capacity - c.attendance >= %s"]
+    params = [start if start is not None else datetime.now(), min_free]
+    if end is not None:
+        where.append("rb.start_time < %s")
+        params.append(end)
+    if trainer_id is not None:
+        where.append("c.trainer_id = %s")
+        params.append(trainer_id)
+    if purpose is not None:
+        where.append("rb.purpose = %s")
+        params.append(purpose)
+    if after is not None:
+        where.append("(rb.start_time, rb.booking_id) > (%s, %s)")
+        params.extend(after)
+
+    cur = conn.cursor()
+    try:
+        cur.execute(f"""
+            SELECT c.class_id, (t.fname || ' ' || t.lname) AS trainer_name, rb.purpose,
+                   rb.start_time, rb.end_time, r.room_name, c.attendance, cap.capacity,
+                   cap.capacity - c.attendance AS free_spots, rb.booking_id
+            FROM room_bookings rb
+            JOIN classes c ON c.booking_id = rb.booking_id
+            JOIN rooms r ON r.room_id = rb.room_id
+            JOIN trainers t ON t.trainer_id = c.trainer_id
+            CROSS JOIN LATERAL (
+                SELECT CASE WHEN rb.purpose = 'private' THEN 1 ELSE r.max_capacity END AS capacity
+            ) cap
+            WHERE {" AND ".join(where)}
+            ORDER BY rb.start_time ASC, rb.booking_id ASC
+            LIMIT %s;
+        """, params + [limit + 1])
+        rows = _rowDicts(cur, cur.fetchall())
+    finally:
+        cur.close()
+    next_key = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_key = (rows[-1]["start_time"], rows[-1]["booking_id"])
+    return {"rows": rows, "next": next_key}
+
+
+def registerForClass(conn, member_id: int, class_id: int):
+    """
+    one round trip: register_for_class() (migration 0008) checks, takes the seat and inserts
+    the registration together, so a rush on the last seats can't overbook a class
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT register_for_class(%s, %s);", (class_id, member_id))
+        status = cur.fetchone()[0]
+    except psycopg2.errors.LockNotAvailable:
+        raise Conflict("Lots of people are signing up for that class right now, please try again.")
+    finally:
+        cur.close()
+    if status in ("missing", "full"):
+        raise NotFound("That class doesn't exist or is already full.")
+    if status == "duplicate":
+        raise Conflict("You are already registered for this class")
+
+
+# -----------------
+# TRAINER ....
+# -----------------
+
+def listTrainers(conn):
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            "SELECT trainer_id, fname, lname, specialization "
+            "FROM trainers ORDER BY trainer_id;"
+        )
+        return _rowDicts(cur, cur.fetchall())
+    finally:
+        cur.close()
+
+
+def getTrainer(conn, trainer_id: int):
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT trainer_id, fname, lname, specialization FROM trainers WHERE trainer_id = %s;", (trainer_id,))
+        return _rowDict(cur, cur.fetchone())
+    finally:
+        cur.close()
+
+
+def getTrainerAvailability(conn, trainer_id: int):
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            """
+            SELECT slot_id, start_time, end_time
+            FROM trainer_availability
+            WHERE trainer_id = %s
+            ORDER BY start_time;
+            """,
+            (trainer_id,)
+        )
+        return _rowDicts(cur, cur.fetchall())
+    finally:
+        cur.close()
+
+
+def validateAvailabilitySlot(start: datetime, end: datetime, now: datetime = None):
+    """
+    the trainerAddAvail() rules, returns an error message or None if the slot is fine
+    - not in the past
+    - end after start, at least 1 hour long
+    - within business hours (06:00-22:00)
+    """
+    today = (now or datetime.now()).date()
+    if start.date() < today:
+        return "You can't create availability in the past.\nPlease choose today or a future date."
+    if end <= start:
+        return "Availability end time must be AFTER start time. Try again."
+    if end - start < MIN_SLOT:
+        return "Availability times must be longer than 1 hour"
+    if not (OPEN_HOUR <= start.hour < CLOSE_HOUR and OPEN_HOUR <= end.hour <= CLOSE_HOUR):
+        return "Our club only operates between 06:00 and 22:00.\nPlease choose a time window within business hours."
+    return None
+
+
+def addAvailability(conn, trainer_id: int, start: datetime, end: datetime) -> int:
+    """
+    add an availability slot for a trainer, refusing overlaps with their existing slots
+    (the time rules - business hours, not in the past... - are checked by the caller)
+    returns the new slot_id
+    """
+    cur = conn.cursor()
+    try:
+        # overlaps are refused by trainer_availability_no_overlap (migration 0012), the savepoint
+        # keeps the caller's transaction usable when that happens
+        cur.execute("SAVEPOINT new_slot;")
+        try:
+            cur.execute(
+                """
+                INSERT INTO trainer_availability (trainer_id, start_time, end_time)
+                VALUES (%s, %s, %s)
+                RETURNING slot_id;
+                """,
+                (trainer_id, start, end)
+            )
+            slot_id = cur.fetchone()[0]
+        except psycopg2.errors.ExclusionViolation:
+            cur.execute("ROLLBACK TO SAVEPOINT new_slot;")
+            cur.execute(
+                """
+                SELECT slot_id, start_time, end_time
+                FROM trainer_availability
+                WHERE trainer_id = %s
+                AND available_during && tsrange(%s, %s)
+                LIMIT 1;
+                """,
+                (trainer_id, start, end)
+            )
+            conflict = cur.fetchone()
+            if conflict is None:
+                raise Conflict("This slot overlaps with another one of this trainer's slots")
+            slot_id, s_time, e_time = conflict
+            raise Conflict(f"Conflicting Slot {slot_id}: {s_time} -> {e_time}")
+        except psycopg2.errors.ForeignKeyViolation:
+            cur.execute("ROLLBACK TO SAVEPOINT new_slot;")
+            raise NotFound(f"Trainer {trainer_id} doesn't exist.")
+        cur.execute("RELEASE SAVEPOINT new_slot;")
+        _afterTransaction(conn, lambda: scheduler.engine.trainerChanged(trainer_id))
+        return slot_id
+    finally:
+        cur.close()
+
+
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+MAX_TEMPLATE_WEEKS = 52
+
+def expandAvailabilityTemplate(weekdays, start_time, end_time, first_day, weeks: int):
+    """
+    a recurring template -> [(start, end)] datetimes, oldest first
+    e.g. ("mon", "wed", "fri"), 09:00, 12:00, from first_day for 12 weeks
+    (weekdays are names from WEEKDAYS, start_time/end_time are datetime.time, first_day a date)
+    """
+    days = set()
+    for day in weekdays:
+        day = day.strip().lower()[:3]
+        if day not in WEEKDAYS:
+            raise ServiceError(f"Days must be from {', '.join(WEEKDAYS)}.")
+        days.add(WEEKDAYS.index(day))
+    if not days:
+        raise ServiceError("Pick at least one day of the week.")
+    if not 1 <= weeks <= MAX_TEMPLATE_WEEKS:
+        raise ServiceError(f"A template can cover 1 to {MAX_TEMPLATE_WEEKS} weeks.")
+    slots = []
+    for offset in range(weeks * 7):
+        day = first_day + timedelta(days=offset)
+        if day.weekday() in days:
+            slots.append((datetime.combine(day, start_time), datetime.combine(day, end_time)))
+    return slots
+
+
+def bulkAddAvailability(conn, slots):
+    """
+    add many (trainer_id, start, end) availability slots at once, all or nothing:
+    - every slot has to pass validateAvailabilitySlot() (business hours, not in the past...)
+    - COPY into a temp staging table, then one query finds every overlap, with existing slots
+      or inside the batch itself
+    - one INSERT ... SELECT (trainer_availability_no_overlap still has the last word)
+    returns how many slots were added
+    """
+    slots = list(slots)
+    for trainer_id, start, end in slots:
+        problem = validateAvailabilitySlot(start, end)
+        if problem:
+            raise ServiceError(f"{start:%Y-%m-%d %H:%M} -> {end:%H:%M}: {problem}".replace("\n", " "))
+    if not slots:
+        return 0
+
+    buffer = io.StringIO()
+    for row in slots:
+        buffer.write("\t".join(_copyText(v) for v in row) + "\n")
+    buffer.seek(0)
+
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS availability_staging ("
+            "n SERIAL, trainer_id INT, start_time TIMESTAMP, end_time TIMESTAMP"
+            ") ON COMMIT DELETE ROWS;"
+        )
+        cur.execute("TRUNCATE availability_staging;")
+        cur.copy_expert("COPY availability_staging (trainer_id, start_time, end_time) FROM STDIN", buffer)
+        cur.execute(
+            """
+            SELECT s.trainer_id, s.start_time, s.end_time, a.start_time, a.end_time
+            FROM availability_staging s
+            JOIN trainer_availability a
+              ON a.trainer_id = s.trainer_id
+             AND a.available_during && tsrange(s.start_time, s.end_time)
+            UNION ALL
+            SELECT s.trainer_id, s.start_time, s.end_time, o.start_time, o.end_time
+            FROM availability_staging s
+            JOIN availability_staging o
+              ON o.trainer_id = s.trainer_id AND o.n > s.n
+             AND tsrange(o.start_time, o.end_time) && tsrange(s.start_time, s.end_time)
+            ORDER BY 1, 2;
+            """
+        )
+        clashes = cur.fetchall()
+        if clashes:
+            trainer_id, start, end, other_start, other_end = clashes[0]
+            raise Conflict(
+                f"{len(clashes)} of these slots overlap other availability, nothing was added. "
+                f"First one: trainer {trainer_id} {start} -> {end} overlaps {other_start} -> {other_end}"
+            )
+        cur.execute("SAVEPOINT new_slots;")
+        try:
+            cur.execute(
+                "INSERT INTO trainer_availability (trainer_id, start_time, end_time) "
+                "SELECT trainer_id, start_time, end_time FROM availability_staging;"
+            )
+            added = cur.rowcount
+        except psycopg2.errors.ExclusionViolation:
+            # someone added an overlapping slot between the check and the insert
+            cur.execute("ROLLBACK TO SAVEPOINT new_slots;")
+            raise Conflict("Another slot was just added that overlaps these, nothing was added. Please try again.")
+        except psycopg2.errors.ForeignKeyViolation:
+            cur.execute("ROLLBACK TO SAVEPOINT new_slots;")
+            raise NotFound("One of those trainers doesn't exist.")
+        cur.execute("RELEASE SAVEPOINT new_slots;")
+        cur.execute("TRUNCATE availability_staging;")
+        trainer_ids = {trainer_id for trainer_id, _, _ in slots}
+        _afterTransaction(conn, lambda: scheduler.engine.trainerChanged(*trainer_ids))
+        return added
+    finally:
+        cur.close()
+
+
+MEMBER_SEARCH_LIMIT = 20
+MEMBER_SEARCH_SIMILARITY = 0.4 # pg_trgm word similarity cutoff, low enough that "glroia" still finds Gloria
+
+TRIGRAM_RECHECK = 300.0 # seconds, another process may migrate or reset the database under us
+
+_has_trigram = None
+_trigram_checked_at = 0.0
+
+def forgetTrigram():
+    """make the next search look pg_trgm up again (db.migrate/resetDB call this)"""
+    global _has_trigram
+    _has_trigram = None
+
+def _hasTrigram(conn) -> bool:
+    """is pg_trgm installed (migration 0013 only adds it when the server has it), rechecked every TRIGRAM_RECHECK seconds"""
+    global _has_trigram, _trigram_checked_at
+    if _has_trigram is None or time.monotonic() - _trigram_checked_at > TRIGRAM_RECHECK:
+        cur = conn.cursor()
+        try:
+            cur.execute("SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm');")
+            _has_trigram = cur.fetchone()[0]
+            _trigram_checked_at = time.monotonic()
+        finally:
+            cur.close()
+    return _has_trigram
+
+
+def searchMembers(conn, name_query: str, limit: int = MEMBER_SEARCH_LIMIT):
+    """
+    case-insensitive staff lookup by name (first, last or full) or email, at most limit rows
+    - with pg_trgm: matches anywhere and tolerates typos, best matches first (trigram indexes)
+    - without it, or for 1-2 letters: names/emails starting with the query (prefix indexes)
+    """
+    query = " ".join(name_query.lower().split())
+    if not query:
+        return []
+    escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    cur = conn.cursor()
+    try:
+        if len(query) >= 3 and _hasTrigram(conn):
+            cur.execute("SET LOCAL pg_trgm.word_similarity_threshold = %s;", (MEMBER_SEARCH_SIMILARITY,))
+            cur.execute(
+                """
+                SELECT member_id, fname, lname, email
+                FROM (
+                    SELECT member_id, fname, lname, email,
+                           GREATEST(word_similarity(%(q)s, LOWER(fname || ' ' || lname)),
+                                    word_similarity(%(q)s, LOWER(email))) AS score
+                    FROM members
+                    WHERE %(q)s <%% LOWER(fname || ' ' || lname)
+                    OR LOWER(fname || ' ' || lname) LIKE %(anywhere)s
+                    OR %(q)s <%% LOWER(email)
+                    OR LOWER(email) LIKE %(anywhere)s
+                ) matches
+                ORDER BY score DESC, member_id
+                LIMIT %(limit)s;
+                """,
+                {"q": query, "anywhere": f"%{escaped}%", "limit": limit}
+            )
+        else:
+            cur.execute(
+                """
+                SELECT member_id, fname, lname, email
+                FROM members
+                WHERE LOWER(fname || ' ' || lname) LIKE %(prefix)s
+                OR LOWER(lname) LIKE %(prefix)s
+                OR LOWER(email) LIKE %(prefix)s
+                ORDER BY member_id
+                LIMIT %(limit)s;
+                """,
+                {"prefix": f"{escaped}%", "limit": limit}
+            )
+        return _rowDicts(cur, cur.fetchall())
+    finally:
+        cur.close()
+
+
+@_memberCached("summary")
+def getMemberSummary(conn, member_id: int):
+    """staff view of a member: basic info, last recorded metrics, goals (or None if no such member)"""
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            """
+            SELECT member_id, fname, lname, email
+            FROM members
+            WHERE member_id = %s;
+            """,
+            (member_id,)
+        )
+        member = _rowDict(cur, cur.fetchone())
+        if member is None:
+            return None
+
+        first, latest = _firstAndLatestMetrics(cur, member_id)
+
+        cur.execute(
+            """
+            SELECT metric_name, current_metric, goal_metric
+            FROM goals
+            WHERE member_id = %s
+            ORDER BY metric_name;
+            """,
+            (member_id,)
+        )
+        goals = _rowDicts(cur, cur.fetchall())
+        for goal in goals:
+            goal["start"] = first.get(goal["metric_name"]) if first else None
+            goal["progress"] = progressRatio(goal["current_metric"], goal["goal_metric"], goal["start"])
+        _addForecasts(conn, member_id, goals, target_key="goal_metric")
+        return {"member": member, "latest_metrics": latest, "goals": goals}
+    finally:
+        cur.close()
+
+
+ROSTER_LIMIT = 500 # most members one roster returns
+
+def getRoster(conn, member_ids=None, trainer_id: int = None, limit: int = ROSTER_LIMIT):
+    """
+    getMemberSummary() for many members in one query: the given member_ids, or everyone
+    registered in trainer_id's classes, sorted by name
+    [{member, latest_metrics, goals}] with the same keys getMemberSummary uses
+    ETAs come from the cached forecasts as they are (forecast.py keeps those fresh),
+    a roster never fits lines on the spot
+    """
+    if (member_ids is None) == (trainer_id is None):
+        raise ServiceError("Give either a list of members or a trainer.")
+    if member_ids is not None:
+        roster = "SELECT DISTINCT unnest(%(member_ids)s::int[]) AS member_id"
+    else:
+        roster = """
+            SELECT DISTINCT cr.member_id
+            FROM classes c
+            JOIN class_regs cr ON cr.class_id = c.class_id
+            WHERE c.trainer_id = %(trainer_id)s
+        """
+    cur = conn.cursor()
+    try:
+        # one row per (member, goal), members without goals still get one row
+        cur.execute(
+            f"""
+            WITH roster AS (
+                {roster}
+                ORDER BY member_id
+                LIMIT %(limit)s
+            )
+            SELECT m.member_id, m.fname, m.lname, m.email,
+                   s.first_weight, s.first_body_fat, s.first_heart_rate,
+                   s.latest_date, s.latest_weight, s.latest_body_fat, s.latest_heart_rate,
+                   g.metric_name, g.current_metric, g.goal_metric,
+                   f.slope_per_day, f.fit_value, f.fit_date
+            FROM roster r
+            JOIN members m ON m.member_id = r.member_id
+            LEFT JOIN member_metric_summary s ON s.member_id = m.member_id
+            LEFT JOIN goals g ON g.member_id = m.member_id
+            LEFT JOIN metric_forecasts f ON f.member_id = g.member_id AND f.metric_name = g.metric_name
+            ORDER BY m.lname, m.fname, m.member_id, g.metric_name;
+            """,
+            {"member_ids": list(member_ids or []), "trainer_id": trainer_id, "limit": limit}
+        )
+        rows = cur.fetchall()
+    finally:
+        cur.close()
+
+    summaries = []
+    first = {}
+    for row in rows:
+        (member_id, fname, lname, email, first_weight, first_body_fat, first_heart_rate,
+         latest_date, latest_weight, latest_body_fat, latest_heart_rate,
+         metric_name, current_metric, goal_metric, slope_per_day, fit_value, fit_date) = row
+        if not summaries or summaries[-1]["member"]["member_id"] != member_id:
+            latest = None
+            if latest_date is not None:
+                latest = dict(zip(("metric_date",) + METRIC_NAMES,
+                                  (latest_date, latest_weight, latest_body_fat, latest_heart_rate)))
+            summaries.append({
+                "member": {"member_id": member_id, "fname": fname, "lname": lname, "email": email},
+                "latest_metrics": latest,
+                "goals": [],
+            })
+            first = dict(zip(METRIC_NAMES, (first_weight, first_body_fat, first_heart_rate)))
+        if metric_name is None:
+            continue
+        summary = summaries[-1]
+        start = first.get(metric_name) if summary["latest_metrics"] else None
+        fit = None
+        if slope_per_day is not None:
+            fit = {"slope_per_day": slope_per_day, "fit_value": fit_value, "fit_date": fit_date}
+        summary["goals"].append({
+            "metric_name": metric_name,
+            "current_metric": current_metric,
+            "goal_metric": goal_metric,
+            "start": start,
+            "progress": progressRatio(current_metric, goal_metric, start),
+            "trend_per_day": slope_per_day,
+            "eta": goalEta(fit, start, goal_metric),
+        })
+    return summaries
+
+
+# -----------------
+# ADMIN ....
+# -----------------
+
+def bookRoom(conn, room_id: int, start: datetime, end: datetime, purpose: str) -> int:
+    """book a room, overlapping bookings are refused by room_bookings_no_overlap (migration 0012)"""
+    cur = conn.cursor()
+    try:
+        cur.execute("SAVEPOINT new_booking;")
+        try:
+            cur.execute("INSERT into room_bookings (room_id, start_time, end_time, purpose) VALUES (%s, %s, %s, %s) RETURNING booking_id;", (room_id, start, end, purpose))
+            booking_id = cur.fetchone()[0]
+        except psycopg2.errors.ExclusionViolation:
+            cur.execute("ROLLBACK TO SAVEPOINT new_booking;")
+            cur.execute(
+                """
+                SELECT start_time, end_time
+                FROM room_bookings
+                WHERE room_id = %s
+                AND booked_during && tsrange(%s, %s)
+                LIMIT 1;
+                """,
+                (room_id, start, end)
+            )
+            conflict = cur.fetchone()
+            detail = f"\nConflicting booking in room {room_id}: {conflict[0]} -> {conflict[1]}" if conflict else ""
+            raise Conflict(f"\nERROR: This new booking overlaps with an existing one (so it can't be added).{detail}\n")
+        except psycopg2.errors.ForeignKeyViolation:
+            cur.execute("ROLLBACK TO SAVEPOINT new_booking;")
+            raise NotFound(f"Room {room_id} doesn't exist.")
+        cur.execute("RELEASE SAVEPOINT new_booking;")
+        _afterTransaction(conn, lambda: scheduler.engine.roomChanged(room_id))
+        return booking_id
+    finally:
+        cur.close()
+
+
+def getAvailabilityCovering(conn, trainer_id: int, start: datetime, end: datetime):
+    """the trainer's availability slot covering start-end, or None if they aren't free"""
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            "SELECT slot_id, start_time, end_time FROM trainer_availability "
+            "WHERE trainer_id = %s AND available_during @> tsrange(%s, %s);",
+            (trainer_id, start, end)
+        )
+        return _rowDict(cur, cur.fetchone())
+    finally:
+        cur.close()
+
+
+def listFreeRooms(conn, start: datetime, end: datetime):
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            """
+            SELECT r.room_id, r.room_name, r.max_capacity
+            FROM rooms r
+            WHERE NOT EXISTS (
+                SELECT 1
+                FROM room_bookings b
+                WHERE b.room_id = r.room_id
+                AND b.booked_during && tsrange(%s, %s, '[)')
+            )
+            ORDER BY r.room_id;
+            """, (start, end)
+        )
+        return _rowDicts(cur, cur.fetchall())
+    finally:
+        cur.close()
+
+
+SUGGESTION_LIMIT = 5
+SUGGESTION_WINDOW = timedelta(days=7)
+SUGGESTION_STEP = timedelta(minutes=30) # suggested classes start on the hour / half hour
+
+def suggestClassSlots(conn, trainer_id: int, minutes: int = 60, min_capacity: int = 1,
+                      start: datetime = None, end: datetime = None, limit: int = SUGGESTION_LIMIT):
+    """
+    the first limit times trainer_id could teach a minutes long class in a room holding min_capacity
+    people, between start (default now) and end (default a week after start), each with the
+    smallest room that fits: [{start_time, end_time, room_id, room_name, max_capacity}]
+    answered from scheduler.engine's in-memory timelines, createClass re-checks it all when booking
+    """
+    if minutes <= 0:
+        raise ServiceError("Class length must be a positive number of minutes.")
+    if min_capacity < 1:
+        raise ServiceError("The room has to fit at least 1 person.")
+    now = datetime.now()
+    start = max(start or now, now)
+    end = end or start + SUGGESTION_WINDOW
+    return scheduler.engine.suggest(conn, trainer_id, timedelta(minutes=minutes), start, end,
+                                    min_capacity, limit, SUGGESTION_STEP)
+
+
+def createClass(conn, trainer_id: int, room_id: int, start: datetime, end: datetime, purpose: str):
+    """
+    book room_id for a class led by trainer_id:
+    - the trainer has to have an availability slot covering start-end
+    - that slot is split around the class (leftovers under 1 hour are dropped)
+    - the room is booked and the class row created
+    returns {"class_id", "booking_id"}
+    """
+    purpose = purpose.lower()
+    if purpose not in ("private", "group"):
+        raise ServiceError("Class type must be private or group.")
+    if end <= start:
+        raise ServiceError("Class end time must be after the start time.")
+    if getTrainer(conn, trainer_id) is None:
+        raise NotFound("Please input a valid trainer ID")
+
+    slot = getAvailabilityCovering(conn, trainer_id, start, end)
+    if slot is None:
+        raise Conflict("The trainer is not available for those times")
+
+    cur = conn.cursor()
+    try:
+        # lock the slot and re-read it, another class may have split it since we looked it up
+        cur.execute("SELECT end_time FROM trainer_availability WHERE slot_id = %s AND available_during @> tsrange(%s, %s) FOR UPDATE;", (slot["slot_id"], start, end))
+        locked = cur.fetchone()
+        if locked is None:
+            raise Conflict("The trainer is not available for those times")
+        # Split up availability into 2 timeslots
+        cur.execute("UPDATE trainer_availability SET end_time = %s WHERE slot_id = %s;", (start, slot["slot_id"]))
+        cur.execute("INSERT INTO trainer_availability (trainer_id, start_time, end_time) VALUES (%s, %s, %s);", (trainer_id, end, locked[0]))
+        cur.execute("DELETE FROM trainer_availability WHERE trainer_id = %s AND end_time - start_time < INTERVAL '1 hour';", (trainer_id,)) # Maintain 1 hour availability
+        _afterTransaction(conn, lambda: scheduler.engine.trainerChanged(trainer_id))
+
+        booking_id = bookRoom(conn, room_id, start, end, purpose)
+        cur.execute("INSERT INTO classes (booking_id, trainer_id) VALUES (%s, %s) RETURNING class_id;", (booking_id, trainer_id))
+        return {"class_id": cur.fetchone()[0], "booking_id": booking_id}
+    finally:
+        cur.close()
@@ -5,21 +5,55 @@
 # INITIALIZATION VALUES....
 # -----------------
 
-conn = None
-currentUser = -1
+pool = None # db.ConnectionPool, set by connectToDB()
 
-# ADDED ROLE NAMES
-currentRole = "System" # System, Member, Trainer, Admin
-currentStaffId = -1
+
+class Session:
+    """
+    one logged in person (terminal, front desk, kiosk...)
+    holds what used to be the currentUser / currentRole / currentStaffId globals,
+    so one process can serve many sessions at once (threads or asyncio tasks)
+    every member/trainer/admin function takes the session as its first arg
+    """
+
+    def __init__(self, pool=None):
+        self.currentUser = -1
+        # ADDED ROLE NAMES
+        self.currentRole = "System" # System, Member, Trainer, Admin
+        self.currentStaffId = -1
+        self.pool = pool # None -> use the process wide state.pool
+
+    def getPool(self):
+        return self.pool if self.pool is not None else pool
+
+    def connection(self):
+        """
+        with session.connection() as conn: ...
+        checks a connection out of this session's pool for the length of the block
+        """
+        session_pool = self.getPool()
+        if session_pool is None:
+            raise RuntimeError("No DB Connection; call connectToDB() first")
+        return session_pool.connection()
+
+    def logout(self):
+        self.currentUser = -1
+        self.currentRole = "System"
+        self.currentStaffId = -1
+
+    def __repr__(self):
+        return f"Session(role={self.currentRole}, user={self.currentUser}, staff={self.currentStaffId})"
 
 # Basic setup for querying:
-# cur = conn.cursor()
-# cur.execute(QUERY)
-# If return data:
-# 	for row in cur.fetchall(): print(row)
-# cur.close()
-# Push modifications to the DB:
-# 	conn.commit()
+# with session.connection() as conn:   (checks a connection out of the pool)
+# 	cur = conn.cursor()
+# 	cur.execute(QUERY)
+# 	If return data:
+# 		for row in cur.fetchall(): print(row)
+# 	cur.close()
+# 	Push modifications to the DB:
+# 		conn.commit()
+# anything not committed is rolled back when the connection goes back to the pool
 
 # ANSI colors for terminal output (GLORIA)
 RESET = "\033[0m"
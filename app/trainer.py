@@ -1,80 +1,61 @@
 # trainer.py
 
-from datetime import datetime, timedelta
-import state
+from datetime import datetime
+import service
+from member import askTrendOptions, printTrend, etaText, metricText
 
 # listAllTrainers(), showTrainerAvailability(), trainerViewAvail(),
-# showMemberSummaryForStaff(), trainerMemberLookup(), trainerAddAvail()
+# showMemberSummaryForStaff(), trainerMemberLookup(), trainerRoster(), staffMetricTrends(), trainerAddAvail(),
+# trainerAddRecurringAvail()
 
 # -----------------
 # TRAINER SECTION....
 # -----------------
 
-def listAllTrainers():
+def listAllTrainers(session):
     """
     helper fn: print all trainers w their ids and course offerings
     both available to member + staff
     """
-    conn = state.conn
-    cur = conn.cursor()
     print("\n--- Trainer Directory ---")
     try:
-        cur.execute(
-            "SELECT trainer_id, fname, lname, specialization "
-            "FROM trainers ORDER BY trainer_id;"
-        )
-        trainers = cur.fetchall()
+        with session.connection() as conn:
+            trainers = service.listTrainers(conn)
 
         if not trainers:
             print("No trainers found.\n")
         else:
             print("Available Trainers:\n")
-            for tid, fname, lname, spec in trainers:
-                print(f"  ID {tid}: {fname} {lname} — {spec}")
+            for t in trainers:
+                print(f"  ID {t['trainer_id']}: {t['fname']} {t['lname']} — {t['specialization']}")
             print()
     except Exception as e:
         print("Could not fetch trainer list:", e)
-    finally:
-        cur.close()
 
 
-def showTrainerAvailability(trainer_id: int):
+def showTrainerAvailability(session, trainer_id: int):
     """
     this is a helper function
     given a trainer_id, print trainer availability
     for trainerViewAvail() + staff views
     """
-    conn = state.conn
-    cur = conn.cursor()
     try:
-        cur.execute(
-            """
-            SELECT t.fname, t.lname,
-                   a.slot_id, a.start_time, a.end_time
-            FROM trainer_availability a
-            JOIN trainers t ON a.trainer_id = t.trainer_id
-            WHERE a.trainer_id = %s
-            ORDER BY a.start_time;
-            """,
-            (trainer_id,)
-        )
-        rows = cur.fetchall()
-        if not rows:
+        with session.connection() as conn:
+            trainer = service.getTrainer(conn, trainer_id)
+            rows = service.getTrainerAvailability(conn, trainer_id)
+        if trainer is None or not rows:
             print("No availability slots found for this trainer.\n")
             return
 
-        trainer_fname, trainer_lname = rows[0][0], rows[0][1]
-        print(f"\nAvailability for Trainer {trainer_id} — {trainer_fname} {trainer_lname}:\n")
-        for _, _, slot_id, start_time, end_time in rows:
-            print(f"  Slot {slot_id}: {start_time} -> {end_time}")
+        print(f"\nAvailability for Trainer {trainer_id} — {trainer['fname']} {trainer['lname']}:\n")
+        for slot in rows:
+            print(f"  Slot {slot['slot_id']}: {slot['start_time']} -> {slot['end_time']}")
         print()
     except Exception as e:
         print("Could not fetch availability:", e)
-    finally:
-        cur.close()
 
 
-def trainerViewAvail():
+def trainerViewAvail(session):
     """
     MEMBER FUNCTION:
     - MUST BE logged-in as a member or staff
@@ -82,13 +63,13 @@ def trainerViewAvail():
     - shows their availability
     - repeats until u wanna exit
     """
-    if state.currentRole == "System":
+    if session.currentRole == "System":
         print("Please log in first to view trainer availability.")
         return
 
     while True:
         # show all the trainers that are in db
-        listAllTrainers()
+        listAllTrainers(session)
         # prompt: choose by trainer id
         print("| Trainer: View Availability |")
         trainer_id_input = input("Enter Trainer ID (or '0' to return to menu): ").strip()
@@ -102,7 +83,7 @@ def trainerViewAvail():
             continue
 
         # show chosen trainer availability
-        showTrainerAvailability(trainer_id)
+        showTrainerAvailability(session, trainer_id)
 
         # reprompt --> LOOP THIS
         again = input("View another trainer? (y/n): ").strip().lower()
@@ -111,7 +92,7 @@ def trainerViewAvail():
             return
 
 
-def showMemberSummaryForStaff(member_id: int):
+def showMemberSummaryForStaff(session, member_id: int):
     """
     HELPER FUNC: (access only to trainer + admin)
     given member_id, DISPLAY:
@@ -119,146 +100,195 @@ def showMemberSummaryForStaff(member_id: int):
     - last recorded metrics
     - all current goals
     """
-    conn = state.conn
-    cur = conn.cursor()
-    try:
-        # 1) basic member info
-        cur.execute(
-            """
-            SELECT fname, lname, email
-            FROM members
-            WHERE member_id = %s;
-            """,
-            (member_id,)
-        )
-        row = cur.fetchone()
-        if not row:
-            print("\nMember not found.\n")
-            return
-        fname, lname, email = row
-
-        # 2) last metrics
-        cur.execute(
-            """
-            SELECT metric_date, weight, body_fat, heart_rate
-            FROM metrics
-            WHERE member_id = %s
-            ORDER BY metric_date DESC
-            LIMIT 1;
-            """,
-            (member_id,)
-        )
-        latest_metric = cur.fetchone()
-
-        # 3) goals
-        cur.execute(
-            """
-            SELECT metric_name, current_metric, goal_metric
-            FROM goals
-            WHERE member_id = %s
-            ORDER BY metric_name;
-            """,
-            (member_id,)
-        )
-        goals = cur.fetchall()
-
-        print("\n──────── Member Snapshot ────────")
-        print(f"Name:  {fname} {lname}")
-        print(f"Email: {email}")
-
-        if latest_metric is None:
-            print("\nLast Recorded Metrics: (none yet)")
-        else:
-            metric_date, weight, body_fat, heart_rate = latest_metric
-            print("\nLast Recorded Metrics:")
-            print(f"  Date:        {metric_date.strftime('%Y-%m-%d %H:%M')}")
-            print(f"  Weight (kg): {weight}")
-            print(f"  Body Fat %:  {body_fat}")
-            print(f"  HR (bpm):    {heart_rate}")
-
-        print("\nGoals:")
-        if not goals:
-            print("  (no goals set yet)")
-        else:
-            print(f"{'Metric':<10} {'Current':<10} {'Target':<10}")
-            print("─" * 32)
-            for metric_name, current_metric, goal_metric in goals:
-                print(f"{metric_name:<10} {current_metric:<10} {goal_metric:<10}")
-        print("────────────────────────────────\n")
-    finally:
-        cur.close()
-
-
-def trainerMemberLookup():
+    with session.connection() as conn:
+        summary = service.getMemberSummary(conn, member_id)
+    if summary is None:
+        print("\nMember not found.\n")
+        return
+    member = summary["member"]
+    latest_metric = summary["latest_metrics"]
+    goals = summary["goals"]
+
+    print("\n──────── Member Snapshot ────────")
+    print(f"Name:  {member['fname']} {member['lname']}")
+    print(f"Email: {member['email']}")
+
+    if latest_metric is None:
+        print("\nLast Recorded Metrics: (none yet)")
+    else:
+        print("\nLast Recorded Metrics:")
+        print(f"  Date:        {latest_metric['metric_date'].strftime('%Y-%m-%d %H:%M')}")
+        print(f"  Weight (kg): {metricText(latest_metric['weight'])}")
+        print(f"  Body Fat %:  {metricText(latest_metric['body_fat'])}")
+        print(f"  HR (bpm):    {metricText(latest_metric['heart_rate'])}")
+
+    print("\nGoals:")
+    if not goals:
+        print("  (no goals set yet)")
+    else:
+        print(f"{'Metric':<10} {'Current':<10} {'Target':<10} {'ETA'}")
+        print("─" * 32)
+        for goal in goals:
+            print(f"{goal['metric_name']:<10} {goal['current_metric']:<10} {goal['goal_metric']:<10} {etaText(goal)}")
+    print("────────────────────────────────\n")
+
+
+def trainerMemberLookup(session):
     """
     TRAINER/ADMIN FUNCTION CHECKLIST
     - search for members by name MAKE SURE ITS case insensitive
     - View last metrics + current goals in READ-ONLY mode
     """
-    if state.currentRole not in ("Trainer", "Admin"):
+    if session.currentRole not in ("Trainer", "Admin"):
         print("\nERROR: Staff access only. Please log in as a trainer or admin.\n")
         return
 
-    conn = state.conn
-
     while True:
         print("\n| Staff: Member Lookup |")
-        name_query = input("Enter member name (or '0' to return to main menu): ").strip()
+        name_query = input("Enter member name or email (or '0' to return to main menu): ").strip()
         if name_query == "0":
             print("Returning to Main Menu...\n")
             return
 
-        search_pattern = f"%{name_query.lower()}%"
-        cur = conn.cursor()
+        # case-insensitive search: fname, lname, full name or email, best matches first
+        with session.connection() as conn:
+            matches = service.searchMembers(conn, name_query)
+
+        if not matches:
+            print("\nNo members found with that name, please try again.\n")
+            continue
+
+        print("\nSearch results:")
+        for m in matches:
+            print(f"  ID {m['member_id']}: {m['fname']} {m['lname']} ({m['email']})")
+        if len(matches) == service.MEMBER_SEARCH_LIMIT:
+            print(f"  (only the best {service.MEMBER_SEARCH_LIMIT} matches shown, type more of the name to narrow it down)")
+
+        chosen = input("\nEnter Member ID to view details (or '0' to search again): ").strip()
+        if chosen == "0":
+            continue
         try:
-            # case-insensitive search: fname, lname, or full name
-            cur.execute(
-                """
-                SELECT member_id, fname, lname, email
-                FROM members
-                WHERE LOWER(fname) LIKE %s
-                OR LOWER(lname) LIKE %s
-                OR LOWER(fname || ' ' || lname) LIKE %s
-                ORDER BY member_id;
-                """,
-                (search_pattern, search_pattern, search_pattern)
-            )
-            matches = cur.fetchall()
-
-            if not matches:
-                print("\nNo members found with that name, please try again.\n")
-                continue
+            member_id = int(chosen)
+        except ValueError:
+            print("\nInvalid member ID. Please try again.\n")
+            continue
 
-            print("\nSearch results:")
-            for mid, fname, lname, email in matches:
-                print(f"  ID {mid}: {fname} {lname} ({email})")
+        valid_ids = {m['member_id'] for m in matches}
+        if member_id not in valid_ids:
+            print("\nThat member ID was not in the search results. Pls try again.\n")
+            continue
 
-            chosen = input("\nEnter Member ID to view details (or '0' to search again): ").strip()
-            if chosen == "0":
-                continue
-            try:
-                member_id = int(chosen)
-            except ValueError:
-                print("\nInvalid member ID. Please try again.\n")
-                continue
+        # display
+        showMemberSummaryForStaff(session, member_id)
 
-            valid_ids = {row[0] for row in matches}
-            if member_id not in valid_ids:
-                print("\nThat member ID was not in the search results. Pls try again.\n")
-                continue
+        again = input("Look up another member? (y/n): ").strip().lower()
+        if again != "y":
+            print("Returning to Main Menu...\n")
+            return
 
-            # display
-            showMemberSummaryForStaff(member_id)
 
-            again = input("Look up another member? (y/n): ").strip().lower()
-            if again != "y":
-                print("Returning to Main Menu...\n")
-                return
-        finally:
-            cur.close()
+def trainerRoster(session):
+    """
+    TRAINER/ADMIN FUNCTION
+    - one compact table of many members (everyone in a trainer's classes, or a list of IDs)
+    - the whole roster is one query (service.getRoster), not a lookup per member
+    """
+    if session.currentRole not in ("Trainer", "Admin"):
+        print("\nERROR: Staff access only. Please log in as a trainer or admin.\n")
+        return
 
+    print("\n| Staff: Client Roster |")
+    if session.currentRole == "Trainer":
+        prompt = "Member IDs separated by commas (blank = everyone in your classes, 0 = back): "
+    else:
+        prompt = "Member IDs separated by commas, or t<ID> for a trainer's classes e.g. t2 (0 = back): "
+    choice = input(prompt).strip().lower()
+    if choice == "0":
+        print("Returning to Main Menu...\n")
+        return
 
-def trainerAddAvail():
+    try:
+        if choice == "" and session.currentRole == "Trainer":
+            member_ids, trainer_id = None, session.currentStaffId
+        elif choice.startswith("t"):
+            member_ids, trainer_id = None, int(choice[1:])
+        else:
+            member_ids, trainer_id = [int(part) for part in choice.split(",") if part.strip()], None
+    except ValueError:
+        print("\nInvalid input, use numbers (e.g. 12, 40, 7) or t<trainer ID>.\n")
+        return
+    if member_ids is not None and not member_ids:
+        print("\nNo member IDs given.\n")
+        return
+
+    with session.connection() as conn:
+        roster = service.getRoster(conn, member_ids=member_ids, trainer_id=trainer_id)
+    if not roster:
+        print("\nNo members to show.\n")
+        return
+
+    print(f"\n{'ID':<8} {'Name':<24} {'Last Reading':<12} {'Weight':>7} {'BF%':>6} {'HR':>5}  Goals (progress, ETA)")
+    print("─" * 100)
+    for summary in roster:
+        member = summary["member"]
+        latest = summary["latest_metrics"] or {}
+        day = latest["metric_date"].strftime("%Y-%m-%d") if latest else "-"
+        numbers = [f"{latest[name]:.1f}" if latest.get(name) is not None else "-" for name in service.METRIC_NAMES]
+        goals = []
+        for goal in summary["goals"]:
+            progress = "-" if goal["progress"] is None else f"{goal['progress']:.0%}"
+            eta = f" by {goal['eta'].strftime('%Y-%m-%d')}" if goal["eta"] is not None and goal["progress"] != 1 else ""
+            goals.append(f"{goal['metric_name']} {progress}{eta}")
+        name = f"{member['fname']} {member['lname']}"
+        print(f"{member['member_id']:<8} {name[:24]:<24} {day:<12} {numbers[0]:>7} {numbers[1]:>6} {numbers[2]:>5}  {', '.join(goals) or '(no goals)'}")
+    print(f"\n{len(roster)} member(s)" + (f", only the first {service.ROSTER_LIMIT} are shown" if len(roster) == service.ROSTER_LIMIT else "") + "\n")
+
+
+def staffMetricTrends(session):
+    """
+    TRAINER/ADMIN FUNCTION
+    - trend of one metric per day / week / month, for one member or the whole club
+    - both read the rollups (metric_rollups), never the raw metrics
+    """
+    if session.currentRole not in ("Trainer", "Admin"):
+        print("\nERROR: Staff access only. Please log in as a trainer or admin.\n")
+        return
+
+    who = input("\nMember ID (blank = whole club): ").strip()
+    member_id = None
+    if who:
+        try:
+            member_id = int(who)
+        except ValueError:
+            print("\nInvalid member ID.\n")
+            return
+
+    options = askTrendOptions()
+    if options is None:
+        return
+    metric_name, grain, periods = options
+
+    try:
+        with session.connection() as conn:
+            if member_id is None:
+                rows = service.getClubTrend(conn, metric_name, grain, periods)
+            else:
+                rows = service.getMetricTrend(conn, member_id, metric_name, grain, periods)
+    except service.ServiceError as e:
+        print(f"\n{e}\n")
+        return
+
+    if not rows:
+        print(f"\nNo {metric_name.replace('_', ' ')} readings in the last {periods} {grain}s.\n")
+        return
+    title = "Club" if member_id is None else f"Member {member_id}"
+    print(f"\n──────── {title}: {metric_name.replace('_', ' ')} trend, last {periods} {grain}s ────────")
+    if member_id is None:
+        print(f"(members with readings per period: {', '.join(str(row['members']) for row in rows)})")
+    printTrend(rows, grain)
+
+
+def trainerAddAvail(session):
     """
     TRAINER / ADMIN FUNCTION
     - Trainer: can only add availability for themselves
@@ -275,28 +305,24 @@ def trainerAddAvail():
     - No overlap with existing slots for that trainer
     - No availability in the past
     """
-    if state.currentRole not in ("Trainer", "Admin"):
+    if session.currentRole not in ("Trainer", "Admin"):
         print("\nERROR: Staff/Admin access only. Please log in as a trainer or admin first.\n")
         return
 
-    conn = state.conn
-
     while True:
-        cur = conn.cursor()
         print("\n|     Staff: Add Trainer Availability Slot     |")
         print("(type 0 at ANY prompt to go back to main menu)\n")
         try:
             # which trainer id we're adding to
-            if state.currentRole == "Trainer":
-                trainer_id = state.currentStaffId
+            if session.currentRole == "Trainer":
+                trainer_id = session.currentStaffId
                 if trainer_id == -1:
                     print("ERROR: No staff ID associated with this session. Please log in again.")
-                    cur.close()
                     return
                 print(f"Adding availability for YOURSELF (Trainer ID {trainer_id}).")
             else:
                 # allow admin to have all access
-                listAllTrainers()
+                listAllTrainers(session)
                 trainer_id_input = input("Enter Trainer ID (or 0 to cancel): ").strip()
                 if trainer_id_input == "0":
                     print("Returning to Main Menu...")
@@ -329,60 +355,27 @@ def trainerAddAvail():
             try:
                 start_dt = datetime.strptime(start_str, "%Y-%m-%d %H:%M")
                 end_dt   = datetime.strptime(end_str, "%Y-%m-%d %H:%M")
-
-                # Don't allow time slots in the past
-                today = datetime.now().date()
-                if start_dt.date() < today:
-                    print("\nYou can't create availability in the past.")
-                    print("Please choose today or a future date.\n")
-                    continue
             except ValueError:
                 print("\nInvalid date/time format. Please use:")
                 print("  Date: YYYY-MM-DD   (e.g. 2025-12-01)")
                 print("  Time: HH:MM (24-hr, e.g. 18:30)\n")
                 continue
 
-            # end after start (one of the CHECKS)
-            if end_dt <= start_dt:
-                print("\nAvailability end time must be AFTER start time. Try again.\n")
-                continue
-            
-            if start_dt - end_dt < timedelta(hours = 1):
-                print("\nAvailability times must be longer than 1 hour\n")
-                continue
-
-            # business hours
-            if not (6 <= start_dt.hour < 22 and 6 <= end_dt.hour <= 22):
-                print("\nOur club only operates between 06:00 and 22:00.")
-                print("Please choose a time window within business hours.\n")
-                continue
-
-            # check for overlapping slots for this specific trainer
-            cur.execute(
-                """
-                SELECT slot_id, start_time, end_time
-                FROM trainer_availability
-                WHERE trainer_id = %s
-                AND NOT (%s <= start_time OR %s >= end_time);
-                """,
-                (trainer_id, end_dt, start_dt)
-            )
-            conflict = cur.fetchone()
-            if conflict is not None:
-                slot_id, s_time, e_time = conflict
-                print("\nERROR: This new slot overlaps with an existing one (so it can't be added).")
-                print(f"Conflicting Slot {slot_id}: {s_time} -> {e_time}\n")
+            # not in the past, end after start, >= 1 hour, business hours
+            problem = service.validateAvailabilitySlot(start_dt, end_dt)
+            if problem:
+                print(f"\n{problem}\n")
                 continue
 
-            # add the new session
-            cur.execute(
-                """
-                INSERT INTO trainer_availability (trainer_id, start_time, end_time)
-                VALUES (%s, %s, %s);
-                """,
-                (trainer_id, start_dt, end_dt)
-            )
-            conn.commit()
+            # add the new session (refused if it overlaps one of this trainer's slots)
+            with session.connection() as conn:
+                try:
+                    service.addAvailability(conn, trainer_id, start_dt, end_dt)
+                    conn.commit()
+                except service.Conflict as e:
+                    print("\nERROR: This new slot overlaps with an existing one (so it can't be added).")
+                    print(f"{e}\n")
+                    continue
             print("\nAvailability slot added successfully!!! :D\n")
 
             # ask user if they want to add another one before leaving
@@ -393,7 +386,63 @@ def trainerAddAvail():
         except Exception as e:
             print("\nSomething went wrong while adding the slot:", e)
             print("Try again.\n")
-            conn.rollback()
             continue
-        finally:
-            cur.close()
+
+
+def trainerAddRecurringAvail(session):
+    """
+    TRAINER / ADMIN FUNCTION
+    - a weekly template (e.g. mon,wed,fri 09:00-12:00 for 12 weeks) turned into slots in one go
+    - same rules as trainerAddAvail (business hours, not in the past, >= 1 hour, no overlaps)
+    - every slot is added in one transaction, or none of them are
+    """
+    if session.currentRole not in ("Trainer", "Admin"):
+        print("\nERROR: Staff/Admin access only. Please log in as a trainer or admin first.\n")
+        return
+
+    print("\n|     Staff: Add Recurring Availability     |")
+    print("(type 0 at ANY prompt to go back to main menu)\n")
+    if session.currentRole == "Trainer":
+        trainer_id = session.currentStaffId
+        print(f"Adding availability for YOURSELF (Trainer ID {trainer_id}).")
+    else:
+        listAllTrainers(session)
+        trainer_id_input = input("Enter Trainer ID (or 0 to cancel): ").strip()
+        if trainer_id_input == "0":
+            print("Returning to Main Menu...")
+            return
+        try:
+            trainer_id = int(trainer_id_input)
+        except ValueError:
+            print("Invalid Trainer ID.\n")
+            return
+
+    answers = []
+    for prompt in ("Days of the week (e.g. mon,wed,fri): ", "Start time (HH:MM, 24-hour): ",
+                   "End time   (HH:MM, 24-hour): ", "First day (YYYY-MM-DD, blank = today): ",
+                   "How many weeks: "):
+        answer = input(prompt).strip()
+        if answer == "0":
+            print("Returning to Main Menu...")
+            return
+        answers.append(answer)
+    days, start_str, end_str, first_str, weeks_str = answers
+
+    try:
+        start_time = datetime.strptime(start_str, "%H:%M").time()
+        end_time = datetime.strptime(end_str, "%H:%M").time()
+        first_day = datetime.strptime(first_str, "%Y-%m-%d").date() if first_str else datetime.now().date()
+        weeks = int(weeks_str)
+    except ValueError:
+        print("\nInvalid format. Times are HH:MM (24-hr), the date is YYYY-MM-DD and weeks a whole number.\n")
+        return
+
+    try:
+        slots = service.expandAvailabilityTemplate(days.split(","), start_time, end_time, first_day, weeks)
+        with session.connection() as conn:
+            added = service.bulkAddAvailability(conn, [(trainer_id, start, end) for start, end in slots])
+            conn.commit()
+    except service.ServiceError as e:
+        print(f"\nERROR: {e}\n")
+        return
+    print(f"\n{added} availability slots added successfully!!! :D\n")
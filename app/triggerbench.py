@@ -0,0 +1,127 @@
+# triggerbench.py
+
+""" insert throughput on metrics with each goals trigger
+	- row:       the original FOR EACH ROW update_goals() (3 UPDATEs per inserted row)
+	- statement: refresh_goals_from_new_metrics() (one UPDATE per INSERT, transition table)
+	- none:      no goals trigger at all, the ceiling
+	- measures one big INSERT ... SELECT of --rows rows (a bulk load) and --single one-row
+	  INSERTs (the updateMetrics path) per mode
+	- every mode runs in a transaction that gets rolled back, so no data is changed, but the
+	  trigger swap locks metrics meanwhile -> don't run it against a busy DB
+	- other metrics triggers (metrics_rollup) stay on in every mode
+	- run:  python app/triggerbench.py --rows 200000 --single 2000
+"""
+
+import argparse
+import statistics
+import time
+
+from db import connectToDB, closeDB, connection
+
+MODES = {
+	"none": None,
+	"row": "CREATE TRIGGER bench_goals AFTER INSERT ON metrics "
+		   "FOR EACH ROW EXECUTE FUNCTION update_goals();",
+	"statement": "CREATE TRIGGER bench_goals AFTER INSERT ON metrics "
+				 "REFERENCING NEW TABLE AS new_metrics "
+				 "FOR EACH STATEMENT EXECUTE FUNCTION refresh_goals_from_new_metrics();",
+}
+
+
+def pickMembers(cur, count):
+	"""members that have goals first (that's where the triggers do real work), topped up with any others"""
+	cur.execute("SELECT DISTINCT member_id FROM goals ORDER BY member_id LIMIT %s;", (count,))
+	ids = [row[0] for row in cur.fetchall()]
+	if len(ids) < count:
+		cur.execute(
+			"SELECT member_id FROM members WHERE member_id <> ALL(%s) ORDER BY member_id LIMIT %s;",
+			(ids, count - len(ids))
+		)
+		ids += [row[0] for row in cur.fetchall()]
+	return ids
+
+def runMode(conn, mode, member_ids, rows, single):
+	"""(bulk seconds, single-row seconds) for one mode, all rolled back afterwards"""
+	cur = conn.cursor()
+	try:
+		# swap out whatever goals trigger is installed (DDL is transactional, the rollback puts it back)
+		cur.execute(
+			"SELECT tgname FROM pg_trigger WHERE tgrelid = 'metrics'::regclass "
+			"AND tgfoid IN ('update_goals'::regproc, 'refresh_goals_from_new_metrics'::regproc);"
+		)
+		for (name,) in cur.fetchall():
+			cur.execute(f'DROP TRIGGER "{name}" ON metrics;')
+		if MODES[mode]:
+			cur.execute(MODES[mode])
+
+		started = time.perf_counter()
+		cur.execute(
+			"""
+			INSERT INTO metrics (member_id, metric_date, weight, body_fat, heart_rate)
+			SELECT (%s::int[])[1 + i %% %s], NOW() - make_interval(mins => i),
+				   60 + random() * 30, 15 + random() * 15, 55 + random() * 30
+			FROM generate_series(1, %s) AS i;
+			""",
+			(member_ids, len(member_ids), rows)
+		)
+		bulk = time.perf_counter() - started
+
+		started = time.perf_counter()
+		for i in range(single):
+			cur.execute(
+				"INSERT INTO metrics (member_id, metric_date, weight, body_fat, heart_rate) VALUES (%s, NOW(), %s, %s, %s);",
+				(member_ids[i % len(member_ids)], 70.0, 20.0, 65.0)
+			)
+		singles = time.perf_counter() - started
+		return bulk, singles
+	finally:
+		cur.close()
+		conn.rollback()
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Compare metrics insert throughput under the goals triggers")
+	parser.add_argument("--rows", type=int, default=100000, help="rows in the bulk INSERT ... SELECT")
+	parser.add_argument("--single", type=int, default=1000, help="number of one-row INSERTs")
+	parser.add_argument("--members", type=int, default=2000, help="spread the rows over this many members")
+	parser.add_argument("--repeat", type=int, default=3, help="runs per mode (median is reported)")
+	parser.add_argument("--modes", default="none,row,statement")
+	args = parser.parse_args()
+
+	modes = [mode.strip() for mode in args.modes.split(",")]
+	for mode in modes:
+		if mode not in MODES:
+			parser.error(f"unknown mode '{mode}' (pick from {', '.join(MODES)})")
+
+	connectToDB(maxconn=1)
+	try:
+		with connection() as conn:
+			cur = conn.cursor()
+			member_ids = pickMembers(cur, args.members)
+			cur.close()
+			conn.rollback()
+			if not member_ids:
+				raise SystemExit("no members in the DB, load some data first (python app/datagen.py)")
+
+			results = {}
+			for mode in modes:
+				runs = [runMode(conn, mode, member_ids, args.rows, args.single) for _ in range(max(1, args.repeat))]
+				results[mode] = (statistics.median(r[0] for r in runs), statistics.median(r[1] for r in runs))
+	finally:
+		closeDB()
+
+	print(f"\n{args.rows:,} row bulk insert + {args.single:,} single-row inserts over {len(member_ids):,} members "
+		  f"(median of {max(1, args.repeat)})\n")
+	print(f"{'trigger':<12}{'bulk rows/s':>14}{'single ins/s':>15}{'bulk vs row':>14}{'single vs row':>15}")
+	print("-" * 70)
+	row_bulk, row_single = results.get("row", (None, None))
+	for mode, (bulk, single) in results.items():
+		bulk_rate = args.rows / bulk if bulk else 0
+		single_rate = args.single / single if single else 0
+		vs_bulk = f"{row_bulk / bulk:.1f}x" if row_bulk and bulk else "-"
+		vs_single = f"{row_single / single:.1f}x" if row_single and single else "-"
+		print(f"{mode:<12}{bulk_rate:>14,.0f}{single_rate:>15,.0f}{vs_bulk:>14}{vs_single:>15}")
+	print()
+
+if __name__ == "__main__":
+	main()
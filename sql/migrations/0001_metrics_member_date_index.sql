@@ -0,0 +1,4 @@
+-- migrate: no-transaction
+-- history, dashboard and goal lookups all filter metrics by member_id and sort by date,
+-- without this each of them is a seq scan over the whole metrics table
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_metrics_member_date ON metrics (member_id, metric_date);
@@ -0,0 +1,43 @@
+-- first + latest metric per member, so the dashboard and goal screens don't have to
+-- read a member's whole history (kept current by service.addMetrics, bulk loaders call
+-- service.refreshMetricSummary)
+
+CREATE TABLE IF NOT EXISTS member_metric_summary (
+	member_id			INT PRIMARY KEY REFERENCES members(member_id),
+	metric_count		INT NOT NULL DEFAULT 0,
+
+	first_metric_id		INT NOT NULL,
+	first_date			TIMESTAMP NOT NULL,
+	first_weight		FLOAT,
+	first_body_fat		FLOAT,
+	first_heart_rate	FLOAT,
+
+	latest_metric_id	INT NOT NULL,
+	latest_date			TIMESTAMP NOT NULL,
+	latest_weight		FLOAT,
+	latest_body_fat		FLOAT,
+	latest_heart_rate	FLOAT
+);
+
+-- backfill from what's already there
+INSERT INTO member_metric_summary (
+	member_id, metric_count,
+	first_metric_id, first_date, first_weight, first_body_fat, first_heart_rate,
+	latest_metric_id, latest_date, latest_weight, latest_body_fat, latest_heart_rate
+)
+SELECT
+	c.member_id, c.metric_count,
+	f.metric_id, f.metric_date, f.weight, f.body_fat, f.heart_rate,
+	l.metric_id, l.metric_date, l.weight, l.body_fat, l.heart_rate
+FROM (
+	SELECT member_id, COUNT(*) AS metric_count FROM metrics WHERE member_id IS NOT NULL GROUP BY member_id
+) c
+JOIN (
+	SELECT DISTINCT ON (member_id) * FROM metrics WHERE member_id IS NOT NULL
+	ORDER BY member_id, metric_date ASC, metric_id ASC
+) f ON f.member_id = c.member_id
+JOIN (
+	SELECT DISTINCT ON (member_id) * FROM metrics WHERE member_id IS NOT NULL
+	ORDER BY member_id, metric_date DESC, metric_id DESC
+) l ON l.member_id = c.member_id
+ON CONFLICT (member_id) DO NOTHING;
@@ -0,0 +1,5 @@
+-- migrate: no-transaction
+-- history pages seek on (metric_date, metric_id) > (last seen), the row comparison can only
+-- be an index condition if metric_id is in the index too; this one replaces 0001's
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_metrics_member_date_id ON metrics (member_id, metric_date, metric_id);
+DROP INDEX CONCURRENTLY IF EXISTS idx_metrics_member_date;
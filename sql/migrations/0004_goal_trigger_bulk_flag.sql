@@ -0,0 +1,28 @@
+-- bulk loads (service.bulkAddMetrics) refresh goals once per batch themselves,
+-- they SET LOCAL club.bulk_load = 'on' so the per-row trigger can step aside
+
+CREATE OR REPLACE FUNCTION update_goals()
+RETURNS trigger AS $$
+BEGIN
+	IF current_setting('club.bulk_load', true) = 'on' THEN
+		RETURN NEW;
+	END IF;
+
+	UPDATE goals
+	SET current_metric = NEW.weight
+	WHERE goals.member_id = NEW.member_id
+	AND goals.metric_name = 'weight';
+
+	UPDATE goals
+	SET current_metric = NEW.body_fat
+	WHERE goals.member_id = NEW.member_id
+	AND goals.metric_name = 'body_fat';
+
+	UPDATE goals
+	SET current_metric = NEW.heart_rate
+	WHERE goals.member_id = NEW.member_id
+	AND goals.metric_name = 'heart_rate';
+
+	RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,41 @@
+-- replaces the per-row metrics_update_goals trigger (3 UPDATEs per inserted row, goals or not)
+-- with one set-based UPDATE per INSERT statement, using the statement's transition table:
+-- each member's newest reading in the statement is copied onto their matching goals.
+-- update_goals() itself is left in place (python app/triggerbench.py compares the two)
+
+CREATE OR REPLACE FUNCTION refresh_goals_from_new_metrics()
+RETURNS trigger AS $$
+BEGIN
+	-- bulk loads refresh goals themselves (service.bulkAddMetrics)
+	IF current_setting('club.bulk_load', true) = 'on' THEN
+		RETURN NULL;
+	END IF;
+
+	UPDATE goals g
+	SET current_metric = COALESCE(
+		CASE g.metric_name
+			WHEN 'weight' THEN latest.weight
+			WHEN 'body_fat' THEN latest.body_fat
+			WHEN 'heart_rate' THEN latest.heart_rate
+		END, g.current_metric)
+	FROM (
+		SELECT DISTINCT ON (member_id) member_id, weight, body_fat, heart_rate
+		FROM new_metrics
+		ORDER BY member_id, metric_date DESC, metric_id DESC
+	) latest
+	WHERE g.member_id = latest.member_id
+	AND g.metric_name IN ('weight', 'body_fat', 'heart_rate');
+
+	RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS metrics_update_goals ON metrics;
+
+DROP TRIGGER IF EXISTS metrics_refresh_goals ON metrics;
+
+CREATE TRIGGER metrics_refresh_goals
+AFTER INSERT ON metrics
+REFERENCING NEW TABLE AS new_metrics
+FOR EACH STATEMENT
+EXECUTE FUNCTION refresh_goals_from_new_metrics();
@@ -0,0 +1,80 @@
+-- per member, per metric rollups at day / week / month grain so trend charts read a few
+-- dozen rows instead of the raw history (avg = total / samples, last = newest reading in the bucket)
+-- kept current by the metrics_rollup statement trigger below, datagen rebuilds it with
+-- service.refreshMetricRollups after its COPY
+
+CREATE TABLE IF NOT EXISTS metric_rollups (
+	member_id	INT NOT NULL REFERENCES members(member_id),
+	metric_name	TEXT NOT NULL,
+	grain		TEXT NOT NULL CHECK (grain IN ('day', 'week', 'month')),
+	bucket		DATE NOT NULL,	-- date_trunc(grain, metric_date), weeks start on Monday
+	samples		INT NOT NULL,
+	total		FLOAT NOT NULL,
+	min_value	FLOAT NOT NULL,
+	max_value	FLOAT NOT NULL,
+	last_value	FLOAT NOT NULL,
+	last_date	TIMESTAMP NOT NULL,
+
+	PRIMARY KEY (member_id, metric_name, grain, bucket)
+);
+
+-- club-wide trends (staff) read one grain + metric across every member
+CREATE INDEX IF NOT EXISTS idx_metric_rollups_club ON metric_rollups (grain, metric_name, bucket);
+
+-- backfill from what's already there
+INSERT INTO metric_rollups (member_id, metric_name, grain, bucket, samples, total, min_value, max_value, last_value, last_date)
+SELECT m.member_id, v.metric_name, g.grain, date_trunc(g.grain, m.metric_date)::date,
+	COUNT(*), SUM(v.value), MIN(v.value), MAX(v.value),
+	(array_agg(v.value ORDER BY m.metric_date DESC, m.metric_id DESC))[1], MAX(m.metric_date)
+FROM metrics m
+CROSS JOIN LATERAL (VALUES ('weight', m.weight), ('body_fat', m.body_fat), ('heart_rate', m.heart_rate)) v(metric_name, value)
+CROSS JOIN (VALUES ('day'), ('week'), ('month')) g(grain)
+WHERE m.member_id IS NOT NULL AND v.value IS NOT NULL
+GROUP BY 1, 2, 3, 4
+ON CONFLICT DO NOTHING;
+
+-- fold each INSERT's new rows into the rollups, one upsert per statement
+CREATE OR REPLACE FUNCTION rollup_new_metrics()
+RETURNS trigger AS $$
+BEGIN
+	INSERT INTO metric_rollups AS r (member_id, metric_name, grain, bucket, samples, total, min_value, max_value, last_value, last_date)
+	SELECT m.member_id, v.metric_name, g.grain, date_trunc(g.grain, m.metric_date)::date,
+		COUNT(*), SUM(v.value), MIN(v.value), MAX(v.value),
+		(array_agg(v.value ORDER BY m.metric_date DESC, m.metric_id DESC))[1], MAX(m.metric_date)
+	FROM new_metrics m
+	CROSS JOIN LATERAL (VALUES ('weight', m.weight), ('body_fat', m.body_fat), ('heart_rate', m.heart_rate)) v(metric_name, value)
+	CROSS JOIN (VALUES ('day'), ('week'), ('month')) g(grain)
+	WHERE m.member_id IS NOT NULL AND v.value IS NOT NULL
+	GROUP BY 1, 2, 3, 4
+	ON CONFLICT (member_id, metric_name, grain, bucket) DO UPDATE SET
+		samples = r.samples + EXCLUDED.samples,
+		total = r.total + EXCLUDED.total,
+		min_value = LEAST(r.min_value, EXCLUDED.min_value),
+		max_value = GREATEST(r.max_value, EXCLUDED.max_value),
+		last_value = CASE WHEN EXCLUDED.last_date >= r.last_date THEN EXCLUDED.last_value ELSE r.last_value END,
+		last_date = GREATEST(r.last_date, EXCLUDED.last_date);
+
+	RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS metrics_rollup ON metrics;
+
+CREATE TRIGGER metrics_rollup
+AFTER INSERT ON metrics
+REFERENCING NEW TABLE AS new_metrics
+FOR EACH STATEMENT
+EXECUTE FUNCTION rollup_new_metrics();
+
+-- trend views: one row per bucket, avg already worked out
+CREATE OR REPLACE VIEW member_metric_trends AS
+SELECT member_id, metric_name, grain, bucket, samples,
+	total / samples AS avg_value, min_value, max_value, last_value, last_date
+FROM metric_rollups;
+
+CREATE OR REPLACE VIEW club_metric_trends AS
+SELECT grain, metric_name, bucket,
+	COUNT(*) AS members, SUM(samples) AS samples,
+	SUM(total) / SUM(samples) AS avg_value, MIN(min_value) AS min_value, MAX(max_value) AS max_value
+FROM metric_rollups
+GROUP BY grain, metric_name, bucket;
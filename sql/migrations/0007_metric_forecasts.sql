@@ -0,0 +1,45 @@
+-- least-squares trend per member per metric over the recent daily rollups, so the dashboard
+-- can say roughly when a goal will be reached (service.getMetricForecasts / refreshForecasts)
+-- slope_per_day + fit_value at fit_date describe the fitted line, the ETA itself is worked out
+-- at read time against the current target (targets change without new readings)
+
+CREATE TABLE IF NOT EXISTS metric_forecasts (
+	member_id		INT NOT NULL REFERENCES members(member_id),
+	metric_name		TEXT NOT NULL,
+	slope_per_day	FLOAT NOT NULL,
+	fit_value		FLOAT NOT NULL,	-- the line's value on fit_date
+	fit_date		DATE NOT NULL,	-- newest day in the window
+	days			INT NOT NULL,	-- daily points the line was fitted to
+	r2				FLOAT,
+	computed_at		TIMESTAMP NOT NULL DEFAULT NOW(),
+
+	PRIMARY KEY (member_id, metric_name)
+);
+
+-- members with new readings since their forecast was computed, drained by refreshForecasts
+CREATE TABLE IF NOT EXISTS forecast_stale (
+	member_id	INT PRIMARY KEY REFERENCES members(member_id)
+);
+
+CREATE OR REPLACE FUNCTION mark_forecasts_stale()
+RETURNS trigger AS $$
+BEGIN
+	INSERT INTO forecast_stale (member_id)
+	SELECT DISTINCT member_id FROM new_metrics WHERE member_id IS NOT NULL
+	ON CONFLICT DO NOTHING;
+	RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS metrics_forecast_stale ON metrics;
+
+CREATE TRIGGER metrics_forecast_stale
+AFTER INSERT ON metrics
+REFERENCING NEW TABLE AS new_metrics
+FOR EACH STATEMENT
+EXECUTE FUNCTION mark_forecasts_stale();
+
+-- nothing computed yet, so everyone with readings starts out stale
+INSERT INTO forecast_stale (member_id)
+SELECT DISTINCT member_id FROM metrics WHERE member_id IS NOT NULL
+ON CONFLICT DO NOTHING;
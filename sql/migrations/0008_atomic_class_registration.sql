@@ -0,0 +1,66 @@
+-- class registration in one round trip (service.registerForClass -> register_for_class())
+-- before: check available_classes, check class_regs, insert, bump attendance as 4 statements,
+-- two members racing for the last seat could both pass the checks and overbook the class,
+-- and nothing stopped the same member registering twice
+
+-- a member is in a class at most once (keep the first registration if there are repeats)
+DELETE FROM class_regs r
+USING class_regs dup
+WHERE dup.class_id = r.class_id
+AND dup.member_id = r.member_id
+AND dup.reg_id < r.reg_id;
+
+ALTER TABLE class_regs DROP CONSTRAINT IF EXISTS class_regs_class_member_key;
+ALTER TABLE class_regs ADD CONSTRAINT class_regs_class_member_key UNIQUE (class_id, member_id);
+
+-- returns 'ok', 'duplicate', 'full' or 'missing'
+-- - the seat is taken with a conditional UPDATE on the class row, postgres rechecks
+--   attendance < capacity after waiting on that row so the last seat only goes once
+-- - full classes and repeat registrations are answered from a plain read first, so once a
+--   class fills up the rest of a sign-up rush never queues on its row lock
+-- - lock_timeout (only while this runs) turns a long wait into lock_not_available,
+--   the caller says "try again" instead of piling up connections
+CREATE OR REPLACE FUNCTION register_for_class(p_class_id INT, p_member_id INT)
+RETURNS TEXT AS $$
+DECLARE
+	v_attendance	INT;
+	v_capacity		INT;
+BEGIN
+	SELECT c.attendance, CASE WHEN rb.purpose = 'private' THEN 1 ELSE r.max_capacity END
+	INTO v_attendance, v_capacity
+	FROM classes c
+	JOIN room_bookings rb ON rb.booking_id = c.booking_id
+	JOIN rooms r ON r.room_id = rb.room_id
+	WHERE c.class_id = p_class_id;
+
+	IF NOT FOUND THEN
+		RETURN 'missing';
+	END IF;
+	IF EXISTS (SELECT 1 FROM class_regs WHERE class_id = p_class_id AND member_id = p_member_id) THEN
+		RETURN 'duplicate';
+	END IF;
+	IF v_attendance >= v_capacity THEN
+		RETURN 'full';
+	END IF;
+
+	UPDATE classes
+	SET attendance = attendance + 1
+	WHERE class_id = p_class_id
+	AND attendance < v_capacity;
+	IF NOT FOUND THEN
+		RETURN 'full'; -- someone else got the last seat while we waited
+	END IF;
+
+	INSERT INTO class_regs (class_id, member_id)
+	VALUES (p_class_id, p_member_id)
+	ON CONFLICT (class_id, member_id) DO NOTHING;
+	IF NOT FOUND THEN
+		-- the same member registering twice at once, give the seat back
+		UPDATE classes SET attendance = attendance - 1 WHERE class_id = p_class_id;
+		RETURN 'duplicate';
+	END IF;
+
+	RETURN 'ok';
+END;
+$$ LANGUAGE plpgsql
+SET lock_timeout = '2s';
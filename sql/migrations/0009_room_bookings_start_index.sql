@@ -0,0 +1,4 @@
+-- migrate: no-transaction
+-- service.browseClasses pages through upcoming classes by (start_time, booking_id), with this
+-- index that's a short range scan from "now" instead of every booking the club ever made
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_room_bookings_start ON room_bookings (start_time, booking_id);
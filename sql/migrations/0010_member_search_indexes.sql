@@ -0,0 +1,7 @@
+-- migrate: no-transaction
+-- staff member lookup (service.searchMembers) used to run LOWER(...) LIKE '%q%' over every member
+-- prefix matches on the full name ("glo", "gloria l"), last name and email, these work on any install
+-- (the typo tolerant trigram indexes are 0013, they need pg_trgm)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_members_full_name_prefix ON members (LOWER(fname || ' ' || lname) text_pattern_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_members_lname_prefix ON members (LOWER(lname) text_pattern_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_members_email_prefix ON members (LOWER(email) text_pattern_ops);
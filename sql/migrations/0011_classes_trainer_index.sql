@@ -0,0 +1,3 @@
+-- migrate: no-transaction
+-- a trainer's roster (service.getRoster) and browseClasses(trainer_id=...) look classes up by trainer
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_classes_trainer ON classes (trainer_id);
@@ -0,0 +1,20 @@
+-- overlapping trainer availability / room bookings are refused by the database itself
+-- (service.addAvailability / bookRoom used to SELECT for an overlap and then INSERT, two admins
+-- booking the same room at once could both get through)
+-- start_time/end_time stay the columns everything reads and writes, the ranges are generated
+-- from them: [start, end) so back to back slots (10-11, 11-12) don't count as overlapping
+-- "same trainer/room" is int4range(id, id, '[]') WITH = so plain gist works, no btree_gist needed
+
+ALTER TABLE trainer_availability
+	ADD COLUMN IF NOT EXISTS available_during tsrange GENERATED ALWAYS AS (tsrange(start_time, end_time)) STORED;
+
+ALTER TABLE trainer_availability DROP CONSTRAINT IF EXISTS trainer_availability_no_overlap;
+ALTER TABLE trainer_availability ADD CONSTRAINT trainer_availability_no_overlap
+	EXCLUDE USING gist ((int4range(trainer_id, trainer_id, '[]')) WITH =, available_during WITH &&);
+
+ALTER TABLE room_bookings
+	ADD COLUMN IF NOT EXISTS booked_during tsrange GENERATED ALWAYS AS (tsrange(start_time, end_time)) STORED;
+
+ALTER TABLE room_bookings DROP CONSTRAINT IF EXISTS room_bookings_no_overlap;
+ALTER TABLE room_bookings ADD CONSTRAINT room_bookings_no_overlap
+	EXCLUDE USING gist ((int4range(room_id, room_id, '[]')) WITH =, booked_during WITH &&);
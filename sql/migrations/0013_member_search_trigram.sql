@@ -0,0 +1,8 @@
+-- migrate: no-transaction
+-- migrate: needs-extension pg_trgm
+-- fuzzy member lookup (anywhere in the name/email, typos) for service.searchMembers
+-- pg_trgm ships with postgres' contrib package, on a server without it this file is skipped
+-- (and tried again on the next migrate) and searchMembers sticks to 0010's prefix indexes
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_members_full_name_trgm ON members USING gin (LOWER(fname || ' ' || lname) gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_members_email_trgm ON members USING gin (LOWER(email) gin_trgm_ops);
@@ -0,0 +1,5 @@
+-- 0008 deleted repeated class registrations but left classes.attendance counting them,
+-- recount it from the registrations that are left
+
+UPDATE classes c
+SET attendance = (SELECT count(*) FROM class_regs r WHERE r.class_id = c.class_id);
@@ -0,0 +1,6 @@
+# conftest.py
+import os
+import sys
+
+# the app modules import each other flat (import service, from db import ...), like python app/app.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
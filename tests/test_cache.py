@@ -0,0 +1,112 @@
+# test_cache.py
+import pytest
+
+import cache
+from cache import MemberCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    return clock
+
+
+def _loader(value, calls):
+    def load():
+        calls.append(value)
+        return value
+    return load
+
+
+def test_hit_after_miss_returns_copies(clock):
+    members = MemberCache(max_members=10, ttl=30)
+    calls = []
+    first = members.get(1, "profile", _loader({"fname": "Gloria"}, calls))
+    first["fname"] = "changed by the caller"
+    assert members.get(1, "profile", _loader({"fname": "other"}, calls)) == {"fname": "Gloria"}
+    assert len(calls) == 1
+    assert members.stats()["hits"] == 1 and members.stats()["misses"] == 1
+
+
+def test_entries_expire_after_ttl(clock):
+    members = MemberCache(max_members=10, ttl=30)
+    calls = []
+    members.get(1, "profile", _loader("old", calls))
+    clock.now += 31
+    assert members.get(1, "profile", _loader("new", calls)) == "new"
+    assert members.stats()["expired"] == 1
+
+
+def test_least_recently_used_member_is_evicted(clock):
+    members = MemberCache(max_members=2, ttl=30)
+    calls = []
+    members.get(1, "profile", _loader("one", calls))
+    members.get(2, "profile", _loader("two", calls))
+    members.get(1, "profile", _loader("one", calls)) # 1 is now the most recent
+    members.get(3, "profile", _loader("three", calls))
+    assert members.stats()["evictions"] == 1
+    assert members.get(1, "profile", _loader("reloaded", calls)) == "one"
+    assert members.get(2, "profile", _loader("reloaded", calls)) == "reloaded"
+
+
+def test_invalidate_drops_the_member(clock):
+    members = MemberCache(max_members=10, ttl=30)
+    calls = []
+    members.get(1, "profile", _loader("old", calls))
+    members.get(1, "goals", _loader("old goals", calls))
+    members.invalidate(1, ["goals"])
+    assert members.get(1, "profile", _loader("new", calls)) == "old"
+    assert members.get(1, "goals", _loader("new goals", calls)) == "new goals"
+    members.invalidateMany([1])
+    assert members.get(1, "profile", _loader("new", calls)) == "new"
+
+
+def test_load_racing_an_invalidate_is_not_kept(clock):
+    members = MemberCache(max_members=10, ttl=30)
+
+    def staleLoad():
+        members.invalidate(1) # a write commits while we're still reading
+        return "stale"
+
+    assert members.get(1, "profile", staleLoad) == "stale"
+    assert members.stats()["discarded"] == 1
+    assert members.get(1, "profile", lambda: "fresh") == "fresh"
+
+
+def test_nothing_is_cached_while_held(clock):
+    members = MemberCache(max_members=10, ttl=30)
+    members.get(1, "profile", lambda: "committed")
+    members.hold([1])
+    assert members.get(1, "profile", lambda: "uncommitted") == "uncommitted"
+    assert members.get(1, "profile", lambda: "uncommitted again") == "uncommitted again"
+    members.release([1])
+    assert members.stats()["held"] == 0
+    assert members.get(1, "profile", lambda: "after commit") == "after commit"
+    assert members.get(1, "profile", lambda: "not loaded") == "after commit"
+
+
+def test_holding_everyone(clock):
+    members = MemberCache(max_members=10, ttl=30)
+    members.get(1, "profile", lambda: "before")
+    members.hold()
+    assert members.get(2, "profile", lambda: "during") == "during"
+    members.release()
+    assert members.get(1, "profile", lambda: "after") == "after"
+    assert members.get(2, "profile", lambda: "after") == "after"
+
+
+def test_ttl_zero_turns_it_off(clock):
+    members = MemberCache(max_members=10, ttl=0)
+    calls = []
+    members.get(1, "profile", _loader("a", calls))
+    members.get(1, "profile", _loader("b", calls))
+    assert calls == ["a", "b"]
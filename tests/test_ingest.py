@@ -0,0 +1,46 @@
+# test_ingest.py
+from datetime import datetime
+
+import pytest
+
+from ingest import Rejected, validateRow
+
+NOW = datetime(2025, 11, 20, 12, 0)
+
+
+def test_full_row():
+    row = {"member_id": "7", "metric_date": "2025-11-20 10:00", "weight": "70.5", "body_fat": "21", "heart_rate": "64"}
+    assert validateRow(row, NOW) == (7, datetime(2025, 11, 20, 10, 0), 70.5, 21.0, 64.0)
+
+
+def test_email_key_and_partial_metrics():
+    row = {"email": " Gloria@Gmail.com ", "date": "2025-11-19", "heart_rate": 72}
+    assert validateRow(row, NOW) == ("gloria@gmail.com", datetime(2025, 11, 19), None, None, 72.0)
+
+
+def test_unix_seconds():
+    stamp = datetime(2025, 11, 1, 8, 0).timestamp()
+    member, when, *_ = validateRow({"member_id": 1, "timestamp": str(stamp), "weight": 70}, NOW)
+    assert when == datetime(2025, 11, 1, 8, 0)
+
+
+def test_utc_dates_become_local_time():
+    _, when, *_ = validateRow({"member_id": 1, "metric_date": "2025-11-19T10:00:00Z", "weight": 70}, NOW)
+    assert when.tzinfo is None
+
+
+@pytest.mark.parametrize("row, reason", [
+    ({"__bad__": "{not json"}, "not a JSON object"),
+    ({"metric_date": "2025-11-20", "weight": 70}, "missing member_id/email"),
+    ({"member_id": "seven", "metric_date": "2025-11-20", "weight": 70}, "bad member_id"),
+    ({"member_id": 1, "weight": 70}, "missing metric_date"),
+    ({"member_id": 1, "metric_date": "20/11/2025", "weight": 70}, "bad metric_date"),
+    ({"member_id": 1, "metric_date": "2025-12-25", "weight": 70}, "metric_date in the future"),
+    ({"member_id": 1, "metric_date": "2025-11-20"}, "no weight, body_fat or heart_rate"),
+    ({"member_id": 1, "metric_date": "2025-11-20", "weight": "heavy"}, "weight not a number"),
+    ({"member_id": 1, "metric_date": "2025-11-20", "heart_rate": 400}, "heart_rate outside 25.0-250.0"),
+])
+def test_rejected(row, reason):
+    with pytest.raises(Rejected) as caught:
+        validateRow(row, NOW)
+    assert caught.value.reason == reason
@@ -0,0 +1,61 @@
+# test_metricstore.py
+import math
+from array import array
+from datetime import datetime
+
+import pytest
+
+from metricstore import MetricStore, toDatetime, toSeconds
+
+NAN = float("nan")
+
+
+def _store():
+    # member 3: two readings, member 7: one (with a missing body_fat), member 9: none stored
+    when = [datetime(2025, 1, 1, 8, 0), datetime(2025, 1, 2, 8, 30), datetime(2025, 3, 4, 19, 15)]
+    return MetricStore({
+        "members": array("i", [3, 7]),
+        "offsets": array("q", [0, 2, 3]),
+        "timestamp": array("q", [toSeconds(moment) for moment in when]),
+        "weight": array("f", [80.5, 80.0, 61.25]),
+        "body_fat": array("f", [25.0, 24.5, NAN]),
+        "heart_rate": array("f", [70.0, 68.0, 55.0]),
+    }, {"since": None})
+
+
+def test_seconds_round_trip():
+    moment = datetime(2024, 2, 29, 23, 59, 59)
+    assert toDatetime(toSeconds(moment)) == moment
+
+
+def test_save_load_round_trip(tmp_path):
+    store = _store()
+    path = tmp_path / "metrics.snap"
+    store.save(str(path))
+    with MetricStore.load(str(path)) as loaded:
+        assert len(loaded) == 3
+        assert loaded.memberCount == 2
+        assert loaded.info["since"] is None
+        for name in ("members", "offsets", "timestamp", "weight", "heart_rate"):
+            assert loaded.columns[name].tolist() == store.columns[name].tolist()
+        assert math.isnan(loaded.body_fat[2])
+        assert loaded.readings(7) == [
+            {"metric_date": datetime(2025, 3, 4, 19, 15), "weight": 61.25, "body_fat": None, "heart_rate": 55.0}
+        ]
+        assert [row["metric_date"] for row in loaded.readings(3)] == [datetime(2025, 1, 1, 8, 0), datetime(2025, 1, 2, 8, 30)]
+    assert not (tmp_path / "metrics.snap.tmp").exists()
+
+
+def test_member_rows():
+    store = _store()
+    assert store.memberRows(3) == (0, 2)
+    assert store.memberRows(7) == (2, 3)
+    assert store.memberRows(9) == (0, 0)
+    assert store.readings(1) == []
+
+
+def test_load_rejects_other_files(tmp_path):
+    path = tmp_path / "not_a_snapshot"
+    path.write_bytes(b"hello, this is not a metric store" * 4)
+    with pytest.raises(ValueError):
+        MetricStore.load(str(path))
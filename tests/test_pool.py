@@ -0,0 +1,206 @@
+# test_pool.py
+import threading
+import time
+
+import psycopg2.extensions
+import pytest
+
+import db
+from db import ConnectionPool, PoolExhausted
+
+
+class FakeConnection:
+    """what the pool touches on a psycopg2 connection"""
+
+    def __init__(self):
+        self.closed = 0
+        self.in_transaction = False
+        self.dead = False # the server went away, the next query fails
+        self.rollbacks = 0
+        self.pings = 0
+
+    def get_transaction_status(self):
+        if self.in_transaction:
+            return psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+        return psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def rollback(self):
+        if self.dead:
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+        self.rollbacks += 1
+        self.in_transaction = False
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def close(self):
+        self.closed = 1
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, params=None):
+        if self.conn.dead:
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+        self.conn.pings += 1
+
+    def close(self):
+        pass
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def opened(monkeypatch):
+    """every FakeConnection the pool opens, in order"""
+    connections = []
+
+    def connect(**params):
+        conn = FakeConnection()
+        connections.append(conn)
+        return conn
+
+    monkeypatch.setattr(db.psycopg2, "connect", connect)
+    return connections
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(db.time, "monotonic", clock)
+    return clock
+
+
+def test_checkout_and_return_reuses_the_connection(opened):
+    pool = ConnectionPool(minconn=1, maxconn=3)
+    assert len(opened) == 1
+    with pool.connection() as conn:
+        assert conn is opened[0]
+        assert pool.stats()["in_use"] == 1
+    assert pool.stats() == {"open": 1, "idle": 1, "in_use": 0, "min": 1, "max": 3}
+    with pool.connection() as conn:
+        assert conn is opened[0]
+    assert len(opened) == 1
+
+
+def test_opens_up_to_maxconn_then_blocks_and_times_out(opened):
+    pool = ConnectionPool(minconn=0, maxconn=2, checkout_timeout=0.2)
+    first, second = pool.getconn(), pool.getconn()
+    assert len(opened) == 2
+    started = time.monotonic()
+    with pytest.raises(PoolExhausted):
+        pool.getconn()
+    assert time.monotonic() - started >= 0.2
+    pool.putconn(first)
+    pool.putconn(second)
+
+
+def test_a_waiting_checkout_gets_the_returned_connection(opened):
+    pool = ConnectionPool(minconn=0, maxconn=1, checkout_timeout=5)
+    held = pool.getconn()
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pool.getconn()))
+    waiter.start()
+    time.sleep(0.05)
+    assert not got # still blocked
+    pool.putconn(held)
+    waiter.join(2)
+    assert got == [held]
+    assert len(opened) == 1
+
+
+def test_putconn_rolls_back_open_transactions(opened):
+    pool = ConnectionPool(minconn=0, maxconn=2)
+    conn = pool.getconn()
+    conn.in_transaction = True
+    pool.putconn(conn)
+    assert conn.rollbacks == 1
+    assert pool.stats()["idle"] == 1
+
+    clean = pool.getconn()
+    pool.putconn(clean)
+    assert clean.rollbacks == 1 # nothing open, no extra round trip
+
+
+def test_putconn_drops_connections_that_fail_the_rollback(opened):
+    pool = ConnectionPool(minconn=0, maxconn=2)
+    conn = pool.getconn()
+    conn.in_transaction = True
+    conn.dead = True
+    pool.putconn(conn)
+    assert conn.closed
+    assert pool.stats()["open"] == 0
+
+
+def test_putconn_rolls_back_without_holding_the_lock(opened):
+    pool = ConnectionPool(minconn=0, maxconn=2)
+    conn = pool.getconn()
+    conn.in_transaction = True
+    seen = []
+
+    def rollback():
+        # another thread can still use the pool during the round trip
+        other = threading.Thread(target=lambda: seen.append(pool.stats()))
+        other.start()
+        other.join(1)
+        conn.in_transaction = False
+
+    conn.rollback = rollback
+    pool.putconn(conn)
+    assert seen and seen[0]["in_use"] == 0
+
+
+def test_dead_idle_connections_are_replaced_after_ping_after(opened, clock):
+    pool = ConnectionPool(minconn=1, maxconn=2, ping_after=30)
+    conn = pool.getconn()
+    pool.putconn(conn)
+    conn.dead = True
+
+    clock.now += 10 # recently used, handed out without a ping
+    assert pool.getconn() is conn
+    assert conn.pings == 0
+    pool.putconn(conn)
+
+    clock.now += 31
+    fresh = pool.getconn()
+    assert fresh is not conn and fresh is opened[1]
+    assert conn.closed
+    assert pool.stats()["open"] == 1
+    pool.putconn(fresh)
+
+
+def test_idle_connections_over_minconn_are_reaped(opened, clock):
+    pool = ConnectionPool(minconn=1, maxconn=3, idle_timeout=300)
+    held = [pool.getconn() for _ in range(3)]
+    for conn in held:
+        pool.putconn(conn)
+    assert pool.stats()["idle"] == 3
+
+    clock.now += 100
+    pool.reapIdle()
+    assert pool.stats()["open"] == 3
+
+    clock.now += 201
+    pool.reapIdle()
+    assert pool.stats() == {"open": 1, "idle": 1, "in_use": 0, "min": 1, "max": 3}
+    assert sum(1 for conn in held if conn.closed) == 2
+
+
+def test_close_all(opened):
+    pool = ConnectionPool(minconn=2, maxconn=3)
+    conn = pool.getconn()
+    pool.closeAll()
+    assert opened[1].closed or opened[0].closed
+    with pytest.raises(PoolExhausted):
+        pool.getconn()
+    pool.putconn(conn)
+    assert conn.closed
+    assert pool.stats()["open"] == 0
@@ -0,0 +1,77 @@
+# test_progress.py
+import math
+from array import array
+
+import pytest
+
+import progress
+import service
+
+NAN = float("nan")
+
+# start, current, target: loss goals, gain goals, overshoot both ways, missing values, start == target
+GOALS = [
+    (80.0, 75.0, 70.0),
+    (80.0, 85.0, 70.0),
+    (80.0, 65.0, 70.0),
+    (60.0, 65.0, 70.0),
+    (60.0, 75.0, 70.0),
+    (60.0, 55.0, 70.0),
+    (25.0, 25.0, 20.0),
+    (70.0, 70.0, 70.0),
+    (NAN, 70.0, 65.0),
+    (70.0, NAN, 65.0),
+    (70.0, 68.0, NAN),
+]
+
+
+def _columns():
+    return [array("d", column) for column in zip(*GOALS)]
+
+
+def _same(a, b):
+    return (math.isnan(a) and math.isnan(b)) or a == pytest.approx(b)
+
+
+def test_plain_path_matches_progress_ratio(monkeypatch):
+    monkeypatch.setattr(progress, "np", None)
+    ratios = progress.progressRatios(*_columns())
+    none = lambda value: None if math.isnan(value) else value
+    for (start, current, target), ratio in zip(GOALS, ratios):
+        expected = service.progressRatio(none(current), none(target), none(start))
+        assert _same(ratio, NAN if expected is None else expected)
+
+
+def test_numpy_matches_plain(monkeypatch):
+    np = pytest.importorskip("numpy")
+    monkeypatch.setattr(progress, "np", np)
+    vectorized = progress.progressRatios(*_columns())
+    monkeypatch.setattr(progress, "np", None)
+    plain = progress.progressRatios(*_columns())
+    assert len(vectorized) == len(plain) == len(GOALS)
+    for a, b in zip(vectorized, plain):
+        assert _same(float(a), b)
+
+
+def _distributionGoals():
+    return {
+        "metric": array("b", [0, 0, 0, 0, 0, 0, 1, 1]),
+        "progress": array("d", [0.0, 0.05, 0.5, 0.99, 1.0, NAN, 0.25, 0.75]),
+    }
+
+
+def test_distribution_plain(monkeypatch):
+    monkeypatch.setattr(progress, "np", None)
+    weight, body_fat = progress.distribution(_distributionGoals())
+    assert (weight["metric_name"], weight["goals"], weight["measurable"], weight["completed"]) == ("weight", 6, 5, 1)
+    assert weight["histogram"] == [2, 0, 0, 0, 0, 1, 0, 0, 0, 2] # 100% lands in the last bucket
+    assert weight["median"] == 0.5
+    assert body_fat["mean"] == pytest.approx(0.5)
+
+
+def test_distribution_numpy_matches_plain(monkeypatch):
+    np = pytest.importorskip("numpy")
+    monkeypatch.setattr(progress, "np", np)
+    vectorized = progress.distribution(_distributionGoals())
+    monkeypatch.setattr(progress, "np", None)
+    assert vectorized == progress.distribution(_distributionGoals())
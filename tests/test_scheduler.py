@@ -0,0 +1,127 @@
+# test_scheduler.py
+from datetime import datetime, timedelta
+
+import scheduler
+from scheduler import Scheduler, Timeline
+
+DAY = datetime(2030, 5, 6)
+
+
+def at(hour, minute=0):
+    return DAY.replace(hour=hour, minute=minute)
+
+
+class FakeDB:
+    """just enough of a connection for Scheduler._sync: the rows it asks for, per table"""
+
+    def __init__(self, availability, bookings, rooms):
+        self.tables = {"trainer_availability": availability, "room_bookings": bookings}
+        self.rooms = rooms
+        self.queries = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self.rows = []
+
+    def execute(self, sql, params=None):
+        self.db.queries.append(sql)
+        if "FROM rooms" in sql:
+            self.rows = list(self.db.rooms)
+            return
+        table = sql.split(" FROM ")[1].split()[0]
+        ids = params[0] if params else None
+        self.rows = [row for row in self.db.tables[table] if ids is None or row[0] in ids]
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+def test_timeline_overlaps_ignores_touching_ends():
+    timeline = Timeline([(at(12), at(13)), (at(9), at(10))])
+    assert timeline.starts == [at(9), at(12)]
+    assert timeline.overlaps(at(9, 30), at(9, 45))
+    assert timeline.overlaps(at(8), at(12, 1))
+    assert not timeline.overlaps(at(10), at(12))
+    assert not timeline.overlaps(at(8), at(9))
+    assert not timeline.overlaps(at(13), at(14))
+    assert not Timeline().overlaps(at(8), at(9))
+
+
+def test_timeline_within():
+    timeline = Timeline([(at(9), at(10)), (at(12), at(13)), (at(15), at(16))])
+    assert list(timeline.within(at(9, 30), at(12, 30))) == [(at(9), at(10)), (at(12), at(13))]
+    assert list(timeline.within(at(10), at(12))) == []
+    assert len(timeline) == 3
+
+
+def test_round_up():
+    step = timedelta(minutes=30)
+    assert scheduler._roundUp(at(9, 10), step) == at(9, 30)
+    assert scheduler._roundUp(at(9, 30), step) == at(9, 30)
+    assert scheduler._roundUp(at(23, 50), step) == DAY + timedelta(days=1)
+
+
+def _db():
+    return FakeDB(
+        availability=[(1, at(9), at(12)), (2, at(14), at(16))],
+        bookings=[(10, at(9), at(10)), (20, at(9), at(11))],
+        rooms=[(10, "Small", 5), (20, "Big", 30), (30, "Hall", 100)],
+    )
+
+
+def test_suggest_picks_the_smallest_free_room():
+    engine = Scheduler()
+    found = engine.suggest(_db(), 1, timedelta(hours=1), at(6), at(22), min_capacity=1, limit=3)
+    assert [(slot["start_time"], slot["room_id"]) for slot in found] == [
+        (at(9), 30),      # small and big are booked 9-10
+        (at(9, 30), 30),
+        (at(10), 10),     # small is free again from 10
+    ]
+    assert found[0]["end_time"] == at(10) and found[0]["room_name"] == "Hall"
+
+
+def test_suggest_respects_capacity_and_the_window():
+    engine = Scheduler()
+    db = _db()
+    found = engine.suggest(db, 1, timedelta(hours=1), at(10), at(12), min_capacity=20)
+    assert [(slot["start_time"], slot["room_id"]) for slot in found] == [(at(10), 30), (at(10, 30), 30), (at(11), 20)]
+    assert engine.suggest(db, 1, timedelta(hours=4), at(6), at(22)) == [] # longer than the slot
+    assert engine.suggest(db, 99, timedelta(hours=1), at(6), at(22)) == [] # no availability
+
+
+def test_only_dirty_trainers_are_reloaded():
+    engine = Scheduler()
+    db = _db()
+    engine.suggest(db, 1, timedelta(hours=1), at(6), at(22))
+    assert engine.stats()["full_loads"] == 1
+    loads = len(db.queries)
+    engine.suggest(db, 1, timedelta(hours=1), at(6), at(22))
+    assert len(db.queries) == loads # nothing changed, no DB round trips
+
+    db.tables["trainer_availability"].append((2, at(18), at(20)))
+    engine.trainerChanged(2)
+    found = engine.suggest(db, 2, timedelta(hours=1), at(17), at(22))
+    assert [slot["start_time"] for slot in found] == [at(18), at(18, 30), at(19)]
+    stats = engine.stats()
+    assert (stats["full_loads"], stats["trainer_reloads"], stats["room_reloads"]) == (1, 1, 0)
+
+
+def test_clear_and_ttl_force_a_full_reload(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(scheduler.time, "monotonic", lambda: now[0])
+    engine = Scheduler(ttl=60)
+    db = _db()
+    engine.suggest(db, 1, timedelta(hours=1), at(6), at(22))
+    now[0] += 61
+    engine.suggest(db, 1, timedelta(hours=1), at(6), at(22))
+    engine.clear()
+    engine.suggest(db, 1, timedelta(hours=1), at(6), at(22))
+    assert engine.stats()["full_loads"] == 3